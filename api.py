@@ -9,6 +9,9 @@ import sqlalchemy
 from models import Country, Tenant, Feature, TenantFeature, Branch, Module, ProductTag, Product, ProductModule, BranchProductModule
 
 from extensions import db
+from errors import ApplicationError
+from feature_rollout import default_state
+from services.tenant_feature_service import tenant_feature_service
 
 clear_trade_api_bp = Blueprint('clear_trade_api', __name__)
 
@@ -660,7 +663,7 @@ def save_product_modules_api():
                         product_module_id=product_module.product_module_id,
                         eligibility_config=None,
                         created_by=None,
-                        created_at=datetime.utcnow()
+                        created_at=datetime.datetime.utcnow()
                     )
                     db.session.add(new_bpm)
                     modules_added_names.append(product_module.module.name)
@@ -711,6 +714,8 @@ def get_tenants_features_api(tenant_id):
         enabled_features_data = []
         disabled_features_data = []
 
+        tenant = Tenant.query.filter_by(tenant_id=tenant_id).first()
+        country_id = tenant.country_id if tenant else None
         all_features = {f.feature_id: f for f in Feature.query.all()}
         existing_tenant_features = TenantFeature.query.filter_by(tenant_id=tenant_id)\
             .options(joinedload(TenantFeature.feature)).all()
@@ -723,13 +728,15 @@ def get_tenants_features_api(tenant_id):
             tf_entry = existing_tf_map_by_feature_id.get(feature_id)
             feature_dict = {'id': feature.feature_id, 'name': feature.name}
 
-            if tf_entry:
-                if tf_entry.is_enabled is True:
-                    enabled_features_data.append(feature_dict)
-                else:
-                    disabled_features_data.append(feature_dict)
+            if tf_entry and tf_entry.is_enabled is not None:
+                is_enabled = tf_entry.is_enabled
             else:
+                is_enabled = default_state(feature.default_enabled, feature.rollout, feature_id, tenant_id, country_id)
+
+            if is_enabled:
                 enabled_features_data.append(feature_dict)
+            else:
+                disabled_features_data.append(feature_dict)
 
         enabled_features_data.sort(key=lambda x: x['name'].lower())
         disabled_features_data.sort(key=lambda x: x['name'].lower())
@@ -822,65 +829,19 @@ def configure_tenant_features_api():
         return jsonify({"error": "Please provide a tenant_id to configure features."}), 400
 
     try:
-        
-        from models import TenantFeature, Feature 
-
-        existing_tenant_features = TenantFeature.query.filter_by(tenant_id=selected_tenant_id).all()
-        existing_tf_map = {tf.feature_id: tf for tf in existing_tenant_features}
-
-        updates_made = False
-
-        for feature_id in enabled_feature_ids:
-            if feature_id in existing_tf_map:
-                tf_entry = existing_tf_map[feature_id]
-                if tf_entry.is_enabled is not True:
-                    tf_entry.is_enabled = True
-                    tf_entry.modified_on = datetime.datetime.utcnow() 
-                    db.session.add(tf_entry)
-                    updates_made = True
-            else:
-                new_tf = TenantFeature(
-                    tenant_id=selected_tenant_id,
-                    feature_id=feature_id,
-                    is_enabled=True,
-                    created_on=datetime.datetime.utcnow() 
-                )
-                db.session.add(new_tf)
-                updates_made = True
-
-        for feature_id in disabled_feature_ids:
-            if feature_id in existing_tf_map:
-                tf_entry = existing_tf_map[feature_id]
-                if tf_entry.is_enabled is not False:
-                    tf_entry.is_enabled = False
-                    tf_entry.modified_on = datetime.datetime.utcnow() 
-                    db.session.add(tf_entry)
-                    updates_made = True
-            else:
-                new_tf = TenantFeature(
-                    tenant_id=selected_tenant_id,
-                    feature_id=feature_id,
-                    is_enabled=False,
-                    created_on=datetime.datetime.utcnow()
-                )
-                db.session.add(new_tf)
-                updates_made = True
-
-        if updates_made:
-            db.session.commit()
-            return jsonify({
-                'message': f"Feature configurations updated successfully for Tenant ID {selected_tenant_id}!",
-                'tenant_id': selected_tenant_id,
-                'status': 'success'
-            }), 200
-        else:
-            db.session.rollback()
-            return jsonify({
-                'message': f"No changes required or made for Tenant ID {selected_tenant_id}.",
-                'tenant_id': selected_tenant_id,
-                'status': 'no_change'
-            }), 200
+        # Same write path as POST /api/tenant-features/configure, so only deviations from each
+        # feature's default or rollout are stored.
+        result = tenant_feature_service.update_tenant_feature_configuration(
+            selected_tenant_id, enabled_feature_ids, disabled_feature_ids
+        )
+        return jsonify({
+            'message': result['message'],
+            'tenant_id': selected_tenant_id,
+            'status': 'success' if result['status'] == 'success' else 'no_change'
+        }), 200
 
+    except ApplicationError as e:
+        return jsonify({'error': e.message}), e.status_code
     except Exception as e:
         db.session.rollback()
         
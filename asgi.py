@@ -0,0 +1,187 @@
+"""
+Optional ASGI serving mode.
+
+The read-only configuration endpoints (tenant listing, branch listing,
+tenant feature status, configured modules and available modules) are
+served natively on the event loop through an AsyncSession, so a single
+process can keep many slow MySQL round trips in flight at once. Every
+other request, including all writes, falls through to the regular Flask
+app running in asgiref's WSGI adapter thread pool.
+
+    pip install "sqlalchemy[asyncio]" asgiref aiomysql   # aiosqlite for SQLite
+    uvicorn asgi:create_asgi_app --factory --workers 4
+
+Responses from the async handlers match the Flask routes they shadow:
+same payloads, same JSON encoding, same error bodies and status codes.
+"""
+import logging
+import re
+import time
+import uuid
+from urllib.parse import parse_qs
+
+from async_db import create_async_session_factory
+from errors import ApplicationError, NotFoundError
+from logging_config import REQUEST_ID_HEADER
+from metrics import HTTP_REQUEST_LATENCY, HTTP_RESPONSES
+from schemas.message_schemas import MessageSchema
+from services.async_read_service import async_read_service
+
+log = logging.getLogger(__name__)
+
+message_schema = MessageSchema()
+
+
+class AsyncRoute:
+    def __init__(self, template, handler):
+        self.template = template
+        self.handler = handler
+        self.pattern = re.compile("^" + re.sub(r"<int:(\w+)>", r"(?P<\1>\\d+)", template) + "$")
+
+    def match(self, path):
+        match = self.pattern.match(path)
+        if match is None:
+            return None
+        return {name: int(value) for name, value in match.groupdict().items()}
+
+
+def _branch_id_arg(query):
+    # Mirrors request.args.get('branch_id', type=int): missing or malformed is None.
+    try:
+        return int(query["branch_id"][0])
+    except (KeyError, ValueError):
+        return None
+
+
+async def tenant_listing(session, config, query):
+    return await async_read_service.get_all_tenants_minimal(session)
+
+
+async def branch_listing(session, config, query, tenant_id):
+    return await async_read_service.get_branches_by_tenant(session, tenant_id)
+
+
+async def tenant_features_status(session, config, query, tenant_id):
+    return await async_read_service.get_features_for_tenant_with_status(session, tenant_id)
+
+
+async def configured_modules(session, config, query, branch_id, product_id):
+    return await async_read_service.get_configured_modules_for_branch_product(
+        session, branch_id, product_id, config['MODULE_ID_SEQUENCES']
+    )
+
+
+async def available_modules(session, config, query, product_id):
+    return await async_read_service.get_available_modules_for_product_with_status(
+        session, product_id, _branch_id_arg(query), config['MODULE_ID_SEQUENCES']
+    )
+
+
+async def available_modules_for_branch(session, config, query, product_id):
+    branch_id = _branch_id_arg(query)
+    if branch_id is None:
+        raise ApplicationError("Branch ID is required as a query parameter.", status_code=400)
+    return await async_read_service.get_available_modules_for_product_with_status(
+        session, product_id, branch_id, config['MODULE_ID_SEQUENCES']
+    )
+
+
+ASYNC_ROUTES = [
+    AsyncRoute("/api/tenants/", tenant_listing),
+    AsyncRoute("/api/tenants/<int:tenant_id>/branches", branch_listing),
+    AsyncRoute("/api/tenant-features/<int:tenant_id>", tenant_features_status),
+    AsyncRoute("/api/branches/<int:branch_id>/products/<int:product_id>/configured-modules", configured_modules),
+    AsyncRoute("/api/products/<int:product_id>/modules", available_modules),
+    AsyncRoute("/api/product-modules/product/<int:product_id>/modules", available_modules),
+    AsyncRoute("/api/branch-product-modules/product/<int:product_id>/modules", available_modules_for_branch),
+]
+
+
+def match_async_route(method, path):
+    """Returns (route, path_params) for a read endpoint served natively, else (None, None)."""
+    if method != "GET":
+        return None, None
+    for route in ASYNC_ROUTES:
+        params = route.match(path)
+        if params is not None:
+            return route, params
+    return None, None
+
+
+class AsyncReadApp:
+    """
+    ASGI application that serves ASYNC_ROUTES on the event loop and hands
+    everything else to the wrapped Flask app.
+    """
+    def __init__(self, flask_app, session_factory, engine, fallback):
+        self.flask_app = flask_app
+        self.session_factory = session_factory
+        self.engine = engine
+        self.fallback = fallback
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] == "http":
+            route, params = match_async_route(scope["method"], scope["path"])
+            if route is not None:
+                await self._handle(route, params, scope, send)
+                return
+        await self.fallback(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.engine.dispose()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _handle(self, route, params, scope, send):
+        start = time.perf_counter()
+        headers = {key.decode("latin-1").lower(): value.decode("latin-1") for key, value in scope.get("headers", [])}
+        request_id = headers.get(REQUEST_ID_HEADER.lower()) or uuid.uuid4().hex
+        query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+
+        try:
+            async with self.session_factory() as session:
+                payload = await route.handler(session, self.flask_app.config, query, **params)
+            status = 200
+        except ApplicationError as e:
+            if not isinstance(e, NotFoundError):
+                log.error(f"Error serving {scope['path']}: {e.message}", exc_info=True)
+            payload = message_schema.dump({"status": "error", "message": e.message, "code": e.status_code})
+            status = e.status_code
+        except Exception as e:
+            log.exception(f"Unexpected error serving {scope['path']}: {str(e)}")
+            payload = message_schema.dump({"status": "error", "message": "Internal server error", "details": str(e), "code": 500})
+            status = 500
+
+        body = (self.flask_app.json.dumps(payload) + "\n").encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("latin-1")),
+                (REQUEST_ID_HEADER.lower().encode("latin-1"), request_id.encode("latin-1")),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+        labels = {"blueprint": "asgi", "endpoint": route.template, "method": "GET"}
+        HTTP_REQUEST_LATENCY.observe(time.perf_counter() - start, **labels)
+        HTTP_RESPONSES.inc(status=status, **labels)
+
+
+def create_asgi_app(profile=None, config=None):
+    """Builds the Flask app for the profile and wraps it for ASGI serving."""
+    from asgiref.wsgi import WsgiToAsgi
+    from app import create_app
+
+    flask_app = create_app(profile, config)
+    engine, session_factory = create_async_session_factory(flask_app.config)
+    return AsyncReadApp(flask_app, session_factory, engine, WsgiToAsgi(flask_app))
@@ -0,0 +1,42 @@
+"""
+Async engine and session factory for the ASGI read path.
+
+Requires the asyncio extras (greenlet) plus an async driver for the
+configured database: aiomysql for MySQL, aiosqlite for SQLite. They are
+only imported when the ASGI app is built, so the WSGI deployment does not
+need them.
+"""
+from sqlalchemy.engine import make_url
+
+from config import engine_options
+
+ASYNC_DRIVERS = {
+    "mysql": "aiomysql",
+    "mariadb": "aiomysql",
+    "sqlite": "aiosqlite",
+}
+
+
+def async_database_url(database_url):
+    """
+    Maps a sync SQLAlchemy URL to the async driver for the same backend,
+    e.g. mysql+pymysql://... -> mysql+aiomysql://...
+    """
+    url = make_url(database_url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for '{backend}' databases.")
+    return url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}").render_as_string(hide_password=False)
+
+
+def create_async_session_factory(config):
+    """
+    Builds an AsyncEngine from ASYNC_DATABASE_URL, or from the sync
+    SQLALCHEMY_DATABASE_URI mapped to its async driver, and returns
+    (engine, async_sessionmaker).
+    """
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    database_url = config.get("ASYNC_DATABASE_URL") or async_database_url(config["SQLALCHEMY_DATABASE_URI"])
+    engine = create_async_engine(database_url, **engine_options(database_url))
+    return engine, async_sessionmaker(engine, expire_on_commit=False)
@@ -0,0 +1,199 @@
+"""
+Write-behind audit log for configuration changes.
+
+Services call record_change() once a mutation has been committed. The call
+only builds a small dict and puts it on a bounded in-process queue; a
+background thread takes records off the queue and inserts them in batches
+into the append-only configuration_audit_log table, so the request path
+never waits on an audit insert.
+
+When the queue is full the caller waits at most AUDIT_LOG_ENQUEUE_TIMEOUT
+seconds for room (backpressure); a record that still does not fit is
+dropped, logged and counted in audit_log_records_total{outcome="dropped"}.
+Records still queued when the process exits are drained before it stops.
+"""
+import atexit
+import datetime
+import json
+import logging
+import queue
+import threading
+
+from flask import current_app, has_app_context
+
+from extensions import db
+from logging_config import get_request_id
+from metrics import registry
+from models import ConfigurationAuditLog
+
+log = logging.getLogger(__name__)
+
+AUDIT_RECORDS = registry.counter(
+    "audit_log_records_total", "Audit records by outcome (written, dropped, failed).", ("outcome",)
+)
+
+_STOP = object()
+_writers = []
+
+
+class AuditLogWriter:
+    """
+    Bounded queue plus the worker thread that flushes it. In inline mode
+    (used for in-memory SQLite, whose single shared connection cannot be
+    used from a second thread while a request is running) records are
+    written by the caller instead.
+    """
+    def __init__(self, app, max_queue_size=10000, batch_size=500, flush_interval=1.0,
+                 enqueue_timeout=0.05, inline=False):
+        self.app = app
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.enqueue_timeout = enqueue_timeout
+        self.inline = inline
+        self.queue = queue.Queue(maxsize=max_queue_size)
+        self._closed = False
+        self._thread = None
+
+    def start(self):
+        if self.inline or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="audit-log-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, record):
+        """Queues one record; returns False if it had to be dropped."""
+        if self._closed:
+            log.warning(f"Audit log is closed; dropping {record['action']} {record['entity_type']}={record['entity_id']}")
+            AUDIT_RECORDS.inc(outcome="dropped")
+            return False
+        if self.inline:
+            self._write([record])
+            return True
+        try:
+            self.queue.put(record, timeout=self.enqueue_timeout)
+            return True
+        except queue.Full:
+            log.warning(f"Audit log queue is full; dropping {record['action']} {record['entity_type']}={record['entity_id']}")
+            AUDIT_RECORDS.inc(outcome="dropped")
+            return False
+
+    def flush(self):
+        """Blocks until every record queued so far has been written (or failed)."""
+        if not self.inline:
+            self.queue.join()
+
+    def close(self, timeout=10.0):
+        """Stops accepting records, drains the queue and stops the worker."""
+        if self._closed:
+            return
+        self._closed = True
+        if self._thread is None:
+            return
+        self.queue.put(_STOP)
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            log.error(f"Audit log worker did not drain within {timeout}s; {self.queue.qsize()} records may be lost.")
+
+    def _next_batch(self):
+        try:
+            first = self.queue.get(timeout=self.flush_interval)
+        except queue.Empty:
+            return [], False
+        batch, stop = [], first is _STOP
+        if not stop:
+            batch.append(first)
+        while not stop and len(batch) < self.batch_size:
+            try:
+                record = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if record is _STOP:
+                stop = True
+            else:
+                batch.append(record)
+        return batch, stop
+
+    def _run(self):
+        with self.app.app_context():
+            while True:
+                batch, stop = self._next_batch()
+                if batch:
+                    self._write(batch)
+                for _ in range(len(batch) + (1 if stop else 0)):
+                    self.queue.task_done()
+                if stop:
+                    return
+
+    def _write(self, batch):
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(ConfigurationAuditLog.__table__.insert(), batch)
+            AUDIT_RECORDS.inc(len(batch), outcome="written")
+        except Exception as e:
+            log.exception(f"Failed to write {len(batch)} audit records: {e}")
+            AUDIT_RECORDS.inc(len(batch), outcome="failed")
+
+
+def record_change(entity_type, entity_id, action, tenant_id=None, details=None, actor=None):
+    """
+    Queues an audit record for a committed change, e.g.
+    record_change("tenant_feature", f"{tenant_id}:{feature_id}", "enable", tenant_id=tenant_id).
+    Does nothing outside an app context or when the audit log is disabled.
+    """
+    if not has_app_context():
+        return
+    writer = current_app.extensions.get("audit_log")
+    if writer is None:
+        return
+    writer.submit({
+        "entity_type": entity_type,
+        "entity_id": str(entity_id),
+        "action": action,
+        "tenant_id": tenant_id,
+        "details": json.dumps(details, default=str) if details is not None else None,
+        "actor": actor,
+        "request_id": get_request_id(),
+        "created_at": datetime.datetime.utcnow(),
+    })
+
+
+def _queued_records():
+    return {(): sum(writer.queue.qsize() for writer in _writers)}
+
+
+registry.callback("audit_log_queue_depth", "Audit records waiting to be written.", collect=_queued_records)
+
+
+def _close_all():
+    for writer in list(_writers):
+        writer.close()
+
+
+atexit.register(_close_all)
+
+
+def init_audit_log(app):
+    """
+    Starts the audit log writer for the app and exposes it as
+    app.extensions["audit_log"]. Without BACKGROUND_WORKERS, or on in-memory
+    SQLite, records are written inline by the caller.
+    """
+    if not app.config.get("AUDIT_LOG_ENABLED", True):
+        return
+    with app.app_context():
+        url = db.engine.url
+    inline = (not app.config.get("BACKGROUND_WORKERS", True)
+              or url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"))
+    writer = AuditLogWriter(
+        app,
+        max_queue_size=app.config.get("AUDIT_LOG_QUEUE_SIZE", 10000),
+        batch_size=app.config.get("AUDIT_LOG_BATCH_SIZE", 500),
+        flush_interval=app.config.get("AUDIT_LOG_FLUSH_INTERVAL", 1.0),
+        enqueue_timeout=app.config.get("AUDIT_LOG_ENQUEUE_TIMEOUT", 0.05),
+        inline=inline,
+    )
+    writer.start()
+    if not inline:
+        # Kept for the queue depth metric and the drain at exit; inline writers hold nothing.
+        _writers.append(writer)
+    app.extensions["audit_log"] = writer
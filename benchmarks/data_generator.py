@@ -0,0 +1,305 @@
+"""
+Deterministic synthetic multi-tenant dataset generator.
+
+Builds a consistent graph of countries, tenants, branches, product tags,
+products (with a parent hierarchy), modules (with dependent_modules),
+product modules, branch product modules (with eligibility_config blobs),
+features and tenant features. Rows are streamed in fixed-size batches
+through Core executemany inserts, so multi-million row datasets build
+without loading the ORM:
+
+    python -m benchmarks.data_generator --database-url mysql+pymysql://... \\
+        --tenants 2000 --branches-per-tenant 25 --products 40 --seed 7
+"""
+import argparse
+import datetime
+import itertools
+import json
+import random
+import time
+
+from extensions import db
+from models import Country, Tenant, Feature, TenantFeature, Branch, Module, ProductTag, Product, ProductModule, BranchProductModule
+
+CURRENCIES = ("USD", "EUR", "GBP", "INR", "AED", "SGD", "JPY")
+CUSTOMER_SEGMENTS = ("retail", "sme", "corporate", "private", "institutional")
+CHANNELS = ("web", "mobile", "branch", "api", "h2h")
+
+
+class DatasetScale:
+    """Row counts and fill ratios for a generated dataset."""
+    def __init__(self, countries=5, tenants=20, branches_per_tenant=10, product_tags=4, products=10,
+                 modules=8, modules_per_product=6, features=40, bpm_fill=0.5, tenant_feature_fill=0.3):
+        self.countries = countries
+        self.tenants = tenants
+        self.branches_per_tenant = branches_per_tenant
+        self.product_tags = product_tags
+        self.products = products
+        self.modules = modules
+        self.modules_per_product = min(modules_per_product, modules)
+        self.features = features
+        self.bpm_fill = bpm_fill
+        self.tenant_feature_fill = tenant_feature_fill
+
+    def to_dict(self):
+        return dict(vars(self))
+
+
+def _batched(rows, batch_size):
+    iterator = iter(rows)
+    while True:
+        batch = list(itertools.islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+class DataGenerator:
+    """
+    Generates and bulk-inserts a dataset. The same seed and scale always
+    produce the same rows, so runs are reproducible across machines.
+    """
+    def __init__(self, scale, seed=0, batch_size=5000):
+        self.scale = scale
+        self.seed = seed
+        self.batch_size = batch_size
+        self.now = datetime.datetime(2024, 1, 1)
+        self.row_counts = {}
+        self._product_modules = {}
+
+    def _rng(self, table_name):
+        # One stream per table keeps each table stable when another table's scale changes.
+        return random.Random(f"{self.seed}:{table_name}")
+
+    def _insert(self, model, rows):
+        table = model.__table__
+        count = 0
+        for batch in _batched(rows, self.batch_size):
+            with db.engine.begin() as conn:
+                conn.execute(table.insert(), batch)
+            count += len(batch)
+        self.row_counts[table.name] = count
+
+    def _countries(self):
+        for country_id in range(1, self.scale.countries + 1):
+            yield {
+                "country_id": country_id,
+                "country_code": f"C{country_id:04d}",
+                "country_name": f"Country {country_id}",
+                "status": "Active",
+            }
+
+    def _tenants(self):
+        rng = self._rng("tenant")
+        for tenant_id in range(1, self.scale.tenants + 1):
+            yield {
+                "tenant_id": tenant_id,
+                "organization_code": f"ORG{tenant_id:07d}",
+                "tenant_name": f"Tenant {tenant_id}",
+                "sub_domain": f"tenant{tenant_id}",
+                "default_currency": rng.choice(CURRENCIES),
+                "description": None,
+                "status": "Active" if rng.random() < 0.95 else "Inactive",
+                "country_id": rng.randint(1, self.scale.countries),
+            }
+
+    def _branches(self):
+        rng = self._rng("branch")
+        branch_id = 0
+        for tenant_id in range(1, self.scale.tenants + 1):
+            for index in range(1, self.scale.branches_per_tenant + 1):
+                branch_id += 1
+                yield {
+                    "branch_id": branch_id,
+                    "tenant_id": tenant_id,
+                    "name": f"Branch {tenant_id}-{index}",
+                    "description": None,
+                    "status": "Active" if rng.random() < 0.9 else "Inactive",
+                    "code": f"BR{index:04d}",
+                    "country_id": rng.randint(1, self.scale.countries),
+                }
+
+    def _product_tags(self):
+        for tag_id in range(1, self.scale.product_tags + 1):
+            yield {"product_tag_id": tag_id, "code": f"TAG{tag_id}", "name": f"Tag {tag_id}", "sequence": tag_id}
+
+    def _products(self):
+        rng = self._rng("product")
+        root_count = max(1, self.scale.products // 4)
+        for product_id in range(1, self.scale.products + 1):
+            parent_id = None if product_id <= root_count else rng.randint(1, product_id - 1)
+            yield {
+                "product_id": product_id,
+                "name": f"Product {product_id}",
+                "code": f"PRD{product_id:05d}",
+                "description": None,
+                "tag": None,
+                "sequence": product_id,
+                "parent_product_id": parent_id,
+                "is_inbound": rng.random() < 0.5,
+                "product_tag_id": rng.randint(1, self.scale.product_tags) if self.scale.product_tags else None,
+                "supported_file_formats": ",".join(rng.sample(("csv", "json", "xml", "mt940", "iso20022"), 2)),
+            }
+
+    def _modules(self):
+        rng = self._rng("module")
+        for module_id in range(1, self.scale.modules + 1):
+            # Dependencies only point at lower ids, so the graph is always acyclic.
+            dependency_count = rng.randint(0, min(2, module_id - 1))
+            yield {
+                "module_id": module_id,
+                "name": f"Module {module_id}",
+                "description": None,
+                "created_by": "generator",
+                "code": f"MOD{module_id:03d}",
+                "dependent_modules": sorted(rng.sample(range(1, module_id), dependency_count)),
+            }
+
+    def _product_modules_rows(self):
+        rng = self._rng("product_module")
+        product_module_id = 0
+        for product_id in range(1, self.scale.products + 1):
+            module_ids = sorted(rng.sample(range(1, self.scale.modules + 1), self.scale.modules_per_product))
+            for sequence, module_id in enumerate(module_ids, start=1):
+                product_module_id += 1
+                self._product_modules.setdefault(product_id, []).append(product_module_id)
+                yield {
+                    "product_module_id": product_module_id,
+                    "module_id": module_id,
+                    "code": f"PM{product_module_id}",
+                    "product_id": product_id,
+                    "sequence": sequence * 10,
+                }
+
+    def _eligibility_config(self, rng):
+        min_amount = rng.choice((0, 100, 1000, 5000))
+        return json.dumps({
+            "min_amount": min_amount,
+            "max_amount": min_amount * rng.choice((10, 100, 1000)) or 100000,
+            "currencies": rng.sample(CURRENCIES, rng.randint(1, 3)),
+            "customer_segments": rng.sample(CUSTOMER_SEGMENTS, rng.randint(1, 3)),
+            "channels": rng.sample(CHANNELS, rng.randint(1, 4)),
+            "requires_approval": rng.random() < 0.3,
+            "cutoff_time": f"{rng.randint(14, 18):02d}:{rng.choice(('00', '30'))}",
+        })
+
+    def _branch_product_modules(self):
+        rng = self._rng("branch_product_module")
+        bpm_id = 0
+        branch_count = self.scale.tenants * self.scale.branches_per_tenant
+        all_product_module_ids = [pm_id for product_id in sorted(self._product_modules) for pm_id in self._product_modules[product_id]]
+        for branch_id in range(1, branch_count + 1):
+            for product_module_id in all_product_module_ids:
+                if rng.random() >= self.scale.bpm_fill:
+                    continue
+                bpm_id += 1
+                yield {
+                    "tenant_product_module": bpm_id,
+                    "branch_id": branch_id,
+                    "product_module_id": product_module_id,
+                    "created_by": "generator",
+                    "created_at": self.now,
+                    "eligibility_config": self._eligibility_config(rng),
+                }
+
+    def _features(self):
+        for feature_id in range(1, self.scale.features + 1):
+            yield {
+                "feature_id": feature_id,
+                "name": f"Feature {feature_id}",
+                "description": None,
+                "module_id": (feature_id - 1) % self.scale.modules + 1 if self.scale.modules else None,
+                "created_by": "generator",
+            }
+
+    def _tenant_features(self):
+        rng = self._rng("tenant_feature")
+        tenant_feature_id = 0
+        for tenant_id in range(1, self.scale.tenants + 1):
+            for feature_id in range(1, self.scale.features + 1):
+                if rng.random() >= self.scale.tenant_feature_fill:
+                    continue
+                tenant_feature_id += 1
+                yield {
+                    "tenant_feature_id": tenant_feature_id,
+                    "tenant_id": tenant_id,
+                    "feature_id": feature_id,
+                    "is_enabled": rng.random() < 0.5,
+                    "created_on": self.now,
+                    "modified_on": None,
+                }
+
+    def iter_tables(self):
+        """
+        Yields (model, rows) pairs in foreign-key order. Each rows iterator
+        must be consumed before the next pair is requested.
+        """
+        self._product_modules = {}
+        yield Country, self._countries()
+        yield Tenant, self._tenants()
+        yield Branch, self._branches()
+        yield ProductTag, self._product_tags()
+        yield Product, self._products()
+        yield Module, self._modules()
+        yield ProductModule, self._product_modules_rows()
+        yield BranchProductModule, self._branch_product_modules()
+        yield Feature, self._features()
+        yield TenantFeature, self._tenant_features()
+
+    def generate(self):
+        """Inserts the whole dataset and returns row counts per table."""
+        for model, rows in self.iter_tables():
+            self._insert(model, rows)
+        return dict(self.row_counts)
+
+    def ids(self):
+        """Primary keys of the generated parents, for drivers such as the benchmark harness."""
+        return {
+            "tenant_ids": list(range(1, self.scale.tenants + 1)),
+            "branch_ids": list(range(1, self.scale.tenants * self.scale.branches_per_tenant + 1)),
+            "product_ids": list(range(1, self.scale.products + 1)),
+            "module_ids": list(range(1, self.scale.modules + 1)),
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic multi-tenant dataset.")
+    parser.add_argument("--database-url", required=True)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--countries", type=int, default=5)
+    parser.add_argument("--tenants", type=int, default=20)
+    parser.add_argument("--branches-per-tenant", type=int, default=10)
+    parser.add_argument("--product-tags", type=int, default=4)
+    parser.add_argument("--products", type=int, default=10)
+    parser.add_argument("--modules", type=int, default=8)
+    parser.add_argument("--modules-per-product", type=int, default=6)
+    parser.add_argument("--features", type=int, default=40)
+    parser.add_argument("--bpm-fill", type=float, default=0.5)
+    parser.add_argument("--tenant-feature-fill", type=float, default=0.3)
+    parser.add_argument("--recreate", action="store_true", help="Drop and recreate all tables first.")
+    args = parser.parse_args(argv)
+
+    from app import create_app
+    app = create_app("api", {"SQLALCHEMY_DATABASE_URI": args.database_url})
+
+    scale = DatasetScale(
+        args.countries, args.tenants, args.branches_per_tenant, args.product_tags, args.products,
+        args.modules, args.modules_per_product, args.features, args.bpm_fill, args.tenant_feature_fill
+    )
+    with app.app_context():
+        if args.recreate:
+            db.drop_all()
+        db.create_all()
+        start = time.perf_counter()
+        counts = DataGenerator(scale, seed=args.seed, batch_size=args.batch_size).generate()
+        elapsed = time.perf_counter() - start
+
+    for table_name, count in counts.items():
+        print(f"{table_name:<24}{count:>12}")
+    print(f"{'total':<24}{sum(counts.values()):>12} rows in {elapsed:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
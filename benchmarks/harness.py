@@ -0,0 +1,243 @@
+"""
+Benchmark harness for the configuration API hot paths.
+
+Seeds a throwaway database with synthetic data, drives the Flask test
+client against the hot endpoints and reports latency percentiles, queries
+per request and peak RSS. Results can be compared against a stored
+baseline so that regressions fail the run:
+
+    python -m benchmarks.harness --tenants 50 --iterations 200
+    python -m benchmarks.harness --update-baseline
+
+With --database-url the database must be empty: the harness creates and
+seeds its own schema there, and only drops existing tables when
+--reset-database is given.
+"""
+import argparse
+import json
+import math
+import os
+import resource
+import sys
+import tempfile
+import time
+
+DEFAULT_BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = math.ceil(pct / 100.0 * len(sorted_values))
+    return sorted_values[max(0, min(len(sorted_values), rank) - 1)]
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in kilobytes on Linux and bytes on macOS.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def hot_endpoints(ids):
+    """
+    Returns (name, request_factory) pairs. Each factory takes the iteration
+    number and returns (method, url, json_body) so successive iterations
+    spread over different tenants, branches and products.
+    """
+    tenant_ids, branch_ids, product_ids, module_ids = ids["tenant_ids"], ids["branch_ids"], ids["product_ids"], ids["module_ids"]
+
+    def pick(values, i):
+        return values[i % len(values)]
+
+    def branch_tenant(branch_id):
+        return tenant_ids[(branch_id - 1) * len(tenant_ids) // len(branch_ids)]
+
+    def save_modules(i):
+        branch_id = pick(branch_ids, i)
+        return "POST", "/api/config/save-product-modules", {
+            "tenant_id": branch_tenant(branch_id),
+            "branch_id": branch_id,
+            "product_id": pick(product_ids, i),
+            "module_ids_hidden": ",".join(str(mid) for mid in module_ids),
+        }
+
+    return [
+        ("tenant_features_status", lambda i: ("GET", f"/api/tenant-features/{pick(tenant_ids, i)}", None)),
+        ("configured_modules", lambda i: ("GET", f"/api/branches/{pick(branch_ids, i)}/products/{product_ids[0]}/configured-modules", None)),
+        ("available_modules", lambda i: ("GET", f"/api/branch-product-modules/product/{product_ids[0]}/modules?branch_id={pick(branch_ids, i)}", None)),
+        ("save_product_modules", save_modules),
+        ("tenant_listing", lambda i: ("GET", "/api/tenants/", None)),
+        ("branch_listing", lambda i: ("GET", f"/api/tenants/{pick(tenant_ids, i)}/branches", None)),
+    ]
+
+
+def run_endpoint(client, request_factory, iterations, warmup):
+    latencies = []
+    query_counts = []
+    errors = 0
+    for i in range(warmup + iterations):
+        method, url, body = request_factory(i)
+        start = time.perf_counter()
+        response = client.open(url, method=method, json=body)
+        elapsed = time.perf_counter() - start
+        if i < warmup:
+            continue
+        latencies.append(elapsed * 1000)
+        query_counts.append(int(response.headers.get("X-DB-Query-Count", 0)))
+        if response.status_code >= 400:
+            errors += 1
+    latencies.sort()
+    return {
+        "requests": iterations,
+        "errors": errors,
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "queries_per_request": round(sum(query_counts) / len(query_counts), 2) if query_counts else 0.0,
+    }
+
+
+def compare_to_baseline(results, baseline, latency_tolerance):
+    """
+    Returns a list of human-readable regressions. Query counts are
+    deterministic and must not grow at all; p95 latency may grow by
+    `latency_tolerance` (a fraction) before it counts as a regression.
+    """
+    regressions = []
+    for name, current in results["endpoints"].items():
+        previous = baseline.get("endpoints", {}).get(name)
+        if not previous:
+            continue
+        if current["queries_per_request"] > previous["queries_per_request"]:
+            regressions.append(
+                f"{name}: queries/request {previous['queries_per_request']} -> {current['queries_per_request']}"
+            )
+        allowed_p95 = previous["p95_ms"] * (1 + latency_tolerance)
+        if current["p95_ms"] > allowed_p95:
+            regressions.append(
+                f"{name}: p95 {previous['p95_ms']}ms -> {current['p95_ms']}ms (allowed {allowed_p95:.3f}ms)"
+            )
+        if current["errors"] > previous.get("errors", 0):
+            regressions.append(f"{name}: errors {previous.get('errors', 0)} -> {current['errors']}")
+    return regressions
+
+
+def build_app(database_url):
+    from app import create_app
+    return create_app("api", {
+        "SQLALCHEMY_DATABASE_URI": database_url,
+        "DB_EXPOSE_REQUEST_STATS": True,
+        "BACKGROUND_WORKERS": False,
+        "LOG_LEVEL": os.getenv("LOG_LEVEL", "WARNING"),
+    })
+
+
+def run_benchmarks(app, scale, iterations, warmup, seed=0, reset_database=False):
+    """
+    Seeds the app's database and measures the hot endpoints. Raises
+    ValueError if the database already has tables, unless reset_database
+    allows dropping them.
+    """
+    import sqlalchemy
+    from extensions import db
+    from benchmarks.data_generator import DataGenerator
+
+    with app.app_context():
+        existing = sqlalchemy.inspect(db.engine).get_table_names()
+        if existing and not reset_database:
+            raise ValueError(
+                f"{db.engine.url.render_as_string(hide_password=True)} already has {len(existing)} tables "
+                f"({', '.join(sorted(existing)[:5])}{', ...' if len(existing) > 5 else ''}); "
+                "use an empty database or pass --reset-database to drop them."
+            )
+        db.drop_all()
+        db.create_all()
+        generator = DataGenerator(scale, seed=seed)
+        generator.generate()
+        ids = generator.ids()
+
+    client = app.test_client()
+    endpoints = {}
+    for name, request_factory in hot_endpoints(ids):
+        endpoints[name] = run_endpoint(client, request_factory, iterations, warmup)
+    return {
+        "scale": scale.to_dict(),
+        "seed": seed,
+        "iterations": iterations,
+        "endpoints": endpoints,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+def format_report(results):
+    lines = [f"{'endpoint':<26}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'queries':>10}{'errors':>8}"]
+    for name, row in results["endpoints"].items():
+        lines.append(
+            f"{name:<26}{row['p50_ms']:>10.3f}{row['p95_ms']:>10.3f}{row['p99_ms']:>10.3f}"
+            f"{row['queries_per_request']:>10.2f}{row['errors']:>8}"
+        )
+    lines.append(f"peak RSS: {results['peak_rss_mb']} MB")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the configuration API hot paths.")
+    parser.add_argument("--database-url", help="An empty database; defaults to a temporary SQLite file.")
+    parser.add_argument("--reset-database", action="store_true",
+                        help="Drop every table in --database-url before seeding it. Destroys its data.")
+    parser.add_argument("--tenants", type=int, default=20)
+    parser.add_argument("--branches-per-tenant", type=int, default=10)
+    parser.add_argument("--products", type=int, default=10)
+    parser.add_argument("--modules", type=int, default=8)
+    parser.add_argument("--features", type=int, default=40)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--iterations", type=int, default=100)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true", help="Write the results as the new baseline.")
+    parser.add_argument("--latency-tolerance", type=float, default=0.25, help="Allowed p95 growth as a fraction.")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON instead of a table.")
+    args = parser.parse_args(argv)
+
+    from benchmarks.data_generator import DatasetScale
+    scale = DatasetScale(
+        tenants=args.tenants, branches_per_tenant=args.branches_per_tenant, products=args.products,
+        modules=args.modules, modules_per_product=args.modules, features=args.features
+    )
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        database_url = args.database_url or f"sqlite:///{os.path.join(tmp_dir, 'benchmark.db')}"
+        app = build_app(database_url)
+        try:
+            results = run_benchmarks(app, scale, args.iterations, args.warmup, args.seed, args.reset_database)
+        except ValueError as e:
+            print(e, file=sys.stderr)
+            return 2
+
+    print(json.dumps(results, indent=2) if args.json else format_report(results))
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if (baseline.get("scale"), baseline.get("seed")) != (results["scale"], results["seed"]):
+            print("Baseline was recorded at a different scale; skipping comparison.")
+            return 0
+        regressions = compare_to_baseline(results, baseline, args.latency_tolerance)
+        if regressions:
+            print("Performance regressions against baseline:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print("No regressions against baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
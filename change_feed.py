@@ -0,0 +1,173 @@
+"""
+Configuration change feed backed by a transactional outbox.
+
+Every flush that creates, updates or deletes a Tenant, Branch, Feature,
+TenantFeature, BranchProductModule, Product or Module also inserts one
+configuration_change row per change, on the flush's own connection and
+therefore inside the same transaction: a change is published if and only if
+it commits, whichever service or repository method made it. The autoincrement primary key is the
+feed version; consumers keep the last version they saw and ask for
+GET /api/changes?since=<version>, either as a (long-)poll or as a
+Server-Sent Events stream.
+
+Waiting consumers are woken as soon as a change commits in this process,
+and re-check the table every CHANGE_FEED_POLL_INTERVAL seconds for changes
+committed by other processes.
+
+Versions are allocated when a row is inserted, so two concurrent
+transactions can commit out of version order. Readers therefore only go up
+to the settled version (ConfigurationChangeRepository.get_settled_version):
+the feed stops before a version that is still missing, until it commits or
+has been missing for CHANGE_FEED_GRACE seconds, so a consumer never moves
+past a change it has not been given.
+
+Caveat: rows removed by database-level ON DELETE CASCADE bypass the ORM and
+are not published.
+"""
+import datetime
+import json
+import threading
+
+from flask import current_app, has_app_context
+from sqlalchemy import event, select
+
+from extensions import db
+from models import Tenant, Branch, Feature, TenantFeature, BranchProductModule, Product, Module, ProductModule, ConfigurationChange
+
+WATCHED_MODELS = {
+    Tenant: "tenant",
+    Branch: "branch",
+    Feature: "feature",
+    TenantFeature: "tenant_feature",
+    BranchProductModule: "branch_product_module",
+    Product: "product",
+    Module: "module",
+}
+
+_PENDING_KEY = "_change_feed_pending"
+
+
+class ChangeNotifier:
+    """
+    Lets long-poll and SSE handlers sleep until a change commits. Callers read
+    `generation` before querying and pass it to wait(), so a commit that lands
+    between the query and the wait is never missed.
+    """
+    def __init__(self):
+        self._condition = threading.Condition()
+        self.generation = 0
+
+    def notify(self):
+        with self._condition:
+            self.generation += 1
+            self._condition.notify_all()
+
+    def wait(self, generation, timeout):
+        """Returns True if a change committed since `generation` was read."""
+        with self._condition:
+            return self._condition.wait_for(lambda: self.generation != generation, timeout)
+
+
+change_notifier = ChangeNotifier()
+
+
+def _describe(obj, bpm_context):
+    if isinstance(obj, Tenant):
+        return str(obj.tenant_id), obj.tenant_id, {"tenant_id": obj.tenant_id, "status": obj.status}
+    if isinstance(obj, Branch):
+        return str(obj.branch_id), obj.tenant_id, {
+            "branch_id": obj.branch_id, "tenant_id": obj.tenant_id, "code": obj.code, "status": obj.status,
+        }
+    if isinstance(obj, Feature):
+        return str(obj.feature_id), None, {"feature_id": obj.feature_id, "name": obj.name}
+    if isinstance(obj, TenantFeature):
+        return f"{obj.tenant_id}:{obj.feature_id}", obj.tenant_id, {
+            "tenant_id": obj.tenant_id, "feature_id": obj.feature_id, "is_enabled": obj.is_enabled,
+        }
+    if isinstance(obj, BranchProductModule):
+        tenant_id, product_id, module_id = bpm_context(obj)
+        return str(obj.tenant_product_module), tenant_id, {
+            "branch_id": obj.branch_id, "product_module_id": obj.product_module_id,
+            "product_id": product_id, "module_id": module_id,
+        }
+    if isinstance(obj, Product):
+        return str(obj.product_id), None, {"product_id": obj.product_id, "code": obj.code, "name": obj.name}
+    return str(obj.module_id), None, {"module_id": obj.module_id, "code": obj.code, "name": obj.name}
+
+
+def _bpm_context_loader(connection, bpms):
+    """Resolves tenant, product and module for the flushed BPMs with one query per table."""
+    branch_ids = {bpm.branch_id for bpm in bpms if bpm.branch_id is not None}
+    product_module_ids = {bpm.product_module_id for bpm in bpms if bpm.product_module_id is not None}
+    tenants = dict(connection.execute(
+        select(Branch.branch_id, Branch.tenant_id).where(Branch.branch_id.in_(branch_ids))
+    ).all()) if branch_ids else {}
+    product_modules = {
+        row.product_module_id: (row.product_id, row.module_id)
+        for row in connection.execute(
+            select(ProductModule.product_module_id, ProductModule.product_id, ProductModule.module_id)
+            .where(ProductModule.product_module_id.in_(product_module_ids))
+        )
+    } if product_module_ids else {}
+
+    def context(bpm):
+        product_id, module_id = product_modules.get(bpm.product_module_id, (None, None))
+        return tenants.get(bpm.branch_id), product_id, module_id
+    return context
+
+
+def _publish_flushed_changes(session, flush_context):
+    if not has_app_context() or not current_app.config.get("CHANGE_FEED_ENABLED"):
+        return
+    # new/dirty/deleted still describe the flush that just ran; primary keys of new rows are assigned.
+    changes = [
+        (action, obj)
+        for action, objects in (("create", session.new), ("update", session.dirty), ("delete", session.deleted))
+        for obj in objects
+        if type(obj) in WATCHED_MODELS and (action != "update" or session.is_modified(obj, include_collections=False))
+    ]
+    if not changes:
+        return
+
+    connection = session.connection()
+    bpm_context = _bpm_context_loader(connection, [obj for _, obj in changes if isinstance(obj, BranchProductModule)])
+    now = datetime.datetime.utcnow()
+    rows = []
+    for action, obj in changes:
+        entity_id, tenant_id, payload = _describe(obj, bpm_context)
+        rows.append({
+            "entity_type": WATCHED_MODELS[type(obj)],
+            "entity_id": entity_id,
+            "action": action,
+            "tenant_id": tenant_id,
+            "payload": json.dumps(payload, default=str),
+            "created_at": now,
+        })
+    connection.execute(ConfigurationChange.__table__.insert(), rows)
+    session.info[_PENDING_KEY] = True
+
+
+def _notify_after_commit(session):
+    if session.info.pop(_PENDING_KEY, False):
+        change_notifier.notify()
+
+
+def _discard_after_rollback(session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+def init_change_feed(app):
+    """
+    Hooks the outbox writer into the Flask-SQLAlchemy session. The hooks are
+    shared by every app in the process and check CHANGE_FEED_ENABLED of the
+    active app at flush time.
+    """
+    if not app.config.get("CHANGE_FEED_ENABLED", True):
+        return
+    for name, listener in (
+        ("after_flush", _publish_flushed_changes),
+        ("after_commit", _notify_after_commit),
+        ("after_rollback", _discard_after_rollback),
+    ):
+        if not event.contains(db.session, name, listener):
+            event.listen(db.session, name, listener)
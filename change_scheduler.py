@@ -0,0 +1,82 @@
+"""
+Background worker for scheduled changes.
+
+Every SCHEDULED_CHANGES_INTERVAL seconds the worker applies the scheduled
+changes that are due (see ScheduledChangeService.apply_due_changes). Each
+batch is one transaction, so a cutover at time T becomes a few bulk
+statements on one thread. The request path is not involved. Schedulers in
+several processes can run side by side: on databases that support it, due
+rows are claimed with SELECT ... FOR UPDATE SKIP LOCKED, so each change is
+applied by one of them.
+
+An in-memory SQLite database has a single shared connection that a second
+thread cannot use while a request is running, so no worker is started for
+it; due changes are applied through POST /api/scheduled-changes/apply
+instead.
+"""
+import logging
+import threading
+
+from extensions import db
+from metrics import registry
+
+log = logging.getLogger(__name__)
+
+RUNS = registry.counter(
+    "scheduled_change_runs_total", "Scheduler runs by outcome (idle, applied, failed).", ("outcome",)
+)
+
+
+class ChangeScheduler:
+    def __init__(self, app, interval=5.0):
+        self.app = app
+        self.interval = interval
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="change-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=10.0):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def run_once(self):
+        """Applies the changes due now; returns the summary, or None if the run failed."""
+        from services.scheduled_change_service import scheduled_change_service
+        try:
+            summary = scheduled_change_service.apply_due_changes()
+        except Exception as e:
+            log.exception(f"Scheduled change run failed: {e}")
+            RUNS.inc(outcome="failed")
+            return None
+        finally:
+            db.session.remove()
+        RUNS.inc(outcome="applied" if summary["batches"] else "idle")
+        return summary
+
+    def _run(self):
+        with self.app.app_context():
+            while not self._stopped.wait(self.interval):
+                self.run_once()
+
+
+def init_change_scheduler(app):
+    """
+    Starts the scheduler for the app as app.extensions["change_scheduler"]
+    unless SCHEDULED_CHANGES_ENABLED or BACKGROUND_WORKERS is off or the
+    database is in-memory SQLite.
+    """
+    if not app.config.get("SCHEDULED_CHANGES_ENABLED", True) or not app.config.get("BACKGROUND_WORKERS", True):
+        return
+    with app.app_context():
+        url = db.engine.url
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        return
+    scheduler = ChangeScheduler(app, interval=app.config.get("SCHEDULED_CHANGES_INTERVAL", 5.0))
+    app.extensions["change_scheduler"] = scheduler
+    scheduler.start()
@@ -0,0 +1,38 @@
+"""
+Removes redundant TenantFeature overrides.
+
+TenantFeature rows only need to exist where a tenant deviates from a
+feature's default_enabled. Rows that match the default (left over from
+before defaults existed, or from a default that has since changed) and rows
+without any state are deleted in batches; no tenant's effective feature
+state changes. Run it after changing feature defaults, or periodically:
+
+    python compact_tenant_features.py --dry-run
+    python compact_tenant_features.py --batch-size 5000
+"""
+import argparse
+import json
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Delete TenantFeature rows that match their feature's default.")
+    parser.add_argument("--database-url", help="Defaults to the app's configured database.")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--dry-run", action="store_true", help="Only count the redundant rows.")
+    args = parser.parse_args(argv)
+
+    from app import create_app
+    from services.tenant_feature_service import tenant_feature_service
+    overrides = {"BACKGROUND_WORKERS": False}
+    if args.database_url:
+        overrides["SQLALCHEMY_DATABASE_URI"] = args.database_url
+    app = create_app("api", overrides)
+
+    with app.app_context():
+        summary = tenant_feature_service.compact_overrides(batch_size=args.batch_size, dry_run=args.dry_run)
+    print(json.dumps(summary))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,202 @@
+"""
+Response compression.
+
+An after_request hook negotiates brotli (when the optional brotli package
+is installed) or gzip for compressible responses at or above
+COMPRESSION_MIN_SIZE bytes. Responses that already carry a
+Content-Encoding, opt out with Cache-Control: no-transform, or are file
+passthroughs are left alone. Streamed responses are compressed on the fly
+and flushed every STREAM_FLUSH_BYTES of input, so clients keep receiving
+data while it is produced without paying a flush per tiny chunk.
+
+Static files are served from precompressed siblings (app.js.br,
+app.js.gz) when they exist. They are produced by the build step:
+
+    python -m compression static
+"""
+import argparse
+import gzip
+import os
+import zlib
+
+from flask import current_app, request, send_from_directory
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = (
+    "text/html", "text/css", "text/plain", "text/javascript", "application/javascript",
+    "application/json", "application/yaml", "image/svg+xml",
+)
+PRECOMPRESSED_EXTENSIONS = {"br": ".br", "gzip": ".gz"}
+PRECOMPRESS_SUFFIXES = (".js", ".css")
+STREAM_FLUSH_BYTES = 8192
+
+
+def available_encodings():
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def encoded_etags(etag):
+    """Returns the ETag as sent unencoded and under each encoding, for routes that compare If-None-Match themselves."""
+    return [etag] + [f"{etag}-{encoding}" for encoding in available_encodings()]
+
+
+def choose_encoding(accept_encodings, encodings):
+    """Picks the client's highest-weighted encoding, preferring the order given on ties."""
+    best, best_quality = None, 0
+    for encoding in encodings:
+        quality = accept_encodings[encoding]
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress_bytes(data, encoding, level):
+    if encoding == "br":
+        return brotli.compress(data, quality=min(level, 11))
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def _stream_compressor(encoding, level):
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=min(level, 11))
+        return compressor.process, compressor.flush, compressor.finish
+    # wbits=31 writes a gzip header and trailer around the deflate stream.
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    return compressor.compress, lambda: compressor.flush(zlib.Z_SYNC_FLUSH), compressor.flush
+
+
+def compress_stream(chunks, encoding, level, flush_bytes=STREAM_FLUSH_BYTES):
+    """Yields a compressed stream, flushing once flush_bytes of input are pending."""
+    process, flush, finish = _stream_compressor(encoding, level)
+    pending = 0
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode("utf-8")
+        if not chunk:
+            continue
+        output = process(chunk)
+        pending += len(chunk)
+        if pending >= flush_bytes:
+            output += flush()
+            pending = 0
+        if output:
+            yield output
+    yield finish()
+
+
+def _mark_encoded(response, encoding):
+    response.headers["Content-Encoding"] = encoding
+    response.vary.add("Accept-Encoding")
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(f"{etag}-{encoding}", weak)
+
+
+def _is_fresh(path, source):
+    try:
+        return os.path.getmtime(path) >= os.path.getmtime(source)
+    except OSError:
+        return False
+
+
+def _serve_precompressed(response, encoding):
+    filename = (request.view_args or {}).get("filename")
+    if not filename or not filename.endswith(PRECOMPRESS_SUFFIXES):
+        return response
+    static_folder = current_app.static_folder
+    source = os.path.join(static_folder, filename)
+    for candidate in (encoding, "gzip"):
+        extension = PRECOMPRESSED_EXTENSIONS.get(candidate)
+        # A sibling older than its source is left over from a previous build.
+        if extension and _is_fresh(source + extension, source):
+            precompressed = send_from_directory(static_folder, filename + extension, mimetype=response.mimetype)
+            precompressed.headers["Content-Encoding"] = candidate
+            precompressed.vary.add("Accept-Encoding")
+            return precompressed
+    return response
+
+
+def compress_response(response):
+    config = current_app.config
+    if not config["COMPRESSION_ENABLED"] or request.method == "HEAD":
+        return response
+    if response.status_code < 200 or response.status_code in (204, 206, 304):
+        return response
+    if "Content-Encoding" in response.headers or "no-transform" in response.headers.get("Cache-Control", ""):
+        return response
+    if response.mimetype not in COMPRESSIBLE_MIMETYPES:
+        return response
+
+    encoding = choose_encoding(request.accept_encodings, available_encodings())
+    if encoding is None:
+        return response
+
+    if request.endpoint == "static":
+        return _serve_precompressed(response, encoding)
+    if response.direct_passthrough:
+        return response
+
+    level = config["COMPRESSION_LEVEL"]
+    if response.is_streamed:
+        if not config["COMPRESSION_STREAMING"]:
+            return response
+        response.response = compress_stream(response.response, encoding, level)
+        response.headers.pop("Content-Length", None)
+        _mark_encoded(response, encoding)
+        return response
+
+    data = response.get_data()
+    if len(data) < config["COMPRESSION_MIN_SIZE"]:
+        return response
+    response.set_data(compress_bytes(data, encoding, level))
+    _mark_encoded(response, encoding)
+    return response
+
+
+def init_compression(app):
+    app.after_request(compress_response)
+
+
+def precompress_static(static_folder, min_size=0, level=9):
+    """
+    Writes .gz (and .br when brotli is installed) next to every JS and CSS
+    file under static_folder that is at least min_size bytes. Returns the
+    paths written.
+    """
+    written = []
+    for root, _, files in os.walk(static_folder):
+        for name in sorted(files):
+            if not name.endswith(PRECOMPRESS_SUFFIXES):
+                continue
+            path = os.path.join(root, name)
+            with open(path, "rb") as f:
+                data = f.read()
+            if len(data) < min_size:
+                continue
+            for encoding in available_encodings():
+                target = path + PRECOMPRESSED_EXTENSIONS[encoding]
+                with open(target, "wb") as f:
+                    f.write(compress_bytes(data, encoding, level))
+                written.append(target)
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Precompress static JS and CSS assets.")
+    parser.add_argument("static_folder", nargs="?", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "static"))
+    parser.add_argument("--min-size", type=int, default=0)
+    args = parser.parse_args(argv)
+    written = precompress_static(args.static_folder, args.min_size)
+    for path in written:
+        print(path)
+    if brotli is None:
+        print("brotli is not installed; only gzip files were written.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,133 @@
+"""
+Runs independent service calls concurrently for a single request.
+
+Each call runs on a shared, bounded thread pool inside its own app context,
+so it gets its own scoped SQLAlchemy session (and its own pooled
+connection), and the session is removed when the call finishes. Database
+statistics recorded by the workers are merged back into the request's
+RequestDbStats, so query budgets and X-DB-* headers still cover the whole
+request. Page latency becomes that of the slowest call rather than the sum.
+
+    data = load_concurrently({
+        "tenants": tenant_service.get_all_tenants,
+        "products": lambda: product_service.get_all_products(minimal=True),
+    })
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app, g, has_app_context
+
+from db_instrumentation import RequestDbStats, get_request_db_stats
+from extensions import db
+
+log = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor(max_workers):
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="concurrent-loader")
+    return _executor
+
+
+def _run_in_app_context(app, fn, n_plus_one_detector):
+    with app.app_context():
+        g._db_stats = RequestDbStats()
+        if n_plus_one_detector is not None:
+            g._n_plus_one_detector = n_plus_one_detector
+        return fn(), g._db_stats
+
+
+def _merge_stats(stats, worker_stats):
+    if stats is None:
+        return
+    stats.query_count += worker_stats.query_count
+    stats.db_time += worker_stats.db_time
+    stats.pool_wait_time += worker_stats.pool_wait_time
+
+
+def _runs_inline(app, calls):
+    if len(calls) <= 1 or app.config.get("CONCURRENT_LOADER_WORKERS", 0) <= 1:
+        return True
+    # SQLite serializes access anyway, and the in-memory database shares one
+    # connection between threads, so fanning out only adds contention.
+    return db.engine.dialect.name == "sqlite"
+
+
+def _run_inline(calls, return_exceptions):
+    results = {}
+    for name, fn in calls.items():
+        try:
+            results[name] = fn()
+        except Exception as e:
+            if not return_exceptions:
+                raise
+            results[name] = e
+    return results
+
+
+def load_concurrently(calls, return_exceptions=False):
+    """
+    Runs each zero-argument callable in `calls` ({name: callable}) and
+    returns {name: result}. Calls run in parallel when
+    CONCURRENT_LOADER_WORKERS > 1. If a call raises, the exception of the
+    first failing call (in dict order) is re-raised, matching what
+    sequential code would have done; with return_exceptions=True the
+    exception is returned in place of that call's result instead.
+    """
+    if not has_app_context() or _runs_inline(current_app, calls):
+        return _run_inline(calls, return_exceptions)
+
+    app = current_app._get_current_object()
+
+    executor = _get_executor(app.config["CONCURRENT_LOADER_WORKERS"])
+    detector = g.get("_n_plus_one_detector")
+    futures = {name: executor.submit(_run_in_app_context, app, fn, detector) for name, fn in calls.items()}
+
+    stats = get_request_db_stats()
+    results = {}
+    error = None
+    for name, future in futures.items():
+        try:
+            results[name], worker_stats = future.result()
+        except Exception as e:
+            if return_exceptions:
+                results[name] = e
+            elif error is None:
+                error = e
+            continue
+        _merge_stats(stats, worker_stats)
+    if error is not None:
+        raise error
+    return results
+
+
+def run_in_background(fn):
+    """
+    Starts a zero-argument callable on the shared pool in its own app
+    context without waiting for it, and returns its Future. Where
+    load_concurrently would run calls inline (no app context, SQLite, or
+    CONCURRENT_LOADER_WORKERS <= 1) it runs fn now and returns None.
+    Exceptions raised in the background are logged.
+    """
+    if not has_app_context() or _runs_inline(current_app, (fn, fn)):
+        fn()
+        return None
+
+    app = current_app._get_current_object()
+    future = _get_executor(app.config["CONCURRENT_LOADER_WORKERS"]).submit(_run_in_app_context, app, fn, None)
+    future.add_done_callback(_log_background_error)
+    return future
+
+
+def _log_background_error(future):
+    error = future.exception()
+    if error is not None:
+        log.error(f"Background call failed: {error}", exc_info=error)
@@ -0,0 +1,285 @@
+"""
+Client for services that check tenant features and modules on hot paths.
+
+ConfigurationClient keeps a local snapshot of each tenant's configuration
+bundle (GET /api/tenants/<id>/configuration-bundle: the enabled features and
+the modules configured per branch and product) and answers checks from it,
+so a check is a dict lookup and a set membership test with no I/O:
+
+    client = ConfigurationClient("http://config:5000", tenant_ids=[1, 2], refresh_interval=30)
+    client.start()
+    if client.is_feature_enabled(1, feature_id=7):
+        ...
+    client.is_module_configured(1, branch_id=3, product_id=2, module_id=5)
+
+A tenant that was not listed is fetched on its first check and tracked from
+then on. A background thread refreshes every tracked tenant each
+refresh_interval seconds with a conditional request: it sends the held
+version as since_version and its ETag as If-None-Match, so an unchanged
+tenant costs a 304 and a changed one usually only the difference.
+
+When a refresh fails (server unreachable, timeout, 5xx) the client keeps
+serving the last snapshot it holds and retries on the next round;
+is_stale() tells callers how old that snapshot is. With cache_dir every
+snapshot is also written to disk, so a restarted process can serve the last
+known configuration before the server is reachable again. A tenant the
+server reports as not found is dropped, and its checks return the default.
+
+The module only uses the standard library. Requests go through a transport:
+HttpTransport (urllib) by default, or FlaskClientTransport to run the client
+against a Flask test client without a network.
+"""
+import json
+import logging
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+
+log = logging.getLogger(__name__)
+
+BUNDLE_PATH = "/api/tenants/{tenant_id}/configuration-bundle"
+
+
+class HttpTransport:
+    """GETs paths relative to base_url with urllib."""
+    def __init__(self, base_url, timeout=2.0):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def get(self, path, headers):
+        """Returns (status, headers, body); raises OSError when the server cannot be reached."""
+        request = urllib.request.Request(self.base_url + path, headers=headers)
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return response.status, response.headers, response.read()
+        except urllib.error.HTTPError as e:
+            # urllib reports 304 and error statuses as exceptions.
+            return e.code, e.headers, e.read()
+
+
+class FlaskClientTransport:
+    """Sends the requests to a Flask test client instead of the network."""
+    def __init__(self, test_client):
+        self.test_client = test_client
+
+    def get(self, path, headers):
+        response = self.test_client.get(path, headers=headers)
+        return response.status_code, response.headers, response.get_data()
+
+
+class TenantSnapshot:
+    """One tenant's bundle as received, indexed for checks."""
+    __slots__ = ('tenant_id', 'version', 'etag', 'bundle', 'features', 'modules', 'checked_at')
+
+    def __init__(self, bundle, etag=None, checked_at=None):
+        self.tenant_id = bundle['tenant_id']
+        self.version = bundle.get('version')
+        self.etag = etag
+        self.bundle = bundle
+        self.features = frozenset(feature['feature_id'] for feature in bundle['features'])
+        self.modules = {
+            (branch['branch_id'], product['product_id']): frozenset(product['module_ids'])
+            for branch in bundle['branches']
+            for product in branch['products']
+        }
+        self.checked_at = time.monotonic() if checked_at is None else checked_at
+
+
+def apply_delta(bundle, delta):
+    """Returns the bundle a delta response describes, given the bundle it was computed against."""
+    merged = dict(bundle, version=delta['version'], tenant=delta.get('tenant', bundle['tenant']))
+    for name, key in (('features', 'feature_id'), ('branches', 'branch_id')):
+        removed = set(delta[name]['remove'])
+        upserts = {item[key]: item for item in delta[name]['upsert']}
+        items = [upserts.pop(item[key], item) for item in bundle[name] if item[key] not in removed]
+        merged[name] = items + list(upserts.values())
+    return merged
+
+
+class ConfigurationClient:
+    """
+    Local, background-refreshed cache of tenant configuration bundles.
+    Checks never block on the network except for the first check of a
+    tenant that is neither tracked nor cached on disk.
+    """
+    def __init__(self, base_url=None, tenant_ids=(), refresh_interval=30.0, timeout=2.0,
+                 transport=None, cache_dir=None, stale_after=None):
+        if transport is None:
+            if base_url is None:
+                raise ValueError("Either base_url or transport is required.")
+            transport = HttpTransport(base_url, timeout)
+        self.transport = transport
+        self.refresh_interval = refresh_interval
+        self.stale_after = stale_after if stale_after is not None else 3 * refresh_interval
+        self.cache_dir = cache_dir
+        self.stats = {"snapshots": 0, "deltas": 0, "not_modified": 0, "failures": 0}
+        self._snapshots = {}
+        self._tracked = {tenant_id: 0.0 for tenant_id in tenant_ids}
+        self._failing = set()
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Loads the tracked tenants, then refreshes them in the background."""
+        for tenant_id in list(self._tracked):
+            if not self.refresh(tenant_id):
+                self._load_from_disk(tenant_id)
+        if self._thread is None and self.refresh_interval > 0:
+            self._thread = threading.Thread(target=self._run, name="config-client-refresh", daemon=True)
+            self._thread.start()
+        return self
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _run(self):
+        while not self._stop.wait(self.refresh_interval):
+            self.refresh_all()
+
+    def refresh_all(self):
+        """Refreshes every tracked tenant once; returns how many refreshes failed."""
+        with self._lock:
+            tenant_ids = list(self._tracked)
+        return sum(not self.refresh(tenant_id) for tenant_id in tenant_ids)
+
+    def refresh(self, tenant_id):
+        """
+        Brings one tenant's snapshot up to date. Returns False when the
+        server could not be asked, in which case the snapshot held so far
+        stays in use.
+        """
+        with self._refresh_lock:
+            with self._lock:
+                self._tracked[tenant_id] = time.monotonic()
+            held = self._snapshots.get(tenant_id)
+            path = BUNDLE_PATH.format(tenant_id=tenant_id)
+            headers = {"Accept": "application/json"}
+            if held is not None and held.version is not None:
+                path += f"?since_version={held.version}"
+                if held.etag:
+                    headers["If-None-Match"] = held.etag
+            try:
+                status, response_headers, body = self.transport.get(path, headers)
+                if status == 304 and held is not None:
+                    held.checked_at = time.monotonic()
+                    self.stats["not_modified"] += 1
+                elif status == 404:
+                    self._drop(tenant_id)
+                elif status == 200:
+                    self._receive(tenant_id, held, json.loads(body), response_headers.get("ETag"))
+                else:
+                    raise OSError(f"HTTP {status}")
+            except Exception as e:
+                self.stats["failures"] += 1
+                if tenant_id not in self._failing:
+                    self._failing.add(tenant_id)
+                    log.warning(f"Could not refresh configuration of tenant {tenant_id}; serving the last known one: {e}")
+                return False
+            if tenant_id in self._failing:
+                self._failing.discard(tenant_id)
+                log.info(f"Configuration of tenant {tenant_id} is refreshing again.")
+            return True
+
+    def _receive(self, tenant_id, held, payload, etag):
+        mode = payload.pop('mode', 'snapshot')
+        if mode == 'unchanged' and held is not None:
+            held.checked_at = time.monotonic()
+            self.stats["not_modified"] += 1
+            return
+        if mode == 'delta':
+            if held is None or payload.get('since_version') != held.version:
+                raise ValueError(f"Delta against version {payload.get('since_version')} does not apply to the held snapshot.")
+            bundle = apply_delta(held.bundle, payload)
+            self.stats["deltas"] += 1
+        else:
+            bundle = payload
+            self.stats["snapshots"] += 1
+        snapshot = TenantSnapshot(bundle, etag)
+        self._snapshots[tenant_id] = snapshot
+        self._save_to_disk(snapshot)
+
+    def _drop(self, tenant_id):
+        self._snapshots.pop(tenant_id, None)
+        with self._lock:
+            self._tracked.pop(tenant_id, None)
+        if self.cache_dir:
+            try:
+                os.remove(self._cache_path(tenant_id))
+            except FileNotFoundError:
+                pass
+
+    def _cache_path(self, tenant_id):
+        return os.path.join(self.cache_dir, f"tenant-{tenant_id}.json")
+
+    def _save_to_disk(self, snapshot):
+        if not self.cache_dir:
+            return
+        path = self._cache_path(snapshot.tenant_id)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(f"{path}.tmp", "w") as f:
+                json.dump({"etag": snapshot.etag, "bundle": snapshot.bundle}, f)
+            os.replace(f"{path}.tmp", path)
+        except OSError as e:
+            log.warning(f"Could not write the configuration cache {path}: {e}")
+
+    def _load_from_disk(self, tenant_id):
+        if not self.cache_dir or tenant_id in self._snapshots:
+            return None
+        try:
+            with open(self._cache_path(tenant_id)) as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return None
+        # Never counted as fresh: the next successful refresh replaces it.
+        snapshot = TenantSnapshot(cached["bundle"], cached.get("etag"), checked_at=float("-inf"))
+        self._snapshots.setdefault(tenant_id, snapshot)
+        return self._snapshots[tenant_id]
+
+    def snapshot(self, tenant_id):
+        """Returns the tenant's TenantSnapshot, fetching it on first use, or None when it is unavailable."""
+        snapshot = self._snapshots.get(tenant_id)
+        if snapshot is not None:
+            return snapshot
+        with self._lock:
+            last_attempt = self._tracked.get(tenant_id)
+        # A tenant that could not be fetched waits for the background refresh instead of retrying on every check.
+        if last_attempt is None or time.monotonic() - last_attempt >= self.refresh_interval:
+            self.refresh(tenant_id)
+        return self._snapshots.get(tenant_id) or self._load_from_disk(tenant_id)
+
+    def is_feature_enabled(self, tenant_id, feature_id, default=False):
+        snapshot = self.snapshot(tenant_id)
+        return default if snapshot is None else feature_id in snapshot.features
+
+    def enabled_features(self, tenant_id):
+        snapshot = self.snapshot(tenant_id)
+        return frozenset() if snapshot is None else snapshot.features
+
+    def is_module_configured(self, tenant_id, branch_id, product_id, module_id, default=False):
+        snapshot = self.snapshot(tenant_id)
+        if snapshot is None:
+            return default
+        return module_id in snapshot.modules.get((branch_id, product_id), ())
+
+    def configured_modules(self, tenant_id, branch_id, product_id):
+        snapshot = self.snapshot(tenant_id)
+        return frozenset() if snapshot is None else snapshot.modules.get((branch_id, product_id), frozenset())
+
+    def is_stale(self, tenant_id):
+        """True when the tenant's snapshot has not been confirmed by the server within stale_after seconds."""
+        snapshot = self._snapshots.get(tenant_id)
+        return snapshot is None or time.monotonic() - snapshot.checked_at > self.stale_after
@@ -0,0 +1,107 @@
+import logging
+import time
+
+from flask import g, has_app_context, current_app, request
+from sqlalchemy import event
+
+log = logging.getLogger(__name__)
+
+
+class RequestDbStats:
+    """Accumulates database activity for a single request."""
+    def __init__(self):
+        self.query_count = 0
+        self.db_time = 0.0
+        self.pool_wait_time = 0.0
+
+    def to_dict(self):
+        return {
+            "query_count": self.query_count,
+            "db_time_ms": round(self.db_time * 1000, 3),
+            "pool_wait_ms": round(self.pool_wait_time * 1000, 3),
+        }
+
+
+def get_request_db_stats():
+    """
+    Returns the RequestDbStats for the current request, or None when called
+    outside of an instrumented request.
+    """
+    if not has_app_context():
+        return None
+    return g.get("_db_stats")
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("_query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start_times = conn.info.get("_query_start_time")
+    if not start_times:
+        return
+    elapsed = time.perf_counter() - start_times.pop()
+    stats = get_request_db_stats()
+    if stats is not None:
+        stats.query_count += 1
+        stats.db_time += elapsed
+
+
+def _instrument_pool(engine):
+    """
+    Wraps the engine pool's connect() so time spent waiting for a pooled
+    connection is attributed to the current request.
+    """
+    pool = engine.pool
+    original_connect = pool.connect
+
+    def timed_connect():
+        start = time.perf_counter()
+        try:
+            return original_connect()
+        finally:
+            stats = get_request_db_stats()
+            if stats is not None:
+                stats.pool_wait_time += time.perf_counter() - start
+
+    pool.connect = timed_connect
+
+
+def _start_request_stats():
+    g._db_stats = RequestDbStats()
+
+
+def _finish_request_stats(response):
+    stats = get_request_db_stats()
+    if stats is None:
+        return response
+
+    budget = current_app.config.get("DB_QUERY_BUDGET")
+    if budget and stats.query_count > budget:
+        log.warning(
+            "Query budget exceeded for %s %s (endpoint=%s): %d queries (budget %d), db_time=%.1fms, pool_wait=%.1fms",
+            request.method, request.path, request.endpoint, stats.query_count, budget,
+            stats.db_time * 1000, stats.pool_wait_time * 1000
+        )
+
+    if current_app.config.get("DB_EXPOSE_REQUEST_STATS"):
+        response.headers["X-DB-Query-Count"] = str(stats.query_count)
+        response.headers["X-DB-Time-Ms"] = f"{stats.db_time * 1000:.3f}"
+        response.headers["X-DB-Pool-Wait-Ms"] = f"{stats.pool_wait_time * 1000:.3f}"
+    return response
+
+
+def init_db_instrumentation(app, db):
+    """
+    Attaches query timing and pool wait hooks to every engine bound to `db`
+    and registers per-request hooks that reset, report and optionally expose
+    the collected statistics.
+    """
+    with app.app_context():
+        for engine in db.engines.values():
+            event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+            event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+            _instrument_pool(engine)
+
+    app.before_request(_start_request_stats)
+    app.after_request(_finish_request_stats)
@@ -0,0 +1,107 @@
+"""
+Dialect-portable column types and constraints for the models.
+
+Production runs on MySQL and the DDL emitted there is unchanged. On SQLite
+(in-memory test and benchmark runs) the MySQL-only constructs are swapped:
+LONGTEXT and utf8mb4_bin collations fall back to plain TEXT, JSON_VALID
+checks tolerate NULL the way MySQL does, BIGINT/SMALLINT primary keys
+become INTEGER so they alias the rowid and autoincrement, and composite
+primary keys that carry an autoincrement column are narrowed to that column.
+ENUM values are matched case-insensitively, as MySQL's default collation does,
+and foreign keys are enforced, as InnoDB does.
+"""
+import sqlite3
+
+import sqlalchemy as sa
+from sqlalchemy.dialects.mysql import LONGTEXT
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.schema import CreateColumn, PrimaryKeyConstraint
+
+MYSQL_DIALECTS = ("mysql", "mariadb")
+
+BigIntegerPK = sa.BigInteger().with_variant(sa.Integer(), "sqlite")
+SmallIntegerPK = sa.SmallInteger().with_variant(sa.Integer(), "sqlite")
+
+
+class _CaseInsensitiveEnum(sa.types.TypeDecorator):
+    """String-backed enum that stores the canonical spelling of each value."""
+    impl = sa.String
+    cache_ok = True
+
+    def __init__(self, *values):
+        super().__init__(length=max(len(value) for value in values))
+        self.canonical = {value.lower(): value for value in values}
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return self.canonical.get(value.lower(), value)
+
+
+def portable_enum(*values, **kwargs):
+    """
+    Native ENUM on MySQL; elsewhere a string column that folds case on write,
+    so values such as 'active' behave as they do against MySQL.
+    """
+    return sa.Enum(*values, **kwargs).with_variant(_CaseInsensitiveEnum(*values), "sqlite")
+
+
+def binary_text(long=False):
+    """
+    utf8mb4_bin TEXT (or LONGTEXT) on MySQL, plain TEXT everywhere else.
+    """
+    mysql_type = LONGTEXT(collation='utf8mb4_bin') if long else sa.Text(collation='utf8mb4_bin')
+    return sa.Text().with_variant(mysql_type, *MYSQL_DIALECTS)
+
+
+def json_valid_check(column_name, name):
+    """
+    Returns the CHECK constraints that keep a text column valid JSON.
+    MySQL keeps its original JSON_VALID() check; SQLite gets json_valid()
+    guarded for NULL, since SQLite's json_valid(NULL) is 0 rather than NULL.
+    Other dialects get no check.
+    """
+    return (
+        sa.CheckConstraint(f"JSON_VALID({column_name})", name=name).ddl_if(dialect=MYSQL_DIALECTS),
+        sa.CheckConstraint(f"{column_name} IS NULL OR json_valid({column_name})", name=name).ddl_if(dialect="sqlite"),
+    )
+
+
+def _composite_autoincrement_column(constraint):
+    autoincrement_columns = [column for column in constraint.columns if column.autoincrement is True]
+    if len(constraint.columns) > 1 and len(autoincrement_columns) == 1:
+        return autoincrement_columns[0]
+    return None
+
+
+@compiles(CreateColumn, "sqlite")
+def _compile_sqlite_column(element, compiler, **kw):
+    # The SQLite compiler refuses autoincrement on a composite key outright;
+    # the key is narrowed to this column below, so render it as a plain column.
+    column = element.element
+    if column.primary_key and column is _composite_autoincrement_column(column.table.primary_key):
+        type_ = compiler.dialect.type_compiler_instance.process(column.type, type_expression=column)
+        return f"{compiler.preparer.format_column(column)} {type_} NOT NULL"
+    return compiler.visit_create_column(element, **kw)
+
+
+@compiles(PrimaryKeyConstraint, "sqlite")
+def _compile_sqlite_primary_key(constraint, compiler, **kw):
+    # SQLite only autoincrements a single INTEGER PRIMARY KEY column, so a
+    # composite key with an explicit autoincrement column keeps just that column.
+    # The remaining key columns are declared unique on the models already.
+    column = _composite_autoincrement_column(constraint)
+    if column is not None:
+        text = ""
+        if constraint.name is not None:
+            text += f"CONSTRAINT {compiler.preparer.format_constraint(constraint)} "
+        return text + f"PRIMARY KEY ({compiler.preparer.quote(column.name)})"
+    return compiler.visit_primary_key_constraint(constraint, **kw)
+
+
+@sa.event.listens_for(sa.engine.Engine, "connect")
+def _enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
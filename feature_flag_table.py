@@ -0,0 +1,433 @@
+"""
+Shared-memory tenant x feature flag table.
+
+The effective feature state of every tenant (its TenantFeature override,
+otherwise the feature's default or rollout, as in
+TenantFeatureService.build_feature_status) is written
+to one fixed-layout bitset file that every worker process maps read-only
+with mmap. The mapped pages live in the OS page cache once, however many
+workers map them, and a lookup is a few bit tests on the mapping with nothing
+to deserialize.
+
+File layout (little-endian):
+
+    header      HEADER_SIZE bytes: magic, layout version, generation,
+                min_tenant_id, tenant_slots, feature_slots, row_bytes
+    tenants     ceil(tenant_slots / 8) bytes, bit (tenant_id - min_tenant_id)
+                set when the tenant exists
+    features    row_bytes bytes, bit feature_id set when the feature exists
+    matrix      tenant_slots rows of row_bytes bytes, bit feature_id of row
+                (tenant_id - min_tenant_id) set when the feature is enabled
+
+The table is rebuilt whenever the invalidation bus reports a tenant, Feature
+or tenant feature change, made by this node or another. Of the worker
+processes sharing the file, one is elected to rebuild it on a background
+thread (see FeatureFlagRefresher); the others only map it, so an
+invalidation costs one rebuild per host rather than one per worker. The
+rebuild also takes an exclusive lock on "<path>.lock" before reading the
+database, so a manual refresh never interleaves with the leader's and the
+last writer always saw the newest committed state. The new file is written next to the old one and swapped in
+with os.replace(), so readers see either the old table or the new one,
+never a torn write. Readers notice the swap within
+FEATURE_FLAG_TABLE_CHECK_INTERVAL seconds and remap.
+
+Tenant ids are mapped densely from the smallest to the largest id, so the
+file grows with the id range rather than with the number of tenants.
+"""
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+
+from flask import current_app, has_app_context
+from sqlalchemy import select
+
+from extensions import db
+from feature_rollout import compile_rollout
+from invalidation_bus import subscribe
+from metrics import registry
+from models import Tenant, Feature, TenantFeature
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+log = logging.getLogger(__name__)
+
+MAGIC = b"TFFLAGS\0"
+LAYOUT_VERSION = 1
+HEADER = struct.Struct("<8sIQqQII")
+HEADER_SIZE = 64
+# Refuse to write tables larger than this (sparse tenant ids over a huge range).
+MAX_TABLE_BYTES = 256 * 1024 * 1024
+
+REFRESHES = registry.counter(
+    "feature_flag_table_refreshes_total", "Feature flag table rebuilds by outcome (written, failed, skipped).", ("outcome",)
+)
+
+
+def _set_bit(buffer, offset, bit):
+    buffer[offset + (bit >> 3)] |= 1 << (bit & 7)
+
+
+def _clear_bit(buffer, offset, bit):
+    buffer[offset + (bit >> 3)] &= ~(1 << (bit & 7)) & 0xFF
+
+
+def build_table(connection, generation):
+    """Reads the current tenant feature state and returns the table file's bytes, or None if it is too large."""
+    tenants = connection.execute(select(Tenant.tenant_id, Tenant.country_id)).all()
+    tenant_ids = [tenant_id for tenant_id, _ in tenants]
+    features = connection.execute(select(Feature.feature_id, Feature.default_enabled, Feature.rollout)).all()
+    feature_ids = [feature_id for feature_id, _, _ in features]
+    overrides = connection.execute(
+        select(TenantFeature.tenant_id, TenantFeature.feature_id, TenantFeature.is_enabled)
+        .where(TenantFeature.tenant_id.is_not(None), TenantFeature.feature_id.is_not(None),
+               TenantFeature.is_enabled.is_not(None))
+    ).all()
+
+    min_tenant_id = min(tenant_ids) if tenant_ids else 0
+    tenant_slots = max(tenant_ids) - min_tenant_id + 1 if tenant_ids else 0
+    feature_slots = max(feature_ids) + 1 if feature_ids else 0
+    row_bytes = (feature_slots + 63) // 64 * 8
+    tenants_offset = HEADER_SIZE
+    features_offset = tenants_offset + (tenant_slots + 7) // 8
+    matrix_offset = features_offset + row_bytes
+    size = matrix_offset + tenant_slots * row_bytes
+    if size > MAX_TABLE_BYTES:
+        log.error(f"Feature flag table would be {size} bytes (tenant ids {min_tenant_id}..{min_tenant_id + tenant_slots - 1}); not writing it.")
+        return None
+
+    buffer = bytearray(size)
+    HEADER.pack_into(buffer, 0, MAGIC, LAYOUT_VERSION, generation, min_tenant_id, tenant_slots, feature_slots, row_bytes)
+    default_row = bytearray(row_bytes)
+    rollouts = []
+    for feature_id, default_enabled, rollout in features:
+        _set_bit(buffer, features_offset, feature_id)
+        if default_enabled:
+            _set_bit(default_row, 0, feature_id)
+        elif compile_rollout(rollout) is not None:
+            rollouts.append((feature_id, compile_rollout(rollout)))
+    # Every existing tenant starts from the defaults and its rollouts; its overrides are applied below.
+    for tenant_id, country_id in tenants:
+        slot = tenant_id - min_tenant_id
+        _set_bit(buffer, tenants_offset, slot)
+        row = matrix_offset + slot * row_bytes
+        buffer[row:row + row_bytes] = default_row
+        for feature_id, rollout in rollouts:
+            if rollout.includes(feature_id, tenant_id, country_id):
+                _set_bit(buffer, row, feature_id)
+    for tenant_id, feature_id, is_enabled in overrides:
+        slot = tenant_id - min_tenant_id
+        if 0 <= slot < tenant_slots and feature_id < feature_slots:
+            (_set_bit if is_enabled else _clear_bit)(buffer, matrix_offset + slot * row_bytes, feature_id)
+    return bytes(buffer)
+
+
+class _Mapping:
+    """One mapped generation of the table file."""
+    def __init__(self, mm, identity):
+        self.mm = mm
+        self.identity = identity
+        _, _, self.generation, self.min_tenant_id, self.tenant_slots, self.feature_slots, self.row_bytes = HEADER.unpack_from(mm, 0)
+        self.tenants_offset = HEADER_SIZE
+        self.features_offset = self.tenants_offset + (self.tenant_slots + 7) // 8
+        self.matrix_offset = self.features_offset + self.row_bytes
+
+
+class FeatureFlagTable:
+    """
+    Read side of the table: maps the file and answers lookups from the
+    mapping. A replaced file is remapped at most every `check_interval`
+    seconds; readers that still hold the previous mapping keep using it
+    until they are done, and it is unmapped once nothing references it.
+    """
+    def __init__(self, path, check_interval=1.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._mapping = None
+        self._checked_at = float("-inf")
+        self._lock = threading.Lock()
+
+    def _open(self):
+        try:
+            with open(self.path, "rb") as f:
+                stat = os.fstat(f.fileno())
+                identity = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+                if self._mapping is not None and self._mapping.identity == identity:
+                    return self._mapping
+                if stat.st_size < HEADER_SIZE:
+                    return None
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except FileNotFoundError:
+            return None
+        magic, version = HEADER.unpack_from(mm, 0)[:2]
+        if magic != MAGIC or version != LAYOUT_VERSION:
+            log.error(f"Ignoring feature flag table {self.path}: unknown layout {magic!r} v{version}.")
+            mm.close()
+            return None
+        return _Mapping(mm, identity)
+
+    def _current(self):
+        now = time.monotonic()
+        if now - self._checked_at >= self.check_interval:
+            with self._lock:
+                if now - self._checked_at >= self.check_interval:
+                    self._mapping = self._open()
+                    self._checked_at = now
+        return self._mapping
+
+    def reload(self):
+        """Remaps the file now instead of waiting for the next check."""
+        with self._lock:
+            self._checked_at = float("-inf")
+        return self._current()
+
+    @property
+    def generation(self):
+        mapping = self._current()
+        return mapping.generation if mapping is not None else None
+
+    def is_enabled(self, tenant_id: int, feature_id: int):
+        """
+        Returns True or False for a tenant and feature the table knows about,
+        and None when there is no table yet or either id is not in it (for
+        example a tenant created after the last rebuild); callers fall back
+        to the database then.
+        """
+        mapping = self._current()
+        if mapping is None:
+            return None
+        slot = tenant_id - mapping.min_tenant_id
+        if not 0 <= slot < mapping.tenant_slots or not 0 <= feature_id < mapping.feature_slots:
+            return None
+        mm = mapping.mm
+        if not mm[mapping.tenants_offset + (slot >> 3)] >> (slot & 7) & 1:
+            return None
+        if not mm[mapping.features_offset + (feature_id >> 3)] >> (feature_id & 7) & 1:
+            return None
+        return bool(mm[mapping.matrix_offset + slot * mapping.row_bytes + (feature_id >> 3)] >> (feature_id & 7) & 1)
+
+
+def _read_generation(path):
+    try:
+        with open(path, "rb") as f:
+            header = f.read(HEADER.size)
+    except FileNotFoundError:
+        return 0
+    if len(header) < HEADER.size:
+        return 0
+    magic, version, generation = HEADER.unpack(header)[:3]
+    return generation if magic == MAGIC and version == LAYOUT_VERSION else 0
+
+
+def write_table(path):
+    """
+    Rebuilds the table file from the database under the refresher lock and
+    atomically replaces the old one. Needs an app context. Returns the new
+    generation, or None if nothing was written.
+    """
+    with open(f"{path}.lock", "a") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        generation = _read_generation(path) + 1
+        with db.engine.connect() as connection:
+            data = build_table(connection, generation)
+        if data is None:
+            return None
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    return generation
+
+
+class FeatureFlagRefresher:
+    """
+    Rebuilds the table on request. Only one process per table file does: the
+    one whose refresher holds a non-blocking exclusive lock on
+    "<path>.leader", kept for the life of the process. The other workers only
+    remap the file; their refresh requests touch "<path>.requested", which
+    the leader checks every `poll_interval` seconds, and they retry the
+    election just as often so another worker takes over when the leader
+    exits. Requests that arrive while a rebuild is running collapse into one
+    more rebuild. The leader also rebuilds every `refresh_interval` seconds
+    (0 disables this) to pick up tenants and changes made by other hosts. In
+    inline mode (in-memory SQLite) the caller rebuilds it instead.
+    """
+    def __init__(self, app, path, refresh_interval=60.0, inline=False, poll_interval=1.0):
+        self.app = app
+        self.path = path
+        self.refresh_interval = refresh_interval
+        self.inline = inline
+        self.poll_interval = poll_interval
+        self._requested = threading.Event()
+        self._leader_file = None
+        self._refreshed_at = float("-inf")
+        self._seen_request = None
+        self._thread = None
+
+    def start(self):
+        if self.inline or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="feature-flag-refresher", daemon=True)
+        self._thread.start()
+
+    @property
+    def is_leader(self):
+        return self._leader_file is not None
+
+    def try_lead(self):
+        """Takes the leader lock unless another process holds it; returns whether this refresher leads."""
+        if self._leader_file is None:
+            leader_file = open(f"{self.path}.leader", "a")
+            if fcntl is not None:
+                try:
+                    fcntl.flock(leader_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    leader_file.close()
+                    return False
+            self._leader_file = leader_file
+            log.info(f"This process now rebuilds feature flag table {self.path}.")
+        return True
+
+    def close(self):
+        """Gives up leadership, so another worker's refresher takes over."""
+        if self._leader_file is not None:
+            self._leader_file.close()
+            self._leader_file = None
+
+    def _request_marker(self):
+        try:
+            return os.stat(f"{self.path}.requested").st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def request_refresh(self):
+        if self.inline:
+            self.refresh()
+        elif self.is_leader:
+            self._requested.set()
+        else:
+            marker = f"{self.path}.requested"
+            with open(marker, "a"):
+                pass
+            os.utime(marker)
+
+    def refresh(self):
+        try:
+            generation = write_table(self.path)
+        except Exception as e:
+            log.exception(f"Failed to rebuild feature flag table {self.path}: {e}")
+            REFRESHES.inc(outcome="failed")
+            return None
+        REFRESHES.inc(outcome="written" if generation is not None else "skipped")
+        return generation
+
+    def poll(self):
+        """
+        One pass of the refresher loop: rebuilds the table if this process
+        leads and a rebuild was requested here or by another worker, or the
+        refresh interval has passed. Returns the new generation, or None.
+        """
+        if not self.try_lead():
+            return None
+        marker = self._request_marker()
+        # A newly elected leader rebuilds at once: the previous one may have exited with requests pending.
+        elapsed = time.monotonic() - self._refreshed_at
+        due = elapsed == float("inf") or (self.refresh_interval and elapsed >= self.refresh_interval)
+        if not (self._requested.is_set() or marker != self._seen_request or due):
+            return None
+        self._requested.clear()
+        self._seen_request = marker
+        self._refreshed_at = time.monotonic()
+        return self.refresh()
+
+    def _run(self):
+        with self.app.app_context():
+            while True:
+                try:
+                    self.poll()
+                except Exception as e:
+                    log.exception(f"Feature flag refresher for {self.path} failed: {e}")
+                self._requested.wait(self.poll_interval)
+
+
+def refresh_feature_flags():
+    """
+    Asks for the flag table to be rebuilt. Does nothing outside an app
+    context or when the table is disabled.
+    """
+    if not has_app_context():
+        return
+    refresher = current_app.extensions.get("feature_flag_refresher")
+    if refresher is not None:
+        refresher.request_refresh()
+
+
+def _on_invalidation(entity_type, keys):
+    refresh_feature_flags()
+
+
+subscribe(("tenant", "feature", "tenant_feature"), _on_invalidation)
+
+
+def get_feature_flag_table():
+    """Returns the app's FeatureFlagTable, or None when it is disabled."""
+    if not has_app_context():
+        return None
+    return current_app.extensions.get("feature_flag_table")
+
+
+def default_table_filename(url):
+    """
+    Names the default table file after the database it mirrors, so apps on
+    different databases sharing an instance path never elect one leader or
+    read each other's flags.
+    """
+    digest = hashlib.sha1(url.render_as_string(hide_password=True).encode("utf-8")).hexdigest()[:12]
+    return f"feature_flags-{digest}.bin"
+
+
+def init_feature_flag_table(app):
+    """
+    Sets up the flag table for the app as app.extensions["feature_flag_table"]
+    (reader) and app.extensions["feature_flag_refresher"] (writer) and builds
+    the first table. An in-memory SQLite database is private to the process,
+    so it only gets a table when FEATURE_FLAG_TABLE_PATH is set explicitly.
+    Without BACKGROUND_WORKERS the same holds, and that table is rebuilt
+    inline instead of by an elected refresher thread.
+    """
+    if not app.config.get("FEATURE_FLAG_TABLE_ENABLED", True):
+        return
+    with app.app_context():
+        url = db.engine.url
+    in_memory = url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+    inline = in_memory or not app.config.get("BACKGROUND_WORKERS", True)
+    path = app.config.get("FEATURE_FLAG_TABLE_PATH")
+    if not path:
+        if inline:
+            return
+        os.makedirs(app.instance_path, exist_ok=True)
+        path = os.path.join(app.instance_path, default_table_filename(url))
+
+    refresher = FeatureFlagRefresher(
+        app, path, refresh_interval=app.config.get("FEATURE_FLAG_TABLE_REFRESH_INTERVAL", 60.0), inline=inline,
+        poll_interval=app.config.get("FEATURE_FLAG_TABLE_CHECK_INTERVAL", 1.0) or 1.0,
+    )
+    app.extensions["feature_flag_refresher"] = refresher
+    app.extensions["feature_flag_table"] = FeatureFlagTable(
+        path, check_interval=app.config.get("FEATURE_FLAG_TABLE_CHECK_INTERVAL", 1.0),
+    )
+    if inline:
+        with app.app_context():
+            refresher.refresh()
+    else:
+        # The leader builds the first table as soon as it is elected.
+        refresher.start()
@@ -0,0 +1,514 @@
+"""
+Cluster-wide cache invalidation bus.
+
+Every ORM flush that touches a tenant, branch, feature, tenant feature,
+module configuration, product, module or product module records the keys
+it affects, e.g. ("tenant_feature", "<tenant_id>:<feature_id>", tenant_id),
+and they are published once the transaction commits and dropped if it rolls
+back. So every write through the session is covered, whichever service or
+route made it. Writes that bypass the session (bulk statements, raw SQL)
+call publish_invalidation() themselves after committing. Caches register a
+handler for the entity types they hold with subscribe(); a handler receives
+the entity type and the (entity_id, tenant_id) keys to evict.
+
+A published key is dispatched to this process's subscribers at once, so the
+node that made a change never serves it stale, and queued for the
+transport. The sender thread waits INVALIDATION_BUS_COALESCE_WINDOW seconds
+after the first key of a burst and sends everything queued by then as one
+batch with duplicates removed. Other nodes dispatch what they receive to
+their own subscribers. Delivery is at-least-once: a batch that cannot be
+sent stays queued, a received batch whose handlers fail is not
+acknowledged, and handlers must therefore be idempotent (evictions are).
+
+Transports (INVALIDATION_BUS_TRANSPORT):
+
+    table   rows in the cache_invalidation table, polled by every node;
+            needs nothing but the database (default)
+    udp     JSON datagrams sent to INVALIDATION_BUS_UDP_PEERS and
+            acknowledged by each peer, retransmitted until acknowledged;
+            INVALIDATION_BUS_UDP_BIND must be set to an address of this
+            process alone (workers on one host each need their own port)
+    none    this process only
+
+An in-memory SQLite database is private to the process, so it never uses
+the table transport. Without BACKGROUND_WORKERS (tools and tests) there is
+no transport either and keys only reach this process's subscribers.
+"""
+import atexit
+import datetime
+import itertools
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from collections import OrderedDict, defaultdict
+
+from flask import current_app, has_app_context
+from sqlalchemy import delete, event, func, or_, select
+
+from extensions import db
+from metrics import registry
+from models import Branch, BranchProductModule, CacheInvalidation, Feature, Module, Product, ProductModule, Tenant, TenantFeature
+
+log = logging.getLogger(__name__)
+
+INVALIDATIONS = registry.counter(
+    "invalidation_bus_keys_total", "Invalidation keys by outcome (published, sent, received, failed, dropped).", ("outcome",)
+)
+
+_subscribers = defaultdict(list)
+_buses = []
+
+_PENDING_KEY = "_invalidation_bus_pending"
+
+
+def subscribe(entity_types, handler):
+    """Registers handler(entity_type, keys) for the given entity types; registering twice is a no-op."""
+    for entity_type in entity_types:
+        if handler not in _subscribers[entity_type]:
+            _subscribers[entity_type].append(handler)
+
+
+def dispatch(keys):
+    """
+    Calls the subscribers of each entity type once with its keys, duplicates
+    removed. Returns False if a handler raised.
+    """
+    keys_by_type = defaultdict(list)
+    for entity_type, entity_id, tenant_id in dict.fromkeys(keys):
+        keys_by_type[entity_type].append((entity_id, tenant_id))
+    delivered = True
+    for entity_type, entity_keys in keys_by_type.items():
+        for handler in list(_subscribers.get(entity_type, ())):
+            try:
+                handler(entity_type, entity_keys)
+            except Exception as e:
+                log.exception(f"Invalidation handler {handler!r} failed for {entity_type} {entity_keys}: {e}")
+                delivered = False
+    return delivered
+
+
+def _key(entity_type, entity_id, tenant_id):
+    return (entity_type, str(entity_id), int(tenant_id) if tenant_id is not None else None)
+
+
+class TableTransport:
+    """
+    Publishes batches as rows of cache_invalidation and polls for rows
+    written by other nodes. Rows are read by id, plus a look-back of
+    `grace` seconds for rows whose transaction committed after a newer id
+    was already read; rows older than `retention` seconds are deleted.
+    """
+    def __init__(self, app, node_id, poll_interval=1.0, grace=5.0, retention=3600.0, page_size=1000):
+        self.app = app
+        self.node_id = node_id
+        self.poll_interval = poll_interval
+        self.grace = datetime.timedelta(seconds=grace)
+        self.retention = datetime.timedelta(seconds=retention)
+        self.page_size = page_size
+        self._cursor = None
+        self._seen = OrderedDict()
+        self._pruned_at = 0.0
+        self._closed = threading.Event()
+        self._thread = None
+
+    def send(self, keys):
+        now = datetime.datetime.utcnow()
+        with db.engine.begin() as conn:
+            conn.execute(CacheInvalidation.__table__.insert(), [
+                {"node_id": self.node_id, "entity_type": entity_type, "entity_id": entity_id,
+                 "tenant_id": tenant_id, "created_at": now}
+                for entity_type, entity_id, tenant_id in keys
+            ])
+
+    def start(self, deliver):
+        self._thread = threading.Thread(target=self._run, args=(deliver,), name="invalidation-bus-poller", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self._closed.set()
+
+    def poll(self, deliver):
+        """Reads unseen rows from other nodes and delivers them; returns the number of keys delivered."""
+        table = CacheInvalidation.__table__
+        with db.engine.connect() as conn:
+            if self._cursor is None:
+                # Caches start empty, so there is nothing older to catch up on.
+                self._cursor = conn.execute(select(func.coalesce(func.max(table.c.invalidation_id), 0))).scalar()
+                return 0
+            look_back = datetime.datetime.utcnow() - self.grace
+            rows = conn.execute(
+                select(table)
+                .where(or_(table.c.invalidation_id > self._cursor, table.c.created_at >= look_back))
+                .order_by(table.c.invalidation_id)
+                .limit(self.page_size)
+            ).all()
+        rows = [row for row in rows if row.invalidation_id not in self._seen]
+        keys = [_key(row.entity_type, row.entity_id, row.tenant_id) for row in rows if row.node_id != self.node_id]
+        if keys and not deliver(keys):
+            return 0
+        for row in rows:
+            self._seen[row.invalidation_id] = row.created_at
+            self._cursor = max(self._cursor, row.invalidation_id)
+        while self._seen and next(iter(self._seen.values())) < look_back:
+            self._seen.popitem(last=False)
+        return len(keys)
+
+    def _prune(self):
+        with db.engine.begin() as conn:
+            conn.execute(delete(CacheInvalidation.__table__).where(
+                CacheInvalidation.__table__.c.created_at < datetime.datetime.utcnow() - self.retention
+            ))
+
+    def _run(self, deliver):
+        with self.app.app_context():
+            while True:
+                try:
+                    self.poll(deliver)
+                    if time.monotonic() - self._pruned_at >= self.retention.total_seconds() / 10:
+                        self._pruned_at = time.monotonic()
+                        self._prune()
+                except Exception as e:
+                    log.exception(f"Invalidation bus poll failed: {e}")
+                if self._closed.wait(self.poll_interval):
+                    return
+
+
+class UdpTransport:
+    """
+    Sends each batch as JSON datagrams to every peer and retransmits a
+    datagram every `retry_interval` seconds until each peer has acknowledged
+    it, giving up after `max_attempts`. Receivers acknowledge only after
+    their handlers succeeded and acknowledge repeats without dispatching
+    them again. Every process needs its own bind address.
+    """
+    MAX_KEYS_PER_DATAGRAM = 200
+
+    def __init__(self, node_id, bind, peers, retry_interval=0.2, max_attempts=5):
+        self.node_id = node_id
+        self.peers = {self._resolve(peer) for peer in peers}
+        self.retry_interval = retry_interval
+        self.max_attempts = max_attempts
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            self.sock.bind(self._resolve(bind))
+        except OSError as e:
+            self.sock.close()
+            raise OSError(e.errno, f"Cannot bind the invalidation bus to {bind} ({e.strerror}); "
+                                   "every process needs its own INVALIDATION_BUS_UDP_BIND address.") from e
+        self.sock.settimeout(retry_interval)
+        self._ids = itertools.count(1)
+        self._unacked = {}
+        self._recent = OrderedDict()
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def _resolve(address):
+        host, port = address.rsplit(":", 1) if isinstance(address, str) else address
+        return socket.gethostbyname(host or "0.0.0.0"), int(port)
+
+    @property
+    def address(self):
+        return self.sock.getsockname()
+
+    def send(self, keys):
+        if not self.peers:
+            return
+        for start in range(0, len(keys), self.MAX_KEYS_PER_DATAGRAM):
+            message_id = next(self._ids)
+            payload = json.dumps({
+                "type": "invalidate", "node": self.node_id, "id": message_id,
+                "keys": keys[start:start + self.MAX_KEYS_PER_DATAGRAM],
+            }).encode()
+            with self._lock:
+                self._unacked[message_id] = {
+                    "payload": payload, "peers": set(self.peers), "attempts": 1,
+                    "due": time.monotonic() + self.retry_interval,
+                }
+            for peer in self.peers:
+                self.sock.sendto(payload, peer)
+
+    def start(self, deliver):
+        self._thread = threading.Thread(target=self._run, args=(deliver,), name="invalidation-bus-udp", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self._closed.set()
+        if self._thread is not None:
+            self._thread.join(self.retry_interval * 2)
+        self.sock.close()
+
+    def pending(self):
+        with self._lock:
+            return len(self._unacked)
+
+    def _handle(self, data, sender, deliver):
+        message = json.loads(data)
+        if message["type"] == "ack":
+            with self._lock:
+                entry = self._unacked.get(message["id"])
+                if entry is not None:
+                    entry["peers"].discard(sender)
+                    if not entry["peers"]:
+                        del self._unacked[message["id"]]
+            return
+        if message["node"] == self.node_id:
+            return
+        seen_key = (message["node"], message["id"])
+        if seen_key not in self._recent:
+            if not deliver([_key(*key) for key in message["keys"]]):
+                return
+            self._recent[seen_key] = None
+            while len(self._recent) > 4096:
+                self._recent.popitem(last=False)
+        self.sock.sendto(json.dumps({"type": "ack", "id": message["id"]}).encode(), sender)
+
+    def _retransmit(self):
+        now = time.monotonic()
+        with self._lock:
+            due = [(message_id, entry) for message_id, entry in self._unacked.items() if entry["due"] <= now]
+            for message_id, entry in due:
+                if entry["attempts"] >= self.max_attempts:
+                    del self._unacked[message_id]
+                    log.warning(f"Invalidation datagram {message_id} was not acknowledged by {sorted(entry['peers'])}; giving up.")
+                    INVALIDATIONS.inc(outcome="dropped")
+                    continue
+                entry["attempts"] += 1
+                entry["due"] = now + self.retry_interval
+        for message_id, entry in due:
+            if message_id in self._unacked:
+                for peer in list(entry["peers"]):
+                    self.sock.sendto(entry["payload"], peer)
+
+    def _run(self, deliver):
+        while not self._closed.is_set():
+            try:
+                data, sender = self.sock.recvfrom(65535)
+                self._handle(data, sender, deliver)
+            except socket.timeout:
+                pass
+            except OSError:
+                if self._closed.is_set():
+                    return
+                log.exception("Invalidation bus socket error")
+            except Exception as e:
+                log.exception(f"Ignoring malformed invalidation datagram: {e}")
+            self._retransmit()
+
+
+class InvalidationBus:
+    """
+    Dispatches published keys locally and forwards them, coalesced, to the
+    transport; dispatches keys received from other nodes.
+    """
+    def __init__(self, app, node_id, transport=None, coalesce_window=0.05, retry_interval=1.0):
+        self.app = app
+        self.node_id = node_id
+        self.transport = transport
+        self.coalesce_window = coalesce_window
+        self.retry_interval = retry_interval
+        self._pending = OrderedDict()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._thread = None
+
+    def start(self):
+        if self.transport is None or self._thread is not None:
+            return
+        self.transport.start(self._deliver)
+        self._thread = threading.Thread(target=self._run, name="invalidation-bus-sender", daemon=True)
+        self._thread.start()
+
+    def publish(self, entity_type, entity_id, tenant_id=None):
+        key = _key(entity_type, entity_id, tenant_id)
+        INVALIDATIONS.inc(outcome="published")
+        dispatch([key])
+        if self.transport is None or self._closed:
+            return
+        with self._lock:
+            self._pending[key] = None
+        self._wakeup.set()
+
+    def flush(self):
+        """Sends everything queued so far; returns False if the transport failed."""
+        with self._lock:
+            keys = list(self._pending)
+            self._pending.clear()
+        if not keys:
+            return True
+        try:
+            with self.app.app_context():
+                self.transport.send(keys)
+        except Exception as e:
+            log.exception(f"Failed to send {len(keys)} invalidation keys; will retry: {e}")
+            INVALIDATIONS.inc(len(keys), outcome="failed")
+            with self._lock:
+                # Re-queue ahead of anything published meanwhile.
+                requeued = OrderedDict.fromkeys(keys)
+                requeued.update(self._pending)
+                self._pending = requeued
+            return False
+        INVALIDATIONS.inc(len(keys), outcome="sent")
+        return True
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(self.coalesce_window + 5)
+        if self.transport is not None:
+            self.flush()
+            self.transport.close()
+
+    def _deliver(self, keys):
+        INVALIDATIONS.inc(len(keys), outcome="received")
+        with self.app.app_context():
+            return dispatch(keys)
+
+    def _run(self):
+        while not self._closed:
+            self._wakeup.wait()
+            if self._closed:
+                return
+            # Let the rest of a burst arrive, then send it as one batch.
+            time.sleep(self.coalesce_window)
+            self._wakeup.clear()
+            if not self.flush():
+                time.sleep(self.retry_interval)
+                self._wakeup.set()
+
+
+def publish_invalidation(entity_type, entity_id, tenant_id=None):
+    """
+    Publishes a committed change to every node's caches. Does nothing
+    outside an app context.
+    """
+    if not has_app_context():
+        return
+    bus = current_app.extensions.get("invalidation_bus")
+    if bus is None:
+        dispatch([_key(entity_type, entity_id, tenant_id)])
+    else:
+        bus.publish(entity_type, entity_id, tenant_id)
+
+
+def _flushed_keys(session):
+    """The invalidation keys of the objects the flush that just ran inserted, updated or deleted."""
+    objects = [
+        obj
+        for objects, updated in ((session.new, False), (session.dirty, True), (session.deleted, False))
+        for obj in objects
+        if not updated or session.is_modified(obj, include_collections=False)
+    ]
+    branch_ids = {obj.branch_id for obj in objects if isinstance(obj, BranchProductModule) and obj.branch_id is not None}
+    tenants = dict(session.connection().execute(
+        select(Branch.branch_id, Branch.tenant_id).where(Branch.branch_id.in_(branch_ids))
+    ).all()) if branch_ids else {}
+
+    keys = []
+    for obj in objects:
+        if isinstance(obj, Tenant):
+            keys.append(_key("tenant", obj.tenant_id, obj.tenant_id))
+        elif isinstance(obj, Branch):
+            keys.append(_key("branch", obj.branch_id, obj.tenant_id))
+        elif isinstance(obj, TenantFeature):
+            keys.append(_key("tenant_feature", f"{obj.tenant_id}:{obj.feature_id}", obj.tenant_id))
+        elif isinstance(obj, BranchProductModule):
+            keys.append(_key("branch_product_module", f"{obj.branch_id}:{obj.product_module_id}", tenants.get(obj.branch_id)))
+        elif isinstance(obj, Feature):
+            keys.append(_key("feature", obj.feature_id, None))
+        elif isinstance(obj, Product):
+            keys.append(_key("product", obj.product_id, None))
+        elif isinstance(obj, Module):
+            keys.append(_key("module", obj.module_id, None))
+        elif isinstance(obj, ProductModule):
+            keys.append(_key("product_module", obj.product_module_id, None))
+    return keys
+
+
+def _collect_after_flush(session, flush_context):
+    if not has_app_context():
+        return
+    keys = _flushed_keys(session)
+    if keys:
+        session.info.setdefault(_PENDING_KEY, {}).update(dict.fromkeys(keys))
+
+
+def _publish_after_commit(session):
+    for entity_type, entity_id, tenant_id in session.info.pop(_PENDING_KEY, ()):
+        publish_invalidation(entity_type, entity_id, tenant_id)
+
+
+def _discard_after_rollback(session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+def _close_all():
+    for bus in list(_buses):
+        bus.close()
+
+
+atexit.register(_close_all)
+
+
+def init_invalidation_bus(app):
+    """
+    Creates the app's invalidation bus with the configured transport,
+    exposes it as app.extensions["invalidation_bus"] and hooks publishing
+    into the Flask-SQLAlchemy session. The hooks are shared by every app in
+    the process and publish to the bus of the active app.
+    """
+    node_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+    transport_name = app.config.get("INVALIDATION_BUS_TRANSPORT", "table")
+    with app.app_context():
+        url = db.engine.url
+    in_memory = url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+    if transport_name not in ("table", "udp", "none"):
+        raise ValueError(f"Unknown INVALIDATION_BUS_TRANSPORT '{transport_name}'. Expected table, udp or none.")
+    if not app.config.get("BACKGROUND_WORKERS", True):
+        transport_name = "none"
+
+    transport = None
+    if transport_name == "table" and not in_memory:
+        transport = TableTransport(
+            app, node_id,
+            poll_interval=app.config.get("INVALIDATION_BUS_POLL_INTERVAL", 1.0),
+            grace=app.config.get("INVALIDATION_BUS_TABLE_GRACE", 5.0),
+            retention=app.config.get("INVALIDATION_BUS_TABLE_RETENTION", 3600.0),
+        )
+    elif transport_name == "udp":
+        bind = app.config.get("INVALIDATION_BUS_UDP_BIND")
+        if not bind:
+            # A shared default would let only the first worker on a host bind it.
+            raise ValueError("INVALIDATION_BUS_UDP_BIND must be set to a host:port used by this process alone "
+                             "when INVALIDATION_BUS_TRANSPORT is udp.")
+        transport = UdpTransport(
+            node_id,
+            bind=bind,
+            peers=[peer.strip() for peer in app.config.get("INVALIDATION_BUS_UDP_PEERS", "").split(",") if peer.strip()],
+            retry_interval=app.config.get("INVALIDATION_BUS_UDP_RETRY_INTERVAL", 0.2),
+            max_attempts=app.config.get("INVALIDATION_BUS_UDP_MAX_ATTEMPTS", 5),
+        )
+
+    bus = InvalidationBus(app, node_id, transport, coalesce_window=app.config.get("INVALIDATION_BUS_COALESCE_WINDOW", 0.05))
+    bus.start()
+    if transport is not None:
+        _buses.append(bus)
+    app.extensions["invalidation_bus"] = bus
+
+    for name, listener in (
+        ("after_flush", _collect_after_flush),
+        ("after_commit", _publish_after_commit),
+        ("after_rollback", _discard_after_rollback),
+    ):
+        if not event.contains(db.session, name, listener):
+            event.listen(db.session, name, listener)
@@ -0,0 +1,154 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import uuid
+import datetime
+
+from flask import g, has_request_context, request
+
+REQUEST_ID_HEADER = "X-Request-ID"
+
+_STANDARD_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "request_id"}
+
+_queue_listener = None
+_stop_registered = False
+
+
+def get_request_id():
+    """Returns the correlation id of the current request, or None outside a request."""
+    if not has_request_context():
+        return None
+    return g.get("request_id")
+
+
+class RequestIdFilter(logging.Filter):
+    """Attaches the current request id to every record passing through a handler."""
+    def filter(self, record):
+        if getattr(record, "request_id", None) is None:
+            record.request_id = get_request_id()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Lets through only `sample_rate` of the records at or below `max_level`.
+    Records above `max_level` always pass, so warnings and errors are never dropped.
+    """
+    def __init__(self, sample_rate=1.0, max_level=logging.DEBUG):
+        super().__init__()
+        self.sample_rate = sample_rate
+        self.max_level = max_level
+
+    def filter(self, record):
+        if record.levelno > self.max_level or self.sample_rate >= 1.0:
+            return True
+        return random.random() < self.sample_rate
+
+
+class StructuredFormatter(logging.Formatter):
+    """Formats records as single-line JSON objects including any `extra` fields."""
+    def format(self, record):
+        payload = {
+            "timestamp": datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", None),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _STANDARD_RECORD_ATTRS and not key.startswith("_"):
+                payload[key] = value
+        if record.exc_info:
+            payload["exception"] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
+
+
+class _InProcessQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue handler that defers message formatting to the listener thread.
+    The stock QueueHandler formats in the caller so records can be pickled;
+    an in-process queue does not need that.
+    """
+    def prepare(self, record):
+        return record
+
+
+def parse_log_levels(spec):
+    """
+    Parses a per-module level spec such as "repositories=DEBUG,services=INFO"
+    into a {logger_name: level_name} dict.
+    """
+    levels = {}
+    for entry in (spec or "").split(","):
+        if "=" not in entry:
+            continue
+        name, level = entry.split("=", 1)
+        levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def _assign_request_id():
+    g.request_id = request.headers.get(REQUEST_ID_HEADER) or uuid.uuid4().hex
+
+
+def _echo_request_id(response):
+    request_id = get_request_id()
+    if request_id:
+        response.headers[REQUEST_ID_HEADER] = request_id
+    return response
+
+
+def _stop_queue_listener():
+    if _queue_listener is not None:
+        _queue_listener.stop()
+
+
+def init_logging(app):
+    """
+    Configures the root logger from app config: structured or plain output,
+    per-module levels, sampling of high-frequency DEBUG records, request id
+    correlation and an optional queue handler so request threads never
+    block on log I/O.
+    """
+    global _queue_listener, _stop_registered
+
+    handler = logging.StreamHandler()
+    if app.config.get("LOG_FORMAT") == "json":
+        handler.setFormatter(StructuredFormatter())
+    else:
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s [%(request_id)s] %(name)s: %(message)s"))
+
+    root = logging.getLogger()
+    root.setLevel(app.config.get("LOG_LEVEL", "INFO"))
+    for existing in list(root.handlers):
+        if isinstance(existing, logging.handlers.QueueHandler) or getattr(existing, "_app_log_handler", False):
+            root.removeHandler(existing)
+    if _queue_listener is not None:
+        _queue_listener.stop()
+        _queue_listener = None
+
+    # The filters go on the handler records enter through: the listener calls
+    # handler.handle(), so filters on both would sample DEBUG records twice.
+    if app.config.get("LOG_ASYNC"):
+        log_queue = queue.SimpleQueue()
+        entry_handler = _InProcessQueueHandler(log_queue)
+        _queue_listener = logging.handlers.QueueListener(log_queue, handler, respect_handler_level=True)
+        _queue_listener.start()
+        if not _stop_registered:
+            atexit.register(_stop_queue_listener)
+            _stop_registered = True
+    else:
+        entry_handler = handler
+        handler._app_log_handler = True
+    entry_handler.addFilter(RequestIdFilter())
+    entry_handler.addFilter(SamplingFilter(app.config.get("LOG_DEBUG_SAMPLE_RATE", 1.0)))
+    root.addHandler(entry_handler)
+
+    for logger_name, level in app.config.get("LOG_LEVELS", {}).items():
+        logging.getLogger(logger_name).setLevel(level)
+
+    app.before_request(_assign_request_id)
+    app.after_request(_echo_request_id)
@@ -0,0 +1,249 @@
+import bisect
+import threading
+import time
+from collections import defaultdict
+
+from flask import g, request, Response
+
+from db_instrumentation import get_request_db_stats
+
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DEFAULT_COUNT_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250)
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+def _escape_label_value(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(label_names, label_values, extra=()):
+    pairs = list(zip(label_names, label_values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape_label_value(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+class _Metric:
+    metric_type = None
+
+    def __init__(self, name, documentation, label_names=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+
+    def _label_key(self, labels):
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"Metric {self.name} expects labels {self.label_names}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+
+
+class Counter(_Metric):
+    metric_type = "counter"
+
+    def __init__(self, name, documentation, label_names=()):
+        super().__init__(name, documentation, label_names)
+        self._values = defaultdict(float)
+
+    def inc(self, amount=1, **labels):
+        key = self._label_key(labels)
+        with self._lock:
+            self._values[key] += amount
+
+    def render(self):
+        lines = self.header()
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}")
+        return lines
+
+
+class CallbackMetric(_Metric):
+    """Metric whose samples are produced by a callback at scrape time."""
+    def __init__(self, name, documentation, label_names=(), collect=None, metric_type="gauge"):
+        super().__init__(name, documentation, label_names)
+        self.metric_type = metric_type
+        self._collect = collect
+
+    def render(self):
+        lines = self.header()
+        for key, value in sorted(self._collect().items()):
+            lines.append(f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram(_Metric):
+    metric_type = "histogram"
+
+    def __init__(self, name, documentation, label_names=(), buckets=DEFAULT_LATENCY_BUCKETS):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets))
+        self._counts = {}
+        self._sums = defaultdict(float)
+
+    def observe(self, value, **labels):
+        key = self._label_key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._counts.setdefault(key, [0] * (len(self.buckets) + 1))
+            counts[index] += 1
+            self._sums[key] += value
+
+    def render(self):
+        lines = self.header()
+        with self._lock:
+            for key in sorted(self._counts):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), self._counts[key]):
+                    cumulative += count
+                    labels = _format_labels(self.label_names, key, [("le", _format_value(float(bound)))])
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                labels = _format_labels(self.label_names, key)
+                lines.append(f"{self.name}_sum{labels} {_format_value(self._sums[key])}")
+                lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.setdefault(metric.name, metric)
+            return self._metrics[metric.name]
+
+    def counter(self, name, documentation, label_names=()):
+        return self.register(Counter(name, documentation, label_names))
+
+    def histogram(self, name, documentation, label_names=(), buckets=DEFAULT_LATENCY_BUCKETS):
+        return self.register(Histogram(name, documentation, label_names, buckets))
+
+    def callback(self, name, documentation, label_names=(), collect=None, metric_type="gauge"):
+        return self.register(CallbackMetric(name, documentation, label_names, collect, metric_type))
+
+    def render(self):
+        """Renders every registered metric in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+HTTP_REQUEST_LATENCY = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template.",
+    ("blueprint", "endpoint", "method")
+)
+HTTP_RESPONSES = registry.counter(
+    "http_responses_total", "HTTP responses by route template and status code.",
+    ("blueprint", "endpoint", "method", "status")
+)
+HTTP_REQUEST_DB_QUERIES = registry.histogram(
+    "http_request_db_queries", "Database queries issued per HTTP request.",
+    ("blueprint", "endpoint", "method"), buckets=DEFAULT_COUNT_BUCKETS
+)
+REPOSITORY_CALL_LATENCY = registry.histogram(
+    "repository_call_duration_seconds", "Repository method latency.",
+    ("repository", "method")
+)
+REPOSITORY_CALL_ERRORS = registry.counter(
+    "repository_call_errors_total", "Repository method calls that raised.",
+    ("repository", "method")
+)
+
+
+def observe_repository_call(repository, method, duration, failed=False):
+    REPOSITORY_CALL_LATENCY.observe(duration, repository=repository, method=method)
+    if failed:
+        REPOSITORY_CALL_ERRORS.inc(repository=repository, method=method)
+
+
+def _route_labels():
+    rule = request.url_rule.rule if request.url_rule is not None else UNMATCHED_ROUTE
+    return {
+        "blueprint": request.blueprint or "app",
+        "endpoint": rule,
+        "method": request.method,
+    }
+
+
+def _start_request_timer():
+    g._metrics_start_time = time.perf_counter()
+
+
+def _record_request_metrics(response):
+    start_time = g.get("_metrics_start_time")
+    if start_time is None:
+        return response
+
+    labels = _route_labels()
+    HTTP_REQUEST_LATENCY.observe(time.perf_counter() - start_time, **labels)
+    HTTP_RESPONSES.inc(status=response.status_code, **labels)
+
+    stats = get_request_db_stats()
+    if stats is not None:
+        HTTP_REQUEST_DB_QUERIES.observe(stats.query_count, **labels)
+    return response
+
+
+def _lookup_cache_hit_ratios():
+    from repositories.base_repository import get_lookup_cache_stats
+    stats = get_lookup_cache_stats()
+    ratios = {("all",): stats["hit_ratio"]}
+    for model, counts in stats["models"].items():
+        total = counts["hits"] + counts["misses"]
+        ratios[(model,)] = counts["hits"] / total if total else 0.0
+    return ratios
+
+
+def _lookup_cache_counts(outcome):
+    from repositories.base_repository import get_lookup_cache_stats
+    return {(model,): counts[outcome] for model, counts in get_lookup_cache_stats()["models"].items()}
+
+
+registry.callback(
+    "repository_lookup_cache_hit_ratio", "Request-scoped lookup cache hit ratio by model.",
+    ("model",), collect=_lookup_cache_hit_ratios
+)
+registry.callback(
+    "repository_lookup_cache_hits_total", "Request-scoped lookup cache hits by model.",
+    ("model",), collect=lambda: _lookup_cache_counts("hits"), metric_type="counter"
+)
+registry.callback(
+    "repository_lookup_cache_misses_total", "Request-scoped lookup cache misses by model.",
+    ("model",), collect=lambda: _lookup_cache_counts("misses"), metric_type="counter"
+)
+
+
+def metrics_view():
+    return Response(registry.render(), mimetype="text/plain; version=0.0.4")
+
+
+def init_metrics(app):
+    """
+    Times every request handled by the app (API, web and legacy blueprints
+    alike), labelled by blueprint and route template so label cardinality
+    stays bounded, and exposes the registry at METRICS_PATH.
+    """
+    if not app.config.get("METRICS_ENABLED", True):
+        return
+    app.before_request(_start_request_timer)
+    app.after_request(_record_request_metrics)
+    app.add_url_rule(app.config.get("METRICS_PATH", "/metrics"), "metrics", metrics_view)
@@ -0,0 +1,18 @@
+-- Audit log of configuration changes (audit_log.py).
+-- Run once against databases created before the table existed (MySQL).
+
+CREATE TABLE configuration_audit_log (
+    audit_id BIGINT NOT NULL AUTO_INCREMENT,
+    entity_type VARCHAR(50) NOT NULL,
+    entity_id VARCHAR(100) NOT NULL,
+    action VARCHAR(20) NOT NULL,
+    tenant_id BIGINT,
+    details TEXT COLLATE utf8mb4_bin,
+    actor VARCHAR(50),
+    request_id VARCHAR(64),
+    created_at DATETIME NOT NULL,
+    PRIMARY KEY (audit_id),
+    CONSTRAINT check_valid_json_audit_details CHECK (JSON_VALID(details))
+);
+CREATE INDEX ix_configuration_audit_log_entity ON configuration_audit_log (entity_type, entity_id);
+CREATE INDEX ix_configuration_audit_log_tenant_created ON configuration_audit_log (tenant_id, created_at);
@@ -0,0 +1,15 @@
+-- Outbox behind the change feed (change_feed.py).
+-- Run once against databases created before the table existed (MySQL).
+
+CREATE TABLE configuration_change (
+    version BIGINT NOT NULL AUTO_INCREMENT,
+    entity_type VARCHAR(50) NOT NULL,
+    entity_id VARCHAR(100) NOT NULL,
+    action VARCHAR(20) NOT NULL,
+    tenant_id BIGINT,
+    payload TEXT COLLATE utf8mb4_bin,
+    created_at DATETIME NOT NULL,
+    PRIMARY KEY (version),
+    CONSTRAINT check_valid_json_change_payload CHECK (JSON_VALID(payload))
+);
+CREATE INDEX ix_configuration_change_tenant_version ON configuration_change (tenant_id, version);
@@ -0,0 +1,13 @@
+-- Table transport of the cache invalidation bus (invalidation_bus.py).
+-- Run once against databases created before the table existed (MySQL).
+
+CREATE TABLE cache_invalidation (
+    invalidation_id BIGINT NOT NULL AUTO_INCREMENT,
+    node_id VARCHAR(100) NOT NULL,
+    entity_type VARCHAR(50) NOT NULL,
+    entity_id VARCHAR(100) NOT NULL,
+    tenant_id BIGINT,
+    created_at DATETIME NOT NULL,
+    PRIMARY KEY (invalidation_id)
+);
+CREATE INDEX ix_cache_invalidation_created_at ON cache_invalidation (created_at);
@@ -8,6 +8,7 @@ import datetime
 import json
 
 from extensions import db 
+from db_portability import BigIntegerPK, SmallIntegerPK, binary_text, json_valid_check, portable_enum
 
 class Country(db.Model):
     __tablename__ = 'countries'
@@ -15,7 +16,7 @@ class Country(db.Model):
     country_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     country_code = db.Column(db.String(6), nullable=False, unique=True)
     country_name = db.Column(db.String(255), nullable=False)
-    status = db.Column(Enum('Active', 'Inactive'), nullable=False)
+    status = db.Column(portable_enum('Active', 'Inactive'), nullable=False)
 
    
     tenants = relationship("Tenant", back_populates="country", cascade="all, delete", passive_deletes=True)
@@ -28,13 +29,13 @@ class Tenant(db.Model):
         db.PrimaryKeyConstraint('tenant_id', 'organization_code', 'sub_domain'),
     )
 
-    tenant_id = db.Column(db.BigInteger, autoincrement=True, nullable=False)
+    tenant_id = db.Column(BigIntegerPK, autoincrement=True, nullable=False)
     organization_code = db.Column(db.String(50), nullable=False,unique=True)
     tenant_name = db.Column(db.String(100))
     sub_domain = db.Column(db.String(50), nullable=False,unique=True)
     default_currency = db.Column(db.String(3), nullable=False, default='USD')
     description = db.Column(db.String(500))
-    status = db.Column(Enum('Active', 'Inactive'), default='Active')
+    status = db.Column(portable_enum('Active', 'Inactive'), default='Active')
 
     country_id = db.Column(
         db.Integer,
@@ -66,7 +67,7 @@ class Branch(db.Model):
     name = db.Column(db.String(50), nullable=True)
     description = db.Column(db.String(500), nullable=True)
     
-    status = db.Column(Enum('Active', 'Inactive'), default='Active')
+    status = db.Column(portable_enum('Active', 'Inactive'), default='Active')
     code = db.Column(db.String(50), nullable=True)
 
     country_id = db.Column(
@@ -89,7 +90,7 @@ class Branch(db.Model):
 class Module(db.Model):
     __tablename__ = 'module'
 
-    module_id = db.Column(db.BigInteger, primary_key=True, autoincrement=True)
+    module_id = db.Column(BigIntegerPK, primary_key=True, autoincrement=True)
 
     name = db.Column(db.String(50), nullable=True)
     description = db.Column(db.String(255), nullable=True)
@@ -100,15 +101,18 @@ class Module(db.Model):
     dependent_modules = db.Column(db.JSON, nullable=True)
 
     __table_args__ = (
-        CheckConstraint("JSON_VALID(dependent_modules)", name="ck_json_valid_dependent_modules"),
+        *json_valid_check("dependent_modules", "ck_json_valid_dependent_modules"),
     )
     
     product_modules = db.relationship('ProductModule', back_populates='module', cascade='all, delete-orphan')
     
 class Feature(db.Model):
     __tablename__ = 'feature'
+    __table_args__ = (
+        *json_valid_check('rollout', 'check_valid_json_feature_rollout'),
+    )
 
-    feature_id = db.Column(db.SmallInteger, primary_key=True, autoincrement=True)
+    feature_id = db.Column(SmallIntegerPK, primary_key=True, autoincrement=True)
     name = db.Column(db.String(50), unique=True, nullable=True)
     description = db.Column(db.String(500), nullable=True)
 
@@ -119,14 +123,21 @@ class Feature(db.Model):
     )
 
     created_by = db.Column(db.String(50), nullable=True)
+    # State for tenants without a TenantFeature override.
+    default_enabled = db.Column(db.Boolean, nullable=False, default=True, server_default=sa.true())
+    # Optional rollout rule as JSON; see feature_rollout.py.
+    rollout = db.Column(binary_text(), nullable=True)
 
     module = db.relationship("Module", backref=db.backref("features", cascade="all, delete-orphan", passive_deletes=True))
     
     
 class TenantFeature(db.Model):
     __tablename__ = 'tenant_feature'
+    __table_args__ = (
+        db.Index('ix_tenant_feature_tenant_feature', 'tenant_id', 'feature_id'),
+    )
 
-    tenant_feature_id = db.Column(db.BigInteger, primary_key=True, autoincrement=True)
+    tenant_feature_id = db.Column(BigIntegerPK, primary_key=True, autoincrement=True)
     
     tenant_id = db.Column(
         db.BigInteger,
@@ -150,18 +161,18 @@ class TenantFeature(db.Model):
 class ReportMaster(db.Model):
     __tablename__ = 'report_master'
 
-    id = db.Column(db.BigInteger, primary_key=True, autoincrement=True)
+    id = db.Column(BigIntegerPK, primary_key=True, autoincrement=True)
     name = db.Column(db.String(255), nullable=True)
     description = db.Column(db.String(999), nullable=True)
     is_active = db.Column(db.Boolean, nullable=False, default=True)
     category = db.Column(
-        Enum('kpi', 'transaction', 'summary', name='report_category'),
+        portable_enum('kpi', 'transaction', 'summary', name='report_category'),
         nullable=True
     )
 class TenantReport(db.Model):
     __tablename__ = 'tenant_reports'
 
-    id = db.Column(db.BigInteger, primary_key=True, autoincrement=True)
+    id = db.Column(BigIntegerPK, primary_key=True, autoincrement=True)
     
     report_type_id = db.Column(
         db.BigInteger,
@@ -178,25 +189,25 @@ class TenantReport(db.Model):
     is_active = db.Column(db.Boolean, nullable=False, default=True)
 
     select_clause = db.Column(
-        sa.Text(collation='utf8mb4_bin'),
+        binary_text(),
         nullable=True
     )
 
     where_clause = db.Column(
-        sa.Text(collation='utf8mb4_bin'),
+        binary_text(),
         nullable=True
     )
 
     field_metadata = db.Column(
-        sa.Text(collation='utf8mb4_bin'),
+        binary_text(),
         nullable=True
     )
 
     __table_args__ = (
         UniqueConstraint('report_type_id', 'tenant_id', name='uq_report_tenant'),
-        CheckConstraint("JSON_VALID(select_clause)", name="ck_json_valid_select_clause"),
-        CheckConstraint("JSON_VALID(where_clause)", name="ck_json_valid_where_clause"),
-        CheckConstraint("JSON_VALID(field_metadata)", name="ck_json_valid_field_metadata"),
+        *json_valid_check("select_clause", "ck_json_valid_select_clause"),
+        *json_valid_check("where_clause", "ck_json_valid_where_clause"),
+        *json_valid_check("field_metadata", "ck_json_valid_field_metadata"),
     )
 
     report = db.relationship("ReportMaster", backref=db.backref("tenant_reports", cascade="all, delete-orphan", passive_deletes=True))
@@ -256,10 +267,10 @@ class BranchProductModule(db.Model):
     product_module_id = db.Column(db.Integer, db.ForeignKey('product_module.product_module_id', ondelete='CASCADE'), nullable=True)
     created_by = db.Column(db.String(50), nullable=True)
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.datetime.utcnow)
-    eligibility_config = db.Column(LONGTEXT(collation='utf8mb4_bin'), nullable=True)
+    eligibility_config = db.Column(binary_text(long=True), nullable=True)
 
     __table_args__ = (
-        CheckConstraint('JSON_VALID(eligibility_config)', name='check_valid_json_eligibility_config'),
+        *json_valid_check('eligibility_config', 'check_valid_json_eligibility_config'),
     )
 
     
@@ -270,3 +281,112 @@ class BranchProductModule(db.Model):
         return f'<BranchProductModule ID={self.tenant_product_module}, Branch={self.branch_id}, ProductModule={self.product_module_id}>'   
 
 
+
+class ConfigurationAuditLog(db.Model):
+    """
+    Append-only history of configuration changes, written in batches by the
+    audit log worker (see audit_log.py). Rows are never updated or deleted,
+    and deliberately carry no foreign keys so history outlives the entities.
+    Existing databases get the table from migrations/0001_configuration_audit_log.sql.
+    """
+    __tablename__ = 'configuration_audit_log'
+
+    audit_id = db.Column(BigIntegerPK, primary_key=True, autoincrement=True)
+    entity_type = db.Column(db.String(50), nullable=False)
+    entity_id = db.Column(db.String(100), nullable=False)
+    action = db.Column(db.String(20), nullable=False)
+    tenant_id = db.Column(db.BigInteger, nullable=True)
+    details = db.Column(binary_text(), nullable=True)
+    actor = db.Column(db.String(50), nullable=True)
+    request_id = db.Column(db.String(64), nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_configuration_audit_log_entity', 'entity_type', 'entity_id'),
+        db.Index('ix_configuration_audit_log_tenant_created', 'tenant_id', 'created_at'),
+        *json_valid_check('details', 'check_valid_json_audit_details'),
+    )
+
+    def __repr__(self):
+        return f'<ConfigurationAuditLog ID={self.audit_id}, {self.action} {self.entity_type}={self.entity_id}>'
+
+class ConfigurationChange(db.Model):
+    """
+    Transactional outbox behind the change feed (see change_feed.py). One row
+    per committed change to a tenant feature, module configuration, product
+    or module; version is the feed cursor.
+    Existing databases get the table from migrations/0002_configuration_change.sql.
+    """
+    __tablename__ = 'configuration_change'
+
+    version = db.Column(BigIntegerPK, primary_key=True, autoincrement=True)
+    entity_type = db.Column(db.String(50), nullable=False)
+    entity_id = db.Column(db.String(100), nullable=False)
+    action = db.Column(db.String(20), nullable=False)
+    tenant_id = db.Column(db.BigInteger, nullable=True)
+    payload = db.Column(binary_text(), nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_configuration_change_tenant_version', 'tenant_id', 'version'),
+        *json_valid_check('payload', 'check_valid_json_change_payload'),
+    )
+
+    def __repr__(self):
+        return f'<ConfigurationChange version={self.version}, {self.action} {self.entity_type}={self.entity_id}>'
+
+
+class CacheInvalidation(db.Model):
+    """
+    Table transport of the cache invalidation bus (see invalidation_bus.py).
+    Each node inserts the keys it invalidated and polls for rows written by
+    the others; rows are short-lived and pruned after a retention period.
+    Existing databases get the table from migrations/0003_cache_invalidation.sql.
+    """
+    __tablename__ = 'cache_invalidation'
+
+    invalidation_id = db.Column(BigIntegerPK, primary_key=True, autoincrement=True)
+    node_id = db.Column(db.String(100), nullable=False)
+    entity_type = db.Column(db.String(50), nullable=False)
+    entity_id = db.Column(db.String(100), nullable=False)
+    tenant_id = db.Column(db.BigInteger, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f'<CacheInvalidation {self.invalidation_id} {self.entity_type}={self.entity_id} from {self.node_id}>'
+
+
+class ScheduledChange(db.Model):
+    """
+    A configuration change to apply at a later time (see change_scheduler.py):
+    switching a tenant's feature (entity_type "tenant_feature", tenant_id and
+    feature_id) or a branch's module configuration ("branch_product_module",
+    branch_id and product_module_id) on or off once apply_at has passed.
+    Like the audit log it carries no foreign keys; a change whose target is
+    gone by then fails instead of blocking the delete.
+    """
+    __tablename__ = 'scheduled_change'
+
+    scheduled_change_id = db.Column(BigIntegerPK, primary_key=True, autoincrement=True)
+    entity_type = db.Column(portable_enum('tenant_feature', 'branch_product_module'), nullable=False)
+    action = db.Column(portable_enum('enable', 'disable'), nullable=False)
+    tenant_id = db.Column(db.BigInteger, nullable=True)
+    feature_id = db.Column(db.SmallInteger, nullable=True)
+    branch_id = db.Column(db.Integer, nullable=True)
+    product_module_id = db.Column(db.Integer, nullable=True)
+    apply_at = db.Column(db.DateTime, nullable=False)
+    status = db.Column(portable_enum('pending', 'applied', 'failed', 'cancelled'), nullable=False, default='pending')
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    # Set after a failed attempt; the change is retried from then on.
+    next_attempt_at = db.Column(db.DateTime, nullable=True)
+    last_error = db.Column(db.String(500), nullable=True)
+    applied_at = db.Column(db.DateTime, nullable=True)
+    created_by = db.Column(db.String(50), nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_scheduled_change_status_apply_at', 'status', 'apply_at'),
+    )
+
+    def __repr__(self):
+        return f'<ScheduledChange {self.scheduled_change_id} {self.action} {self.entity_type} at {self.apply_at} ({self.status})>'
@@ -0,0 +1,131 @@
+"""
+Precomputed OpenAPI document serving.
+
+openapi.yaml is read and parsed once when the docs are registered. The
+YAML (as written, comments included) and a compact JSON rendering are kept
+in memory together with gzip and, when the optional brotli package is
+installed, brotli encodings. Each representation carries a strong ETag, so
+a docs hit is a dictionary lookup or a 304. The spec is also checked
+against the registered routes so that documentation drift shows up at
+startup instead of in front of an API consumer.
+"""
+import gzip
+import hashlib
+import json
+import logging
+import re
+
+import yaml
+from flask import Response, current_app, request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+log = logging.getLogger(__name__)
+
+HTTP_METHODS = ("get", "put", "post", "delete", "patch", "head", "options")
+# Preferred first when the client weighs encodings equally.
+ENCODING_PREFERENCE = ("br", "gzip", "identity")
+
+
+class Representation:
+    """One rendering of the spec, pre-encoded for every supported Content-Encoding."""
+    def __init__(self, body, mimetype):
+        self.mimetype = mimetype
+        digest = hashlib.sha256(body).hexdigest()[:32]
+        self.bodies = {"identity": body, "gzip": gzip.compress(body, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            self.bodies["br"] = brotli.compress(body, quality=11)
+        self.etags = {
+            encoding: digest if encoding == "identity" else f"{digest}-{encoding}"
+            for encoding in self.bodies
+        }
+
+    def choose_encoding(self, accept_encodings):
+        best, best_quality = "identity", 0
+        for encoding in ENCODING_PREFERENCE:
+            if encoding not in self.bodies:
+                continue
+            quality = 1 if encoding == "identity" and encoding not in accept_encodings else accept_encodings[encoding]
+            if quality > best_quality:
+                best, best_quality = encoding, quality
+        return best
+
+
+class OpenApiDocument:
+    def __init__(self, raw_yaml):
+        self.spec = yaml.safe_load(raw_yaml) or {}
+        self.representations = {
+            "yaml": Representation(raw_yaml, "application/yaml"),
+            "json": Representation(json.dumps(self.spec, separators=(",", ":")).encode("utf-8"), "application/json"),
+        }
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, "rb") as f:
+            return cls(f.read())
+
+    def response(self, fmt):
+        """
+        Builds the response for the current request: negotiated encoding,
+        strong ETag, long-lived cache headers and 304 on a matching
+        If-None-Match.
+        """
+        representation = self.representations[fmt]
+        encoding = representation.choose_encoding(request.accept_encodings)
+        etag = representation.etags[encoding]
+
+        if request.if_none_match.contains_weak(etag):
+            response = Response(status=304)
+        else:
+            response = Response(representation.bodies[encoding], mimetype=representation.mimetype)
+            if encoding != "identity":
+                response.headers["Content-Encoding"] = encoding
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = f"public, max-age={current_app.config['OPENAPI_CACHE_MAX_AGE']}"
+        response.vary.add("Accept-Encoding")
+        return response
+
+
+def _path_template(path):
+    """Reduces an OpenAPI path or a Flask rule to a comparable template."""
+    path = re.sub(r"\{[^}]+\}", "{}", path)
+    path = re.sub(r"<[^>]+>", "{}", path)
+    return path.rstrip("/") or "/"
+
+
+def find_spec_drift(spec, app):
+    """
+    Compares documented operations with the app's URL map. Returns a list
+    of 'METHOD /path' strings the spec documents but no route serves.
+    """
+    served = set()
+    for rule in app.url_map.iter_rules():
+        template = _path_template(rule.rule)
+        for method in rule.methods or ():
+            served.add((method.lower(), template))
+
+    drift = []
+    for path, operations in (spec.get("paths") or {}).items():
+        template = _path_template(path)
+        for method in operations or {}:
+            if method in HTTP_METHODS and (method, template) not in served:
+                drift.append(f"{method.upper()} {path}")
+    return drift
+
+
+def validate_openapi_document(app, document):
+    """
+    Logs a warning for every documented operation without a route, or raises
+    RuntimeError when OPENAPI_STRICT_VALIDATION is enabled.
+    """
+    drift = find_spec_drift(document.spec, app)
+    if not drift:
+        return drift
+    message = "OpenAPI spec documents operations with no matching route: " + ", ".join(drift)
+    if app.config.get("OPENAPI_STRICT_VALIDATION"):
+        raise RuntimeError(message)
+    log.warning(message)
+    return drift
@@ -0,0 +1,112 @@
+import logging
+import re
+from collections import Counter
+from contextlib import contextmanager
+
+from flask import g, has_app_context, current_app, request
+from sqlalchemy import event
+
+log = logging.getLogger(__name__)
+
+_STRING_LITERAL_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST_RE = re.compile(r"\bIN\s*\((?:\s*(?:\?|%s|%\(\w+\)s|:\w+|__\[POSTCOMPILE_\w+\])\s*,?)+\)", re.IGNORECASE)
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def fingerprint_statement(statement):
+    """
+    Normalizes a SQL statement so that executions differing only in literal
+    values or IN-list length produce the same fingerprint.
+    """
+    fingerprint = _STRING_LITERAL_RE.sub("?", statement)
+    fingerprint = _NUMBER_RE.sub("?", fingerprint)
+    fingerprint = _IN_LIST_RE.sub("IN (?)", fingerprint)
+    return _WHITESPACE_RE.sub(" ", fingerprint).strip()
+
+
+class NPlusOneDetector:
+    """
+    Counts statement fingerprints and reports any that repeat more than
+    `threshold` times, which is the signature of a per-row lazy load.
+    """
+    def __init__(self, threshold=5):
+        self.threshold = threshold
+        self.counts = Counter()
+
+    def record(self, statement):
+        self.counts[fingerprint_statement(statement)] += 1
+
+    def violations(self):
+        """Returns (fingerprint, count) pairs above the threshold, most repeated first."""
+        return [(fp, count) for fp, count in self.counts.most_common() if count > self.threshold]
+
+    def assert_no_n_plus_one(self):
+        """Raises AssertionError listing every repeated statement above the threshold."""
+        found = self.violations()
+        if found:
+            details = "\n".join(f"  {count}x {fp}" for fp, count in found)
+            raise AssertionError(f"Possible N+1 queries detected (threshold {self.threshold}):\n{details}")
+
+
+@contextmanager
+def detect_n_plus_one(engine, threshold=5):
+    """
+    Records every statement executed on `engine` inside the block.
+    Intended for tests:
+
+        with detect_n_plus_one(db.engine) as detector:
+            client.get('/api/tenants/1/branches')
+        detector.assert_no_n_plus_one()
+    """
+    detector = NPlusOneDetector(threshold)
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        detector.record(statement)
+
+    event.listen(engine, "before_cursor_execute", _record)
+    try:
+        yield detector
+    finally:
+        event.remove(engine, "before_cursor_execute", _record)
+
+
+def _record_request_statement(conn, cursor, statement, parameters, context, executemany):
+    if not has_app_context():
+        return
+    detector = g.get("_n_plus_one_detector")
+    if detector is not None:
+        detector.record(statement)
+
+
+def _start_request_detector():
+    g._n_plus_one_detector = NPlusOneDetector(current_app.config.get("N_PLUS_ONE_THRESHOLD", 5))
+
+
+def _report_request_detector(response):
+    detector = g.get("_n_plus_one_detector")
+    if detector is None:
+        return response
+    for fingerprint, count in detector.violations():
+        log.warning(
+            "Possible N+1 query on %s %s (endpoint=%s): executed %d times: %s",
+            request.method, request.path, request.endpoint, count, fingerprint
+        )
+    return response
+
+
+def init_n_plus_one_detection(app, db):
+    """
+    Enables per-request N+1 detection when N_PLUS_ONE_DETECTION is set.
+    Offending statements are logged as warnings; nothing is raised so the
+    detector is safe to leave on in staging.
+    """
+    if not app.config.get("N_PLUS_ONE_DETECTION"):
+        return
+
+    with app.app_context():
+        for engine in db.engines.values():
+            event.listen(engine, "before_cursor_execute", _record_request_statement)
+
+    app.before_request(_start_request_detector)
+    app.after_request(_report_request_detector)
@@ -0,0 +1,162 @@
+"""
+Single-flight read cache for hot service reads.
+
+    return cached_read("tenant_feature_status", tenant_id,
+                       lambda: self._load_features_for_tenant_with_status(tenant_id))
+
+Concurrent callers asking for the same key while it is being computed wait
+for that one computation and share its result (or its exception) instead
+of each querying the database. A result is served as-is for
+READ_CACHE_SOFT_TTL seconds; after that the next caller still gets the
+stale value at once while one background refresh recomputes it, until
+READ_CACHE_HARD_TTL, after which callers wait for a fresh value again.
+Services evict entries through the invalidation bus when the underlying
+data changes, so the TTLs only bound staleness when an invalidation is
+lost.
+
+Caches are per app (app.extensions["read_caches"]) and cached values are
+shared between callers, so they must be treated as read-only.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, has_app_context
+
+from concurrent_loader import run_in_background
+from metrics import registry
+
+log = logging.getLogger(__name__)
+
+READS = registry.counter(
+    "read_cache_requests_total", "Cached reads by cache and outcome (hit, stale, miss, coalesced).", ("cache", "outcome")
+)
+
+
+class _Flight:
+    """One in-progress computation of a key, awaited by every caller that needs it."""
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SingleFlightCache:
+    """
+    Bounded LRU of computed values with at most one computation per key in
+    flight. An invalidation that lands while a value is being computed
+    keeps that value out of the cache, since it may predate the change.
+    """
+    def __init__(self, name, max_entries=10000):
+        self.name = name
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._flights = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, compute, soft_ttl, hard_ttl):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[1] < hard_ttl:
+                self._entries.move_to_end(key)
+                if now - entry[1] < soft_ttl:
+                    READS.inc(cache=self.name, outcome="hit")
+                    return entry[0]
+                READS.inc(cache=self.name, outcome="stale")
+                if key in self._flights:
+                    return entry[0]
+                flight = self._flights[key] = _Flight()
+                generation = self._generation
+                revalidate = True
+            else:
+                flight = self._flights.get(key)
+                if flight is not None:
+                    READS.inc(cache=self.name, outcome="coalesced")
+                    leader = False
+                else:
+                    flight = self._flights[key] = _Flight()
+                    generation = self._generation
+                    READS.inc(cache=self.name, outcome="miss")
+                    leader = True
+                revalidate = False
+
+        if revalidate:
+            def refresh():
+                self._compute(key, flight, compute, generation)
+                if flight.error is not None:
+                    log.warning(f"Read cache {self.name} could not refresh {key!r}; serving the stale value: {flight.error}")
+
+            if run_in_background(refresh) is None and flight.error is None:
+                # Ran inline: the fresh value is already here.
+                return flight.value
+            return entry[0]
+        if leader:
+            self._compute(key, flight, compute, generation)
+        else:
+            flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.value
+
+    def _compute(self, key, flight, compute, generation):
+        try:
+            flight.value = compute()
+        except Exception as e:
+            flight.error = e
+            log.debug(f"Read cache {self.name} failed to compute {key!r}: {e}")
+        finally:
+            with self._lock:
+                if flight.error is None and generation == self._generation:
+                    self._entries[key] = (flight.value, time.monotonic())
+                    self._entries.move_to_end(key)
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    def invalidate(self, predicate=None):
+        """Drops every entry, or the entries whose key matches predicate(key)."""
+        with self._lock:
+            self._generation += 1
+            if predicate is None:
+                self._entries.clear()
+            else:
+                for key in [key for key in self._entries if predicate(key)]:
+                    del self._entries[key]
+
+
+def _get_cache(name):
+    if not has_app_context():
+        return None
+    caches = current_app.extensions.get("read_caches")
+    if caches is None:
+        return None
+    cache = caches.get(name)
+    if cache is None:
+        cache = caches.setdefault(name, SingleFlightCache(name, current_app.config.get("READ_CACHE_MAX_ENTRIES", 10000)))
+    return cache
+
+
+def cached_read(name, key, compute):
+    """Returns compute() through the app's cache `name`, or calls it directly when caching is disabled."""
+    cache = _get_cache(name)
+    if cache is None:
+        return compute()
+    config = current_app.config
+    return cache.get(key, compute, config.get("READ_CACHE_SOFT_TTL", 30.0), config.get("READ_CACHE_HARD_TTL", 300.0))
+
+
+def invalidate_reads(name, predicate=None):
+    """Evicts entries of the app's cache `name`; see SingleFlightCache.invalidate."""
+    cache = _get_cache(name)
+    if cache is not None:
+        cache.invalidate(predicate)
+
+
+def init_read_cache(app):
+    """Gives the app its own set of read caches unless READ_CACHE_ENABLED is off."""
+    if app.config.get("READ_CACHE_ENABLED", True):
+        app.extensions["read_caches"] = {}
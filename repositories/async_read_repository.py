@@ -0,0 +1,80 @@
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import joinedload
+import logging
+
+from models import Tenant, Branch, Feature, TenantFeature, Product, ProductModule, BranchProductModule
+from errors import NotFoundError, TenantNotFoundError, ApplicationError, DatabaseOperationError
+
+log = logging.getLogger(__name__)
+
+
+class AsyncReadRepository:
+    """
+    Read-only queries for the ASGI read path. Each method mirrors the sync
+    repository method of the same purpose, including the errors it raises,
+    but runs on an AsyncSession so the event loop is never blocked on I/O.
+    Relationships the serializers touch are always eager-loaded: lazy loads
+    are not possible on an AsyncSession.
+    """
+
+    async def _all(self, session, statement, description):
+        try:
+            result = await session.execute(statement)
+            return result.unique().scalars().all()
+        except SQLAlchemyError as e:
+            log.exception(f"Database error fetching {description}: {e}")
+            raise DatabaseOperationError(f"Could not retrieve {description}.")
+
+    async def get_tenant_by_id(self, session, tenant_id):
+        tenants = await self._all(session, select(Tenant).filter_by(tenant_id=tenant_id).limit(1), f"Tenant by ID {tenant_id}")
+        if not tenants:
+            raise TenantNotFoundError(f"Tenant with ID {tenant_id} not found.")
+        return tenants[0]
+
+    async def get_product_by_id(self, session, product_id):
+        try:
+            product = await session.get(Product, product_id)
+        except SQLAlchemyError as e:
+            log.exception(f"Database error fetching Product by ID {product_id}: {e}")
+            raise DatabaseOperationError("Database error retrieving Product.")
+        if not product:
+            raise NotFoundError(f"Product with ID {product_id} not found.")
+        return product
+
+    async def get_branch_by_id(self, session, branch_id):
+        return await session.get(Branch, branch_id)
+
+    async def get_all_tenants(self, session):
+        return await self._all(session, select(Tenant), "all Tenant data")
+
+    async def get_branches_by_tenant(self, session, tenant_id):
+        return await self._all(session, select(Branch).filter_by(tenant_id=tenant_id), f"branches for tenant ID {tenant_id}")
+
+    async def get_all_features(self, session):
+        return await self._all(session, select(Feature), "all Feature data")
+
+    async def get_tenant_features(self, session, tenant_id):
+        return await self._all(session, select(TenantFeature).filter_by(tenant_id=tenant_id), "TenantFeatures for tenant")
+
+    async def get_configured_modules_for_branch_product(self, session, branch_id, product_id):
+        statement = select(BranchProductModule).options(
+            joinedload(BranchProductModule.product_module).joinedload(ProductModule.module)
+        ).join(ProductModule).filter(
+            BranchProductModule.branch_id == branch_id,
+            ProductModule.product_id == product_id
+        )
+        try:
+            return await self._all(session, statement, "configured modules")
+        except DatabaseOperationError as e:
+            raise ApplicationError(e.message, status_code=500)
+
+    async def get_product_modules_with_module_details(self, session, product_id):
+        statement = select(ProductModule).options(joinedload(ProductModule.module)).filter_by(product_id=product_id)
+        try:
+            return await self._all(session, statement, "ProductModules with module details")
+        except DatabaseOperationError as e:
+            raise ApplicationError(e.message, status_code=500)
+
+
+async_read_repository = AsyncReadRepository()
@@ -1,14 +1,147 @@
 from extensions import db
 from errors import NotFoundError, ApplicationError, DatabaseOperationError
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from flask import g, has_request_context
+from collections import defaultdict
+from metrics import observe_repository_call
+import functools
+import threading
+import time
 import logging
 
 log = logging.getLogger(__name__)
 
+_cache_stats_lock = threading.Lock()
+_cache_stats = defaultdict(lambda: {"hits": 0, "misses": 0})
+
+
+def _record_cache_stat(model_name, outcome):
+    with _cache_stats_lock:
+        _cache_stats[model_name][outcome] += 1
+
+
+def get_lookup_cache_stats():
+    """
+    Returns cumulative request-scoped lookup cache hits and misses per model,
+    plus the overall hit ratio, since process start or the last reset.
+    """
+    with _cache_stats_lock:
+        per_model = {name: dict(counts) for name, counts in _cache_stats.items()}
+    hits = sum(counts["hits"] for counts in per_model.values())
+    misses = sum(counts["misses"] for counts in per_model.values())
+    return {
+        "models": per_model,
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": hits / (hits + misses) if hits + misses else 0.0,
+    }
+
+
+def reset_lookup_cache_stats():
+    with _cache_stats_lock:
+        _cache_stats.clear()
+
+
+def _request_lookup_cache():
+    """
+    Returns the lookup cache of the current request, or None outside of a
+    request where caching is disabled. Background threads (scheduler,
+    flag table refresher, bus poller, audit writer) hold one app context
+    for their whole life, so keying on the app context alone would let
+    their cache grow forever and serve rows long out of date.
+    """
+    if not has_request_context():
+        return None
+    if "_repository_lookup_cache" not in g:
+        g._repository_lookup_cache = {}
+    return g._repository_lookup_cache
+
+
+def cached_lookup(model, key_name, key_value, loader):
+    """
+    Serves a primary-key or unique-key lookup from the request-scoped cache,
+    calling `loader()` on a miss. Missing rows are not cached so that a
+    create followed by a lookup in the same request sees the new row.
+    """
+    cache = _request_lookup_cache()
+    if cache is None:
+        return loader()
+
+    cache_key = (model.__name__, key_name, key_value)
+    if cache_key in cache:
+        _record_cache_stat(model.__name__, "hits")
+        return cache[cache_key]
+
+    _record_cache_stat(model.__name__, "misses")
+    item = loader()
+    if item is not None:
+        cache[cache_key] = item
+    return item
+
+
+def prime_lookup_cache(model, key_name, items):
+    """Stores already-loaded rows so later lookups by `key_name` are served from memory."""
+    cache = _request_lookup_cache()
+    if cache is None:
+        return
+    for item in items:
+        cache[(model.__name__, key_name, getattr(item, key_name))] = item
+
+
+def invalidate_lookup_cache(model):
+    """Drops every cached lookup for `model` in the current request."""
+    cache = _request_lookup_cache()
+    if not cache:
+        return
+    for cache_key in [key for key in cache if key[0] == model.__name__]:
+        del cache[cache_key]
+
+
+def _timed_repository_method(name, method):
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        start = time.perf_counter()
+        failed = False
+        try:
+            return method(self, *args, **kwargs)
+        except Exception:
+            failed = True
+            raise
+        finally:
+            observe_repository_call(type(self).__name__, name, time.perf_counter() - start, failed)
+    wrapper._repository_timed = True
+    return wrapper
+
+
+def instrument_repository(cls):
+    """
+    Class decorator that records latency and error metrics for every public
+    method defined on `cls`. Subclasses of BaseRepository are instrumented
+    automatically; standalone repositories apply it explicitly.
+    """
+    for name, attr in list(vars(cls).items()):
+        if name.startswith("_") or not callable(attr) or getattr(attr, "_repository_timed", False):
+            continue
+        setattr(cls, name, _timed_repository_method(name, attr))
+    return cls
+
+
+@instrument_repository
 class BaseRepository:
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        instrument_repository(cls)
+
     def __init__(self, model):
         self.model = model
 
+    @property
+    def _pk_name(self):
+        return self.model.__mapper__.primary_key[0].name
+
+    def _cached_lookup(self, key_name, key_value, loader):
+        return cached_lookup(self.model, key_name, key_value, loader)
+
     def get_all(self):
         try:
             
@@ -24,11 +157,11 @@ class BaseRepository:
 
     def get_by_id(self, item_id):
         try:
-            print(f"DEBUG: BaseRepository.get_by_id - Attempting to get {self.model.__name__} with ID {item_id}")
-            item = db.session.get(self.model, item_id)
+            log.debug("BaseRepository.get_by_id - Attempting to get %s with ID %s", self.model.__name__, item_id)
+            item = self._cached_lookup(self._pk_name, item_id, lambda: db.session.get(self.model, item_id))
             if not item:
                 raise NotFoundError(f"{self.model.__name__} with ID {item_id} not found.")
-            print(f"DEBUG: BaseRepository.get_by_id - Found {self.model.__name__}: {item}")
+            log.debug("BaseRepository.get_by_id - Found %s with ID %s", self.model.__name__, item_id)
             return item
         except NotFoundError: 
             raise
@@ -41,11 +174,12 @@ class BaseRepository:
 
     def create(self, **kwargs):
         try:
-            print(f"DEBUG: BaseRepository.create - Attempting to create {self.model.__name__} with data: {kwargs}")
+            log.debug("BaseRepository.create - Attempting to create %s with fields %s", self.model.__name__, list(kwargs))
             item = self.model(**kwargs)
+            invalidate_lookup_cache(self.model)
             db.session.add(item)
             db.session.commit()
-            print(f"DEBUG: BaseRepository.create - Successfully created {self.model.__name__}: {item}")
+            log.debug("BaseRepository.create - Successfully created %s", self.model.__name__)
             return item
         except IntegrityError as e:
             db.session.rollback()
@@ -62,11 +196,12 @@ class BaseRepository:
 
     def update(self, item, **kwargs):
         try:
-            print(f"DEBUG: BaseRepository.update - Attempting to update {self.model.__name__} (ID: {getattr(item, 'id', 'N/A')}) with data: {kwargs}")
+            log.debug("BaseRepository.update - Attempting to update %s with fields %s", self.model.__name__, list(kwargs))
+            invalidate_lookup_cache(self.model)
             for key, value in kwargs.items():
                 setattr(item, key, value)
             db.session.commit()
-            print(f"DEBUG: BaseRepository.update - Successfully updated {self.model.__name__}: {item}")
+            log.debug("BaseRepository.update - Successfully updated %s", self.model.__name__)
             return item
         except IntegrityError as e:
             db.session.rollback()
@@ -83,10 +218,11 @@ class BaseRepository:
 
     def delete(self, item):
         try:
-            print(f"DEBUG: BaseRepository.delete - Attempting to delete {self.model.__name__} (ID: {getattr(item, 'id', 'N/A')})")
+            log.debug("BaseRepository.delete - Attempting to delete %s", self.model.__name__)
+            invalidate_lookup_cache(self.model)
             db.session.delete(item)
             db.session.commit()
-            print(f"DEBUG: BaseRepository.delete - Successfully deleted {self.model.__name__}.")
+            log.debug("BaseRepository.delete - Successfully deleted %s", self.model.__name__)
             return True
         except IntegrityError as e:
             db.session.rollback()
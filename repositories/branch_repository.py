@@ -2,7 +2,9 @@ from extensions import db
 from models import Branch
 from errors import DatabaseOperationError
 from sqlalchemy import exc
+from .base_repository import cached_lookup, invalidate_lookup_cache, instrument_repository
 
+@instrument_repository
 class BranchRepository:
     def get_all(self):
         """Retrieves all Branch records."""
@@ -14,7 +16,7 @@ class BranchRepository:
     def get_by_id(self, branch_id):
         """Retrieves a Branch record by its primary key."""
         try:
-            return db.session.get(Branch, branch_id)
+            return cached_lookup(Branch, 'branch_id', branch_id, lambda: db.session.get(Branch, branch_id))
         except Exception as e:
             raise DatabaseOperationError(f"Failed to retrieve branch with ID {branch_id}: {e}") from e
 
@@ -35,6 +37,7 @@ class BranchRepository:
     def add(self, branch):
         """Adds a new Branch record to the session."""
         try:
+            invalidate_lookup_cache(Branch)
             db.session.add(branch)
         except exc.IntegrityError as e:
             db.session.rollback()
@@ -45,6 +48,7 @@ class BranchRepository:
     def delete(self, branch):
         """Deletes a Branch record from the session."""
         try:
+            invalidate_lookup_cache(Branch)
             db.session.delete(branch)
         except exc.IntegrityError as e:
             db.session.rollback()
@@ -0,0 +1,53 @@
+from sqlalchemy import select
+from models import Branch, Feature, TenantFeature, BranchProductModule, ProductModule
+from extensions import db
+from errors import DatabaseOperationError
+import logging
+
+log = logging.getLogger(__name__)
+
+class ConfigurationBundleRepository:
+    """
+    Set-based reads behind the tenant configuration bundle. Each method is a
+    single query over the whole tenant, whatever its number of branches,
+    features or configured modules.
+    """
+
+    def _rows(self, statement, description):
+        try:
+            return db.session.execute(statement).all()
+        except Exception as e:
+            log.exception(f"Database error fetching {description}: {e}")
+            raise DatabaseOperationError(f"Could not retrieve {description}.")
+
+    def get_feature_states(self, tenant_id):
+        """
+        Returns (feature_id, name, module_id, is_enabled, default_enabled, rollout)
+        for every feature; is_enabled is the tenant's override, None without one.
+        """
+        statement = select(
+            Feature.feature_id, Feature.name, Feature.module_id, TenantFeature.is_enabled, Feature.default_enabled, Feature.rollout
+        ).outerjoin(
+            TenantFeature, (TenantFeature.feature_id == Feature.feature_id) & (TenantFeature.tenant_id == tenant_id)
+        ).order_by(Feature.feature_id)
+        return self._rows(statement, f"feature states for tenant {tenant_id}")
+
+    def get_branches(self, tenant_id):
+        statement = select(Branch.branch_id, Branch.code, Branch.name, Branch.status).where(
+            Branch.tenant_id == tenant_id
+        ).order_by(Branch.branch_id)
+        return self._rows(statement, f"branches for tenant {tenant_id}")
+
+    def get_configured_modules(self, tenant_id):
+        """Returns (branch_id, product_id, module_id) for every module configured on the tenant's branches."""
+        statement = select(BranchProductModule.branch_id, ProductModule.product_id, ProductModule.module_id).join(
+            ProductModule, ProductModule.product_module_id == BranchProductModule.product_module_id
+        ).join(
+            Branch, Branch.branch_id == BranchProductModule.branch_id
+        ).where(
+            Branch.tenant_id == tenant_id
+        ).order_by(BranchProductModule.branch_id, ProductModule.product_id, ProductModule.module_id)
+        return self._rows(statement, f"configured modules for tenant {tenant_id}")
+
+
+configuration_bundle_repository = ConfigurationBundleRepository()
@@ -0,0 +1,100 @@
+import datetime
+
+from flask import current_app
+from .base_repository import BaseRepository
+from models import ConfigurationChange
+from extensions import db
+from errors import DatabaseOperationError
+import logging
+
+log = logging.getLogger(__name__)
+
+class ConfigurationChangeRepository(BaseRepository):
+    """
+    Read side of the change feed outbox. Rows are only ever inserted by the
+    session hook in change_feed.py.
+    """
+    def __init__(self):
+        super().__init__(ConfigurationChange)
+
+    def get_settled_version(self, page_size=1000):
+        """
+        Returns the newest version below which every version has either
+        committed or rolled back. Versions are allocated when a row is
+        inserted but become visible when its transaction commits, so version
+        N+1 can be visible while N is still in flight; reading past the first
+        missing version would let a consumer skip N for good. A missing
+        version is taken to be rolled back once the row after it is older
+        than CHANGE_FEED_GRACE seconds. The result only grows and is kept per
+        app, so each call reads just the rows after the last settled version.
+        """
+        try:
+            state = current_app.extensions.setdefault("change_feed", {})
+            cutoff = datetime.datetime.utcnow() - datetime.timedelta(seconds=current_app.config.get("CHANGE_FEED_GRACE", 5.0))
+            columns = db.session.query(self.model.version, self.model.created_at)
+            settled = state.get("settled_version")
+            if settled is None:
+                # Start from the newest rows: everything older than the grace period has settled.
+                tail = columns.order_by(self.model.version.desc()).limit(page_size).all()
+                older = [version for version, created_at in tail if created_at < cutoff]
+                settled = max(older) if older else (tail[-1].version - 1 if tail else 0)
+            while True:
+                rows = columns.filter(self.model.version > settled).order_by(self.model.version).limit(page_size).all()
+                for version, created_at in rows:
+                    if version != settled + 1 and created_at >= cutoff:
+                        break
+                    settled = version
+                else:
+                    if len(rows) == page_size:
+                        continue
+                break
+            state["settled_version"] = max(settled, state.get("settled_version") or 0)
+            return state["settled_version"]
+        except Exception as e:
+            log.exception(f"Database error fetching the settled configuration change version: {e}")
+            raise DatabaseOperationError("Could not retrieve the settled configuration change version.")
+
+    def get_since(self, since, tenant_id=None, limit=500, until=None):
+        """
+        Returns up to `limit` changes with a version greater than `since` (and
+        at most `until`), oldest first. With a tenant_id, only that tenant's
+        changes plus global ones (products and modules) are returned.
+        """
+        try:
+            query = self.model.query.filter(self.model.version > since)
+            if until is not None:
+                query = query.filter(self.model.version <= until)
+            if tenant_id is not None:
+                query = query.filter(db.or_(self.model.tenant_id == tenant_id, self.model.tenant_id.is_(None)))
+            return query.order_by(self.model.version).limit(limit).all()
+        except Exception as e:
+            log.exception(f"Database error fetching configuration changes since {since}: {e}")
+            raise DatabaseOperationError("Could not retrieve configuration changes.")
+
+    def get_latest_version(self, tenant_id=None, until=None):
+        """
+        Returns the newest version in the feed (at most `until`), or 0 when it
+        is empty. With a tenant_id, only that tenant's changes and global ones
+        count.
+        """
+        try:
+            query = db.session.query(db.func.max(self.model.version))
+            if until is not None:
+                query = query.filter(self.model.version <= until)
+            if tenant_id is not None:
+                query = query.filter(db.or_(self.model.tenant_id == tenant_id, self.model.tenant_id.is_(None)))
+            return query.scalar() or 0
+        except Exception as e:
+            log.exception(f"Database error fetching the latest configuration change version: {e}")
+            raise DatabaseOperationError("Could not retrieve the latest configuration change version.")
+
+    def end_read(self):
+        """
+        Ends the current read transaction, so the next poll sees rows committed
+        in the meantime (MySQL's REPEATABLE READ would otherwise keep serving
+        the first snapshot).
+        """
+        db.session.rollback()
+
+
+configuration_change_repository = ConfigurationChangeRepository()
@@ -2,7 +2,9 @@
 from extensions import db
 from models import Country
 from errors import DatabaseOperationError, NotFoundError
+from .base_repository import instrument_repository
 
+@instrument_repository
 class CountryRepository:
     def get_all(self):
         """Retrieves all Country records."""
@@ -0,0 +1,53 @@
+from sqlalchemy import select
+from models import Tenant, Branch, Feature, TenantFeature, BranchProductModule, ProductModule
+from extensions import db
+from errors import DatabaseOperationError
+import logging
+
+log = logging.getLogger(__name__)
+
+class EntitlementRepository:
+    """
+    Set-based reads behind the entitlement index. Each method is a single
+    query for any number of branches or tenants.
+    """
+
+    def _rows(self, statement, description):
+        try:
+            return db.session.execute(statement).all()
+        except Exception as e:
+            log.exception(f"Database error fetching {description}: {e}")
+            raise DatabaseOperationError(f"Could not retrieve {description}.")
+
+    def get_branch_states(self, branch_ids):
+        """Returns (branch_id, tenant_id, branch_status, tenant_status, tenant_country_id) for the branches that exist."""
+        statement = select(Branch.branch_id, Branch.tenant_id, Branch.status, Tenant.status, Tenant.country_id).outerjoin(
+            Tenant, Tenant.tenant_id == Branch.tenant_id
+        ).where(Branch.branch_id.in_(branch_ids))
+        return self._rows(statement, f"branch states for branches {sorted(branch_ids)}")
+
+    def get_configured_modules(self, branch_ids):
+        """Returns (branch_id, product_id, module_id) for every module configured on the branches."""
+        statement = select(BranchProductModule.branch_id, ProductModule.product_id, ProductModule.module_id).join(
+            ProductModule, ProductModule.product_module_id == BranchProductModule.product_module_id
+        ).where(BranchProductModule.branch_id.in_(branch_ids))
+        return self._rows(statement, f"configured modules for branches {sorted(branch_ids)}")
+
+    def get_feature_modules(self):
+        """
+        Returns (feature_id, module_id, default_enabled, rollout) for every
+        feature; module_id is None for tenant-wide features.
+        """
+        return self._rows(
+            select(Feature.feature_id, Feature.module_id, Feature.default_enabled, Feature.rollout), "feature modules"
+        )
+
+    def get_feature_overrides(self, tenant_ids):
+        """Returns (tenant_id, feature_id, is_enabled) for every override the tenants have set."""
+        statement = select(TenantFeature.tenant_id, TenantFeature.feature_id, TenantFeature.is_enabled).where(
+            TenantFeature.tenant_id.in_(tenant_ids), TenantFeature.is_enabled.is_not(None)
+        )
+        return self._rows(statement, f"feature overrides for tenants {sorted(tenant_ids)}")
+
+
+entitlement_repository = EntitlementRepository()
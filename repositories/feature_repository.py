@@ -14,7 +14,7 @@ class FeatureRepository(BaseRepository):
         Overrides BaseRepository's get_by_id to raise FeatureNotFoundError.
         """
         try:
-            item = self.model.query.get(item_id)
+            item = self._cached_lookup('feature_id', item_id, lambda: self.model.query.get(item_id))
             if not item:
                 raise FeatureNotFoundError(f"Feature with ID {item_id} not found.")
             return item
@@ -29,7 +29,7 @@ class FeatureRepository(BaseRepository):
         Retrieves a Feature record by its unique code.
         """
         try:
-            return self.model.query.filter_by(code=code).first()
+            return self._cached_lookup('code', code, lambda: self.model.query.filter_by(code=code).first())
         except Exception as e:
             log.exception(f"Database error fetching Feature by code '{code}': {e}")
             raise DatabaseOperationError("Could not retrieve Feature by code.")
@@ -3,7 +3,9 @@ from extensions import db
 from models import Module
 from errors import DatabaseOperationError
 from sqlalchemy import exc
+from .base_repository import instrument_repository
 
+@instrument_repository
 class ModuleRepository:
     def get_all(self):
         """Retrieves all Module records."""
@@ -1,4 +1,4 @@
-from .base_repository import BaseRepository
+from .base_repository import BaseRepository, prime_lookup_cache
 from models import ProductModule
 from extensions import db
 from errors import NotFoundError, ApplicationError
@@ -61,7 +61,9 @@ class ProductModuleRepository(BaseRepository):
         Retrieves all ProductModule records linked to a specific product.
         """
         try:
-            return self.model.query.filter_by(product_id=product_id).all()
+            product_modules = self.model.query.filter_by(product_id=product_id).all()
+            prime_lookup_cache(self.model, 'product_module_id', product_modules)
+            return product_modules
         except Exception as e:
             log.exception(f"Database error fetching ProductModules for product {product_id}: {e}")
             raise ApplicationError("Could not retrieve ProductModules for product.", status_code=500)
@@ -14,7 +14,7 @@ class ProductRepository(BaseRepository):
         Retrieves a Product record by its unique code.
         """
         try:
-            return self.model.query.filter_by(code=code).first()
+            return self._cached_lookup('code', code, lambda: self.model.query.filter_by(code=code).first())
         except Exception as e:
             log.exception(f"Database error fetching Product by code '{code}': {e}")
             raise ApplicationError("Could not retrieve Product by code.", status_code=500)
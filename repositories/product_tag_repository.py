@@ -15,7 +15,7 @@ class ProductTagRepository(BaseRepository):
         Overrides BaseRepository's get_by_id to raise ProductTagNotFoundError.
         """
         try:
-            item = self.model.query.get(item_id)
+            item = self._cached_lookup('product_tag_id', item_id, lambda: self.model.query.get(item_id))
             if not item:
                 raise ProductTagNotFoundError(f"Product Tag with ID {item_id} not found.")
             return item
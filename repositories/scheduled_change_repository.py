@@ -0,0 +1,128 @@
+from sqlalchemy import func, select
+from .base_repository import BaseRepository, invalidate_lookup_cache
+from models import ScheduledChange, Tenant, Feature, TenantFeature, Branch, ProductModule, BranchProductModule
+from extensions import db
+from errors import DatabaseOperationError
+import logging
+
+log = logging.getLogger(__name__)
+
+class ScheduledChangeRepository(BaseRepository):
+    """
+    Pending changes and the set-based reads and writes the scheduler applies
+    them with: each read is one query for a whole batch, and a batch is
+    written in a single transaction.
+    """
+    def __init__(self):
+        super().__init__(ScheduledChange)
+
+    def _rows(self, statement, description):
+        try:
+            return db.session.execute(statement).scalars().all()
+        except Exception as e:
+            log.exception(f"Database error fetching {description}: {e}")
+            raise DatabaseOperationError(f"Could not retrieve {description}.")
+
+    def create_many(self, rows):
+        """Inserts the given scheduled changes in one transaction and returns them."""
+        try:
+            items = [self.model(**row) for row in rows]
+            db.session.add_all(items)
+            db.session.flush()
+            ids = [item.scheduled_change_id for item in items]
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            log.exception(f"Database error scheduling {len(rows)} changes: {e}")
+            raise DatabaseOperationError("Could not schedule the changes.")
+        # One read instead of a refresh per expired row.
+        statement = select(ScheduledChange).where(ScheduledChange.scheduled_change_id.in_(ids)).order_by(ScheduledChange.scheduled_change_id)
+        return self._rows(statement, "scheduled changes")
+
+    def get_due(self, now, limit=1000, lock=True):
+        """
+        Returns up to `limit` pending changes due at `now`, oldest first.
+        With `lock`, where the database supports it, the rows stay locked
+        until the caller commits and rows locked by another scheduler are
+        skipped.
+        """
+        statement = select(ScheduledChange).where(
+            ScheduledChange.status == 'pending',
+            ScheduledChange.apply_at <= now,
+            func.coalesce(ScheduledChange.next_attempt_at, ScheduledChange.apply_at) <= now,
+        ).order_by(ScheduledChange.apply_at, ScheduledChange.scheduled_change_id).limit(limit)
+        if lock:
+            statement = statement.with_for_update(skip_locked=True)
+        return self._rows(statement, "due scheduled changes")
+
+    def get_all(self, status=None, limit=500):
+        statement = select(ScheduledChange)
+        if status is not None:
+            statement = statement.where(ScheduledChange.status == status)
+        statement = statement.order_by(ScheduledChange.apply_at, ScheduledChange.scheduled_change_id).limit(limit)
+        return self._rows(statement, "scheduled changes")
+
+    def get_tenants(self, tenant_ids):
+        return self._rows(select(Tenant).where(Tenant.tenant_id.in_(tenant_ids)), "tenants for scheduled changes")
+
+    def get_features(self, feature_ids):
+        return self._rows(select(Feature).where(Feature.feature_id.in_(feature_ids)), "features for scheduled changes")
+
+    def get_branches(self, branch_ids):
+        return self._rows(select(Branch).where(Branch.branch_id.in_(branch_ids)), "branches for scheduled changes")
+
+    def get_product_modules(self, product_module_ids):
+        return self._rows(
+            select(ProductModule).where(ProductModule.product_module_id.in_(product_module_ids)),
+            "product modules for scheduled changes"
+        )
+
+    def get_tenant_features(self, tenant_ids, feature_ids):
+        """Returns the TenantFeature rows of the given tenants for the given features."""
+        statement = select(TenantFeature).where(
+            TenantFeature.tenant_id.in_(tenant_ids), TenantFeature.feature_id.in_(feature_ids)
+        )
+        return self._rows(statement, "tenant features for scheduled changes")
+
+    def get_branch_product_modules(self, branch_ids, product_module_ids):
+        """Returns the module configurations of the given branches for the given product modules."""
+        statement = select(BranchProductModule).where(
+            BranchProductModule.branch_id.in_(branch_ids), BranchProductModule.product_module_id.in_(product_module_ids)
+        )
+        return self._rows(statement, "module configurations for scheduled changes")
+
+    def apply(self, added, deleted, updated, changes, now):
+        """
+        Writes one batch in a single transaction: inserts `added`, deletes
+        `deleted`, sets is_enabled on each (TenantFeature, value) in `updated`
+        and marks `changes` applied. Either all of it commits or none of it.
+        """
+        try:
+            for model in (TenantFeature, BranchProductModule):
+                invalidate_lookup_cache(model)
+            db.session.add_all(added)
+            for item in deleted:
+                db.session.delete(item)
+            for item, is_enabled in updated:
+                item.is_enabled = is_enabled
+            for change in changes:
+                change.status = 'applied'
+                change.applied_at = now
+                change.attempts += 1
+                change.last_error = None
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            log.exception(f"Database error applying {len(changes)} scheduled changes: {e}")
+            raise DatabaseOperationError(f"Could not apply scheduled changes: {e}")
+
+    def save(self):
+        """Commits status changes made to loaded ScheduledChange rows."""
+        try:
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            log.exception(f"Database error saving scheduled change status: {e}")
+            raise DatabaseOperationError("Could not save scheduled change status.")
+
+scheduled_change_repository = ScheduledChangeRepository()
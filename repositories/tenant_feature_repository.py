@@ -1,10 +1,23 @@
-from .base_repository import BaseRepository
-from models import TenantFeature
+from .base_repository import BaseRepository, invalidate_lookup_cache
+from sqlalchemy import delete, or_, select
+from models import Feature, TenantFeature
 from errors import DatabaseOperationError, TenantFeatureNotFoundError
 import logging
 from extensions import db 
 log = logging.getLogger(__name__)
 
+
+def _redundant():
+    """
+    Override rows that change nothing: no state at all, or the feature's own
+    default where no rollout can enable it for some tenants and not others.
+    """
+    default = select(Feature.default_enabled).where(
+        Feature.feature_id == TenantFeature.feature_id, or_(Feature.default_enabled.is_(True), Feature.rollout.is_(None))
+    ).scalar_subquery()
+    return or_(TenantFeature.is_enabled.is_(None), TenantFeature.is_enabled == default)
+
+
 class TenantFeatureRepository(BaseRepository):
     def __init__(self):
         super().__init__(TenantFeature)
@@ -14,7 +27,7 @@ class TenantFeatureRepository(BaseRepository):
         Overrides BaseRepository's get_by_id to raise TenantFeatureNotFoundError.
         """
         try:
-            item = self.model.query.get(item_id)
+            item = self._cached_lookup('tenant_feature_id', item_id, lambda: self.model.query.get(item_id))
             if not item:
                 raise TenantFeatureNotFoundError(f"TenantFeature with ID {item_id} not found.")
             return item
@@ -44,4 +57,37 @@ class TenantFeatureRepository(BaseRepository):
             log.exception(f"Database error fetching all TenantFeatures for tenant {tenant_id}: {e}")
             raise DatabaseOperationError("Could not retrieve TenantFeatures for tenant.")
 
+    def get_redundant_override_ids(self, after_id=0, limit=1000):
+        """
+        Returns up to `limit` ids, in order and above `after_id`, of override
+        rows that do not change anything: those matching their feature's
+        default and those with no state at all.
+        """
+        try:
+            statement = select(TenantFeature.tenant_feature_id).where(
+                TenantFeature.tenant_feature_id > after_id, _redundant()
+            ).order_by(TenantFeature.tenant_feature_id).limit(limit)
+            return db.session.execute(statement).scalars().all()
+        except Exception as e:
+            log.exception(f"Database error fetching redundant TenantFeature overrides after {after_id}: {e}")
+            raise DatabaseOperationError("Could not retrieve redundant TenantFeature overrides.")
+
+    def delete_redundant_overrides(self, tenant_feature_ids):
+        """
+        Deletes those of the given rows that are still redundant, in one
+        statement, and returns how many were removed. The condition is checked
+        again so that a row changed since it was selected is kept.
+        """
+        try:
+            invalidate_lookup_cache(TenantFeature)
+            result = db.session.execute(
+                delete(TenantFeature).where(TenantFeature.tenant_feature_id.in_(tenant_feature_ids), _redundant())
+            )
+            db.session.commit()
+            return result.rowcount
+        except Exception as e:
+            db.session.rollback()
+            log.exception(f"Database error deleting {len(tenant_feature_ids)} TenantFeature rows: {e}")
+            raise DatabaseOperationError("Could not delete TenantFeature overrides.")
+
 tenant_feature_repository = TenantFeatureRepository()
\ No newline at end of file
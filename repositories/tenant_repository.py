@@ -18,11 +18,14 @@ class TenantRepository(BaseRepository):
         It uses filter_by to find by tenant_id.
         """
         try:
-            print(f"DEBUG: TenantRepository.get_by_id - Attempting to get Tenant with ID {tenant_id}")
-            tenant = self.model.query.filter_by(tenant_id=tenant_id).first()
+            log.debug("TenantRepository.get_by_id - Attempting to get Tenant with ID %s", tenant_id)
+            tenant = self._cached_lookup(
+                'tenant_id', tenant_id,
+                lambda: self.model.query.filter_by(tenant_id=tenant_id).first()
+            )
             if not tenant:
                 raise TenantNotFoundError(f"Tenant with ID {tenant_id} not found.")
-            print(f"DEBUG: TenantRepository.get_by_id - Found Tenant: {tenant}")
+            log.debug("TenantRepository.get_by_id - Found Tenant with ID %s", tenant_id)
             return tenant
         except TenantNotFoundError:
             raise
@@ -34,14 +37,20 @@ class TenantRepository(BaseRepository):
 
     def get_by_organization_code(self, organization_code):
         try:
-            return self.model.query.filter_by(organization_code=organization_code).first()
+            return self._cached_lookup(
+                'organization_code', organization_code,
+                lambda: self.model.query.filter_by(organization_code=organization_code).first()
+            )
         except Exception as e:
             log.exception(f"Database error fetching Tenant by organization_code '{organization_code}': {e}")
             raise ApplicationError("Could not retrieve Tenant by organization code.", status_code=500)
 
     def get_by_sub_domain(self, sub_domain):
         try:
-            return self.model.query.filter_by(sub_domain=sub_domain).first()
+            return self._cached_lookup(
+                'sub_domain', sub_domain,
+                lambda: self.model.query.filter_by(sub_domain=sub_domain).first()
+            )
         except Exception as e:
             log.exception(f"Database error fetching Tenant by sub_domain '{sub_domain}': {e}")
             raise ApplicationError("Could not retrieve Tenant by sub-domain.", status_code=500)
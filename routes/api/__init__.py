@@ -8,6 +8,9 @@ from .product_api_routes import product_api_bp
 from .product_module_api_routes import product_module_api_bp
 from .branch_product_module_api_routes import branch_product_module_api_bp 
 from .tenant_feature_api_routes import tenant_feature_api_bp 
+from .change_feed_api_routes import change_feed_api_bp
+from .feature_api_routes import feature_api_bp
+from .scheduled_change_api_routes import scheduled_change_api_bp
 
 api_bp.register_blueprint(tenant_api_bp,url_prefix="/tenants")
 api_bp.register_blueprint(branch_api_bp,url_prefix="/branches")
@@ -15,3 +18,6 @@ api_bp.register_blueprint(product_api_bp,url_prefix="/products")
 api_bp.register_blueprint(product_module_api_bp)
 api_bp.register_blueprint(branch_product_module_api_bp) 
 api_bp.register_blueprint(tenant_feature_api_bp) 
+api_bp.register_blueprint(change_feed_api_bp)
+api_bp.register_blueprint(feature_api_bp)
+api_bp.register_blueprint(scheduled_change_api_bp)
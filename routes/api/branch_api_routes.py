@@ -1,7 +1,8 @@
-from flask import Blueprint, jsonify, current_app
+from flask import Blueprint, jsonify, current_app, request
 
 from services.branch_service import branch_service
 from services.branch_product_module_services import branch_product_module_service
+from services.entitlement_service import entitlement_service
 from schemas.message_schemas import MessageSchema
 from schemas.branch_product_module_schemas import ConfiguredBranchProductModuleOutputSchema 
 
@@ -48,4 +49,22 @@ def get_branch_product_configured_modules(branch_id, product_id):
         return jsonify(message_schema.dump({"status": "error", "message": e.message, "code": e.status_code})), e.status_code
     except Exception as e:
         current_app.logger.exception(f"Unexpected error getting branch product configured modules: {str(e)}")
-        return jsonify(message_schema.dump({"status": "error", "message": "Internal server error", "details": str(e), "code": 500})), 500
\ No newline at end of file
+        return jsonify(message_schema.dump({"status": "error", "message": "Internal server error", "details": str(e), "code": 500})), 500
+
+@branch_api_bp.route('/<int:branch_id>/entitlements', methods=['GET'])
+def get_branch_entitlements(branch_id):
+    """
+    API route to get the modules and features a branch is entitled to, per product.
+    GET /api/branches/<branch_id>/entitlements[?product_id=<id>]
+    """
+    try:
+        product_id = request.args.get('product_id', type=int)
+        return jsonify(entitlement_service.get_entitlements(branch_id, product_id)), 200
+    except NotFoundError as e:
+        return jsonify(message_schema.dump({"status": "error", "message": e.message, "code": e.status_code})), e.status_code
+    except ApplicationError as e:
+        current_app.logger.error(f"Error resolving entitlements for branch {branch_id}: {e.message}", exc_info=True)
+        return jsonify(message_schema.dump({"status": "error", "message": e.message, "code": e.status_code})), e.status_code
+    except Exception as e:
+        current_app.logger.exception(f"Unexpected error resolving entitlements for branch {branch_id}: {str(e)}")
+        return jsonify(message_schema.dump({"status": "error", "message": "Internal server error", "details": str(e), "code": 500})), 500
@@ -0,0 +1,69 @@
+import json
+
+from flask import Blueprint, Response, jsonify, request, current_app, stream_with_context
+
+from services.change_feed_service import change_feed_service
+from schemas.message_schemas import MessageSchema
+
+from errors import ApplicationError
+
+change_feed_api_bp = Blueprint('api_change_feed', __name__, url_prefix='/changes')
+
+message_schema = MessageSchema()
+
+MAX_PAGE_SIZE = 1000
+
+
+def _wants_event_stream():
+    return request.accept_mimetypes.best == 'text/event-stream' or request.args.get('stream') == 'sse'
+
+
+def _event_stream(since, tenant_id, limit):
+    config = current_app.config
+    for change in change_feed_service.stream_changes(
+        since, tenant_id, limit, config['CHANGE_FEED_POLL_INTERVAL'], config['CHANGE_FEED_HEARTBEAT']
+    ):
+        if change is None:
+            yield ": keepalive\n\n"
+        else:
+            yield f"id: {change['version']}\nevent: change\ndata: {json.dumps(change)}\n\n"
+
+
+@change_feed_api_bp.route('/', methods=['GET'])
+def get_changes():
+    """
+    API route for the configuration change feed.
+    GET /api/changes?since=<version>[&tenant_id=<id>][&limit=<n>][&wait=<seconds>]
+    returns the changes after `since`; with `wait`, it long-polls until a change
+    commits. With Accept: text/event-stream (or ?stream=sse) it streams changes
+    as Server-Sent Events and resumes from Last-Event-ID on reconnect; streams
+    are refused with 406 unless CHANGE_FEED_SSE_ENABLED is set, because each
+    one holds a sync worker thread for as long as it stays open.
+    """
+    try:
+        since = request.args.get('since', type=int)
+        if since is None:
+            since = request.headers.get('Last-Event-ID', 0, type=int)
+        tenant_id = request.args.get('tenant_id', type=int)
+        limit = min(request.args.get('limit', current_app.config['CHANGE_FEED_PAGE_SIZE'], type=int), MAX_PAGE_SIZE)
+        if since < 0 or limit < 1:
+            return jsonify(message_schema.dump({"status": "error", "message": "since must be >= 0 and limit >= 1.", "code": 400})), 400
+
+        if _wants_event_stream():
+            if not current_app.config.get('CHANGE_FEED_SSE_ENABLED'):
+                return jsonify(message_schema.dump({"status": "error", "message": "Event streams are disabled on this server; long-poll with ?wait= instead.", "code": 406})), 406
+            return Response(
+                stream_with_context(_event_stream(since, tenant_id, limit)),
+                mimetype='text/event-stream',
+                headers={'Cache-Control': 'no-cache, no-transform', 'X-Accel-Buffering': 'no'},
+            )
+
+        wait = max(0.0, min(request.args.get('wait', 0.0, type=float), current_app.config['CHANGE_FEED_MAX_WAIT']))
+        result = change_feed_service.get_changes(since, tenant_id, limit, wait, current_app.config['CHANGE_FEED_POLL_INTERVAL'])
+        return jsonify(result), 200
+    except ApplicationError as e:
+        current_app.logger.error(f"Error reading change feed: {e.message}", exc_info=True)
+        return jsonify(message_schema.dump({"status": "error", "message": e.message, "code": e.status_code})), e.status_code
+    except Exception as e:
+        current_app.logger.exception(f"Unexpected error reading change feed: {str(e)}")
+        return jsonify(message_schema.dump({"status": "error", "message": "Internal server error", "details": str(e), "code": 500})), 500
@@ -0,0 +1,53 @@
+from flask import Blueprint, jsonify, request, current_app
+
+from services.feature_service import feature_service
+from schemas.message_schemas import MessageSchema
+
+from errors import NotFoundError, ApplicationError, ValidationError
+
+feature_api_bp = Blueprint('api_feature', __name__, url_prefix='/features')
+
+message_schema = MessageSchema()
+
+
+@feature_api_bp.route('/<int:feature_id>/rollout', methods=['GET'])
+def get_feature_rollout(feature_id):
+    """
+    API route to get a feature's default state and rollout rule.
+    GET /api/features/<feature_id>/rollout
+    """
+    try:
+        return jsonify(feature_service.get_rollout(feature_id)), 200
+    except NotFoundError as e:
+        return jsonify(message_schema.dump({"status": "error", "message": e.message, "code": e.status_code})), e.status_code
+    except ApplicationError as e:
+        current_app.logger.error(f"Error getting rollout for feature {feature_id}: {e.message}", exc_info=True)
+        return jsonify(message_schema.dump({"status": "error", "message": e.message, "code": e.status_code})), e.status_code
+    except Exception as e:
+        current_app.logger.exception(f"Unexpected error getting rollout for feature {feature_id}: {str(e)}")
+        return jsonify(message_schema.dump({"status": "error", "message": "Internal server error", "details": str(e), "code": 500})), 500
+
+
+@feature_api_bp.route('/<int:feature_id>/rollout', methods=['PUT', 'DELETE'])
+def set_feature_rollout(feature_id):
+    """
+    API route to replace (PUT) or remove (DELETE) a feature's rollout rule.
+    PUT /api/features/<feature_id>/rollout  {"percentage": 50, "tenant_ids": [...], "country_ids": [...]}
+    """
+    data = None
+    if request.method == 'PUT':
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify(message_schema.dump({'status': 'error', 'message': 'Request body must be a JSON object', 'code': 400})), 400
+    try:
+        return jsonify(feature_service.set_rollout(feature_id, data)), 200
+    except NotFoundError as e:
+        return jsonify(message_schema.dump({"status": "error", "message": e.message, "code": e.status_code})), e.status_code
+    except ValidationError as e:
+        return jsonify(message_schema.dump({"status": "error", "message": e.message, "details": e.errors, "code": e.status_code})), e.status_code
+    except ApplicationError as e:
+        current_app.logger.error(f"Error updating rollout for feature {feature_id}: {e.message}", exc_info=True)
+        return jsonify(message_schema.dump({"status": "error", "message": e.message, "code": e.status_code})), e.status_code
+    except Exception as e:
+        current_app.logger.exception(f"Unexpected error updating rollout for feature {feature_id}: {str(e)}")
+        return jsonify(message_schema.dump({"status": "error", "message": "Internal server error", "details": str(e), "code": 500})), 500
@@ -0,0 +1,115 @@
+import datetime
+
+from flask import Blueprint, jsonify, request, current_app
+
+from services.scheduled_change_service import scheduled_change_service
+from schemas.message_schemas import MessageSchema
+
+from errors import NotFoundError, ApplicationError, ValidationError
+
+scheduled_change_api_bp = Blueprint('api_scheduled_change', __name__, url_prefix='/scheduled-changes')
+
+message_schema = MessageSchema()
+
+
+def _error_response(e):
+    return jsonify(message_schema.dump({"status": "error", "message": e.message, "details": e.errors, "code": e.status_code})), e.status_code
+
+
+def _parse_at():
+    at = request.args.get('at')
+    if at is None:
+        return None
+    try:
+        return datetime.datetime.fromisoformat(at.replace('Z', '+00:00'))
+    except ValueError:
+        raise ValidationError("at must be an ISO 8601 date and time.")
+
+
+@scheduled_change_api_bp.route('/', methods=['POST'])
+def schedule_changes():
+    """
+    API route to schedule tenant feature or module configuration changes.
+    POST /api/scheduled-changes/  {"changes": [{"entity_type", "action", "apply_at", ...target ids}]}
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not isinstance(data.get('changes'), list):
+        return jsonify(message_schema.dump({'status': 'error', 'message': 'Request body must be a JSON object with a "changes" list', 'code': 400})), 400
+    try:
+        return jsonify(scheduled_change_service.schedule_changes(data['changes'], created_by=data.get('created_by'))), 201
+    except ValidationError as e:
+        return _error_response(e)
+    except ApplicationError as e:
+        current_app.logger.error(f"Error scheduling changes: {e.message}", exc_info=True)
+        return _error_response(e)
+    except Exception as e:
+        current_app.logger.exception(f"Unexpected error scheduling changes: {str(e)}")
+        return jsonify(message_schema.dump({"status": "error", "message": "Internal server error", "details": str(e), "code": 500})), 500
+
+
+@scheduled_change_api_bp.route('/', methods=['GET'])
+def get_scheduled_changes():
+    """
+    API route to list scheduled changes, soonest first.
+    GET /api/scheduled-changes/[?status=pending|applied|failed|cancelled]
+    """
+    try:
+        return jsonify(scheduled_change_service.get_scheduled_changes(request.args.get('status'))), 200
+    except ApplicationError as e:
+        current_app.logger.error(f"Error listing scheduled changes: {e.message}", exc_info=True)
+        return _error_response(e)
+    except Exception as e:
+        current_app.logger.exception(f"Unexpected error listing scheduled changes: {str(e)}")
+        return jsonify(message_schema.dump({"status": "error", "message": "Internal server error", "details": str(e), "code": 500})), 500
+
+
+@scheduled_change_api_bp.route('/<int:scheduled_change_id>', methods=['DELETE'])
+def cancel_scheduled_change(scheduled_change_id):
+    """
+    API route to cancel a pending scheduled change.
+    DELETE /api/scheduled-changes/<scheduled_change_id>
+    """
+    try:
+        return jsonify(scheduled_change_service.cancel_change(scheduled_change_id)), 200
+    except (NotFoundError, ValidationError) as e:
+        return _error_response(e)
+    except ApplicationError as e:
+        current_app.logger.error(f"Error cancelling scheduled change {scheduled_change_id}: {e.message}", exc_info=True)
+        return _error_response(e)
+    except Exception as e:
+        current_app.logger.exception(f"Unexpected error cancelling scheduled change {scheduled_change_id}: {str(e)}")
+        return jsonify(message_schema.dump({"status": "error", "message": "Internal server error", "details": str(e), "code": 500})), 500
+
+
+@scheduled_change_api_bp.route('/preview', methods=['GET'])
+def preview_scheduled_changes():
+    """
+    API route for a dry run: what applying the changes due at a time would do.
+    GET /api/scheduled-changes/preview[?at=<ISO 8601>]
+    """
+    try:
+        return jsonify(scheduled_change_service.preview(_parse_at())), 200
+    except ValidationError as e:
+        return _error_response(e)
+    except ApplicationError as e:
+        current_app.logger.error(f"Error previewing scheduled changes: {e.message}", exc_info=True)
+        return _error_response(e)
+    except Exception as e:
+        current_app.logger.exception(f"Unexpected error previewing scheduled changes: {str(e)}")
+        return jsonify(message_schema.dump({"status": "error", "message": "Internal server error", "details": str(e), "code": 500})), 500
+
+
+@scheduled_change_api_bp.route('/apply', methods=['POST'])
+def apply_scheduled_changes():
+    """
+    API route to apply the changes due now instead of waiting for the scheduler.
+    POST /api/scheduled-changes/apply
+    """
+    try:
+        return jsonify(scheduled_change_service.apply_due_changes()), 200
+    except ApplicationError as e:
+        current_app.logger.error(f"Error applying scheduled changes: {e.message}", exc_info=True)
+        return _error_response(e)
+    except Exception as e:
+        current_app.logger.exception(f"Unexpected error applying scheduled changes: {str(e)}")
+        return jsonify(message_schema.dump({"status": "error", "message": "Internal server error", "details": str(e), "code": 500})), 500
@@ -2,11 +2,14 @@ from flask import Blueprint, jsonify, request, current_app
 
 from services.tenant_service import tenant_service
 from services.branch_service import branch_service
+from services.configuration_context_service import configuration_context_service
+from services.configuration_bundle_service import configuration_bundle_service
 from schemas.message_schemas import MessageSchema
 from schemas.tenant_schemas import TenantBaseSchema,TenantOutputSchema, TenantMinimalOutputSchema
 from schemas.branch_schemas import BranchBaseSchema 
 
 from errors import NotFoundError, ApplicationError, ValidationError, DatabaseOperationError
+from compression import encoded_etags
 
 tenant_api_bp = Blueprint('api_tenant', __name__, url_prefix='/tenants')
 
@@ -49,7 +52,6 @@ def get_tenant(tenant_id, organization_code, sub_domain):
     """
     try:
         tenant = tenant_service.get_tenant_by_composite_pk(tenant_id, organization_code, sub_domain)
-        print(f"DEBUG: API /tenants GET - Tenant data before jsonify: {tenant}")
         return jsonify(tenant), 200
     except NotFoundError as e:
         return jsonify(message_schema.dump({"status": "error", "message": e.message, "code": e.status_code})), e.status_code
@@ -68,7 +70,6 @@ def get_branches_by_tenant(tenant_id):
     """
     try:
         branches = branch_service.get_branches_by_tenant(tenant_id)
-        print(f"DEBUG: API /tenants/{tenant_id}/branches GET - Branches data before jsonify: {branches}")
         return jsonify(branches), 200
     except NotFoundError as e: 
         return jsonify(message_schema.dump({"status": "error", "message": e.message, "code": e.status_code})), e.status_code
@@ -79,6 +80,64 @@ def get_branches_by_tenant(tenant_id):
         current_app.logger.exception(f"Unexpected error getting branches by tenant {tenant_id}: {str(e)}")
         return jsonify(message_schema.dump({"status": "error", "message": "Internal server error", "details": str(e), "code": 500})), 500
 
+@tenant_api_bp.route('/<int:tenant_id>/configuration-context', methods=['GET'])
+def get_configuration_context(tenant_id):
+    """
+    API route returning the module configuration page's data for a tenant in one response:
+    all products, the tenant's branches and, when branch_id and product_id are given,
+    the product's modules with their configured status for that branch.
+    """
+    try:
+        context = configuration_context_service.get_configuration_context(
+            tenant_id,
+            request.args.get('branch_id', type=int),
+            request.args.get('product_id', type=int),
+            current_app.config['MODULE_ID_SEQUENCES']
+        )
+        return jsonify(context), 200
+    except NotFoundError as e:
+        return jsonify(message_schema.dump({"status": "error", "message": e.message, "code": e.status_code})), e.status_code
+    except ApplicationError as e:
+        current_app.logger.error(f"Error getting configuration context for tenant {tenant_id}: {e.message}", exc_info=True)
+        return jsonify(message_schema.dump({"status": "error", "message": e.message, "code": e.status_code})), e.status_code
+    except Exception as e:
+        current_app.logger.exception(f"Unexpected error getting configuration context for tenant {tenant_id}: {str(e)}")
+        return jsonify(message_schema.dump({"status": "error", "message": "Internal server error", "details": str(e), "code": 500})), 500
+
+@tenant_api_bp.route('/<int:tenant_id>/configuration-bundle', methods=['GET'])
+def get_configuration_bundle(tenant_id):
+    """
+    API route returning a tenant's effective configuration (tenant status, enabled
+    features, branches and configured modules per branch and product) in one response.
+    With since_version=<version> a client that holds an earlier bundle receives only
+    the difference, or 304 Not Modified when it is current. The ETag is
+    "<tenant_id>-<version>" (with an encoding suffix when the response is compressed),
+    so plain conditional GETs work as well.
+    """
+    try:
+        bundle = configuration_bundle_service.get_bundle(tenant_id, request.args.get('since_version', type=int))
+        etag = f"{tenant_id}-{bundle['version']}"
+        matched = None
+        if bundle['version'] is not None:
+            matched = next((tag for tag in encoded_etags(etag) if request.if_none_match.contains(tag)), None)
+        if bundle['mode'] == 'unchanged' or matched:
+            response = current_app.response_class(status=304)
+        else:
+            response = jsonify(bundle)
+        if bundle['version'] is not None:
+            # A 304 is never compressed, so it repeats the tag the client holds.
+            response.set_etag(matched or etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+    except NotFoundError as e:
+        return jsonify(message_schema.dump({"status": "error", "message": e.message, "code": e.status_code})), e.status_code
+    except ApplicationError as e:
+        current_app.logger.error(f"Error building configuration bundle for tenant {tenant_id}: {e.message}", exc_info=True)
+        return jsonify(message_schema.dump({"status": "error", "message": e.message, "code": e.status_code})), e.status_code
+    except Exception as e:
+        current_app.logger.exception(f"Unexpected error building configuration bundle for tenant {tenant_id}: {str(e)}")
+        return jsonify(message_schema.dump({"status": "error", "message": "Internal server error", "details": str(e), "code": 500})), 500
+
 @tenant_api_bp.route("/<int:tenant_id>/<organization_code>/<sub_domain>", methods=["DELETE"])
 def delete_tenant(tenant_id, organization_code, sub_domain):
     """
@@ -59,6 +59,40 @@ def get_tenant_features_api(tenant_id):
         return jsonify({'status': 'error', 'message': 'An internal server error occurred', 'details': str(e)}), 500
 
 
+@tenant_feature_api_bp.route('/<int:tenant_id>/features/<int:feature_id>', methods=['GET'])
+def get_tenant_feature_status_api(tenant_id, feature_id):
+    """
+    API endpoint to check whether one feature is enabled for a tenant.
+    ---
+    parameters:
+      - in: path
+        name: tenant_id
+        type: integer
+        required: true
+      - in: path
+        name: feature_id
+        type: integer
+        required: true
+    responses:
+      200:
+        description: The feature's status for the tenant.
+      404:
+        description: Tenant or Feature not found.
+        schema:
+          $ref: '#/definitions/MessageSchema'
+    """
+    try:
+        is_enabled = tenant_feature_service.is_feature_enabled(tenant_id, feature_id)
+        return jsonify({'tenant_id': tenant_id, 'feature_id': feature_id, 'is_enabled': is_enabled}), 200
+    except (TenantNotFoundError, FeatureNotFoundError, NotFoundError) as e:
+        return jsonify(message_schema.dump({"status": "error", "message": e.message, "code": e.status_code})), e.status_code
+    except (DatabaseOperationError, ApplicationError) as e:
+        current_app.logger.error(f"Error checking feature {feature_id} for tenant {tenant_id}: {e.message}", exc_info=True)
+        return jsonify(message_schema.dump({"status": "error", "message": e.message, "code": e.status_code})), e.status_code
+    except Exception as e:
+        current_app.logger.exception(f"Unexpected error in get_tenant_feature_status_api({tenant_id}, {feature_id}): {str(e)}")
+        return jsonify({'status': 'error', 'message': 'An internal server error occurred', 'details': str(e)}), 500
+
 
 @tenant_feature_api_bp.route('/configure', methods=['POST'])
 def configure_tenant_features_api():
@@ -10,6 +10,8 @@ from services.product_services import product_service
 from services.branch_product_module_services import branch_product_module_service
 from services.feature_service import feature_service 
 from services.tenant_feature_service import tenant_feature_service 
+from services.configuration_context_service import configuration_context_service
+from concurrent_loader import load_concurrently
 
 
 from errors import ApplicationError, NotFoundError, ValidationError, TenantNotFoundError, DatabaseOperationError, FeatureNotFoundError
@@ -49,14 +51,24 @@ def configure_features_page():
     display_tenant_name = "N/A"
 
     try:
-        tenants_data = tenant_service.get_all_tenants(minimal=True)
+        calls = {"tenants": lambda: tenant_service.get_all_tenants(minimal=True)}
+        if selected_tenant_id:
+            calls["tenant_details"] = lambda: tenant_service.get_tenant_by_id(selected_tenant_id)
+            calls["features"] = lambda: tenant_feature_service.get_features_for_tenant_with_status(selected_tenant_id)
+        results = load_concurrently(calls, return_exceptions=True)
+
+        if isinstance(results["tenants"], Exception):
+            raise results["tenants"]
+        tenants_data = results["tenants"]
 
         if selected_tenant_id:
             try:
-                tenant_details = tenant_service.get_tenant_by_id(selected_tenant_id)
-                display_tenant_name = tenant_details.get('tenant_name', 'N/A')
+                for name in ("tenant_details", "features"):
+                    if isinstance(results[name], Exception):
+                        raise results[name]
+                display_tenant_name = results["tenant_details"].get('tenant_name', 'N/A')
 
-                features_data = tenant_feature_service.get_features_for_tenant_with_status(selected_tenant_id)
+                features_data = results["features"]
             except (TenantNotFoundError, DatabaseOperationError, ApplicationError) as e:
                 flash(f"Error loading features for tenant {selected_tenant_id}: {e.message}", "danger")
                 current_app.logger.error(f"Error loading features for tenant {selected_tenant_id}: {e.message}", exc_info=True)
@@ -120,30 +132,37 @@ def submit_feature_configuration():
 def index_get():
     """
     Main index page web route.
-    Populates dropdowns for tenant, branch, product.
+    Populates dropdowns for tenant, branch, product and embeds the configuration
+    context (products, the tenant's branches and the selected product's module
+    status) so modules.js can render the first paint without extra requests.
     """
     try:
-        tenants_data = tenant_service.get_all_tenants()
-        branches_data = branch_service.get_all_branches()
-        products_data = product_service.get_all_products(minimal=True) 
-
-        modules = []
         selected_product_id = request.args.get('product_id', type=int)
         selected_branch_id = request.args.get('branch_id', type=int)
         selected_tenant_id_from_url = request.args.get('tenant_id', type=int)
         initial_selected_module_ids_str = request.args.get('initial_selected_module_ids_str', '')
+        module_id_sequences = current_app.config['MODULE_ID_SEQUENCES']
+
+        page_data = load_concurrently({
+            "tenants": tenant_service.get_all_tenants,
+            "context": lambda: configuration_context_service.get_configuration_context(
+                selected_tenant_id_from_url, selected_branch_id, selected_product_id, module_id_sequences
+            ),
+        })
+        configuration_context = page_data["context"]
 
         return render_template(
             'index.html',
-            tenants=tenants_data,
-            products=products_data,
-            modules=modules, 
-            branches=branches_data,
+            tenants=page_data["tenants"],
+            products=configuration_context['products'],
+            modules=configuration_context['modules'],
+            branches=configuration_context['branches'],
             selected_product_id=selected_product_id,
             selected_branch_id=selected_branch_id,
             selected_tenant_id_from_url=selected_tenant_id_from_url,
-            module_id_sequences=current_app.config['MODULE_ID_SEQUENCES'],
-            initial_selected_module_ids_str=initial_selected_module_ids_str
+            module_id_sequences=module_id_sequences,
+            initial_selected_module_ids_str=initial_selected_module_ids_str,
+            configuration_context=configuration_context
         )
     except ApplicationError as e:
         flash(f"Error loading page data: {e.message}", "danger")
@@ -151,14 +170,14 @@ def index_get():
         return render_template('index.html', tenants=[], products=[], modules=[], branches=[],
                                selected_product_id=None, selected_branch_id=None,
                                selected_tenant_id_from_url=None, module_id_sequences={},
-                               initial_selected_module_ids_str='')
+                               initial_selected_module_ids_str='', configuration_context=None)
     except Exception as e:
         flash(f"An unexpected error occurred: {str(e)}", "danger")
         current_app.logger.exception(f"Unexpected error in index_get: {e}")
         return render_template('index.html', tenants=[], products=[], modules=[], branches=[],
                                selected_product_id=None, selected_branch_id=None,
                                selected_tenant_id_from_url=None, module_id_sequences={},
-                               initial_selected_module_ids_str='')
+                               initial_selected_module_ids_str='', configuration_context=None)
 
 
 @general_web_bp.route('/', methods=['POST'])
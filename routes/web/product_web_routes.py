@@ -18,7 +18,6 @@ def view_all_products():
     """
     try:
         products = product_service.repository.get_all() 
-        print("Products being passed to template:", products) 
         return render_template('view_product.html', products=products)
     except ApplicationError as e:
         flash(f"Error loading products: {e.message}", "danger")
@@ -0,0 +1,16 @@
+import json
+
+from marshmallow import Schema, fields
+
+class ConfigurationChangeOutputSchema(Schema):
+    """Schema for one change feed event."""
+    version = fields.Integer(dump_only=True)
+    entity_type = fields.String(dump_only=True)
+    entity_id = fields.String(dump_only=True)
+    action = fields.String(dump_only=True)
+    tenant_id = fields.Integer(dump_only=True, allow_none=True)
+    payload = fields.Method("get_payload", dump_only=True)
+    created_at = fields.DateTime(dump_only=True)
+
+    def get_payload(self, change):
+        return json.loads(change.payload) if change.payload else {}
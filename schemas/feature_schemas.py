@@ -5,6 +5,7 @@ class FeatureBaseSchema(Schema):
     code = fields.String(required=True, validate=validate.Length(min=1, max=50))
     description = fields.String(allow_none=True, validate=validate.Length(max=500))
     is_active = fields.Boolean(load_default=True)
+    default_enabled = fields.Boolean(load_default=True)
 
 class FeatureInputSchema(FeatureBaseSchema):
     """Schema for validating input when creating/updating Feature."""
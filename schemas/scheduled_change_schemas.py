@@ -0,0 +1,40 @@
+from marshmallow import Schema, fields, validate, validates_schema, ValidationError
+
+TARGET_FIELDS = {
+    'tenant_feature': ('tenant_id', 'feature_id'),
+    'branch_product_module': ('branch_id', 'product_module_id'),
+}
+
+class ScheduledChangeInputSchema(Schema):
+    """Schema for validating one change to schedule."""
+    entity_type = fields.String(required=True, validate=validate.OneOf(list(TARGET_FIELDS)))
+    action = fields.String(required=True, validate=validate.OneOf(['enable', 'disable']))
+    tenant_id = fields.Integer()
+    feature_id = fields.Integer()
+    branch_id = fields.Integer()
+    product_module_id = fields.Integer()
+    apply_at = fields.DateTime(required=True)
+
+    @validates_schema
+    def validate_target(self, data, **kwargs):
+        missing = [name for name in TARGET_FIELDS.get(data.get('entity_type'), ()) if data.get(name) is None]
+        if missing:
+            raise ValidationError({name: [f"Required for {data['entity_type']} changes."] for name in missing})
+
+class ScheduledChangeOutputSchema(Schema):
+    """Schema for serializing a scheduled change."""
+    scheduled_change_id = fields.Integer(dump_only=True)
+    entity_type = fields.String(dump_only=True)
+    action = fields.String(dump_only=True)
+    tenant_id = fields.Integer(dump_only=True, allow_none=True)
+    feature_id = fields.Integer(dump_only=True, allow_none=True)
+    branch_id = fields.Integer(dump_only=True, allow_none=True)
+    product_module_id = fields.Integer(dump_only=True, allow_none=True)
+    apply_at = fields.DateTime(dump_only=True)
+    status = fields.String(dump_only=True)
+    attempts = fields.Integer(dump_only=True)
+    next_attempt_at = fields.DateTime(dump_only=True, allow_none=True)
+    last_error = fields.String(dump_only=True, allow_none=True)
+    applied_at = fields.DateTime(dump_only=True, allow_none=True)
+    created_by = fields.String(dump_only=True, allow_none=True)
+    created_at = fields.DateTime(dump_only=True)
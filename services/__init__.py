@@ -0,0 +1,36 @@
+import threading
+
+
+class LazyService:
+    """
+    Stands in for a module-level service singleton and builds the real
+    service (and the schemas its __init__ creates) on first attribute
+    access, so importing a route module does not pay for services it
+    never calls.
+    """
+    def __init__(self, factory):
+        object.__setattr__(self, "_factory", factory)
+        object.__setattr__(self, "_instance", None)
+        object.__setattr__(self, "_lock", threading.Lock())
+
+    def _get_instance(self):
+        instance = self._instance
+        if instance is None:
+            with self._lock:
+                instance = self._instance
+                if instance is None:
+                    instance = self._factory()
+                    object.__setattr__(self, "_instance", instance)
+        return instance
+
+    def __getattr__(self, name):
+        return getattr(self._get_instance(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self._get_instance(), name, value)
+
+    def __delattr__(self, name):
+        delattr(self._get_instance(), name)
+
+    def __repr__(self):
+        return f"<LazyService {self._factory.__name__} ({'built' if self._instance is not None else 'pending'})>"
@@ -0,0 +1,84 @@
+import logging
+
+from repositories.async_read_repository import async_read_repository
+from services.branch_product_module_services import branch_product_module_service
+from services.branch_service import branch_service
+from services.tenant_service import tenant_service
+from services.tenant_feature_service import tenant_feature_service
+
+from errors import ApplicationError, NotFoundError, DatabaseOperationError
+from services import LazyService
+
+log = logging.getLogger(__name__)
+
+
+class AsyncReadService:
+    """
+    Async counterparts of the read-only service methods served in ASGI mode.
+    Data is fetched through AsyncReadRepository; serialization reuses the
+    sync services' builders and schemas, so both paths return identical
+    payloads.
+    """
+    def __init__(self):
+        self.repository = async_read_repository
+
+    async def get_all_tenants_minimal(self, session):
+        try:
+            tenants = await self.repository.get_all_tenants(session)
+            return tenant_service.tenant_minimal_schema.dump(tenants)
+        except ApplicationError:
+            raise
+        except Exception as e:
+            log.exception(f"Unexpected error in get_all_tenants_minimal: {e}")
+            raise ApplicationError("Failed to retrieve all tenants.", status_code=500)
+
+    async def get_branches_by_tenant(self, session, tenant_id):
+        try:
+            branches = await self.repository.get_branches_by_tenant(session, tenant_id)
+            return branch_service.schema.dump(branches, many=True)
+        except DatabaseOperationError:
+            raise
+        except Exception as e:
+            raise DatabaseOperationError(f"An unexpected error occurred while getting branches for tenant {tenant_id}: {e}")
+
+    async def get_features_for_tenant_with_status(self, session, tenant_id):
+        try:
+            tenant = await self.repository.get_tenant_by_id(session, tenant_id)
+            all_features = await self.repository.get_all_features(session)
+            tenant_features = await self.repository.get_tenant_features(session, tenant_id)
+            return tenant_feature_service.build_feature_status(all_features, tenant_features, tenant)
+        except ApplicationError:
+            raise
+        except Exception as e:
+            log.exception(f"Unexpected error in get_features_for_tenant_with_status({tenant_id}): {e}")
+            raise ApplicationError("Failed to retrieve feature status for tenant.", status_code=500)
+
+    async def get_configured_modules_for_branch_product(self, session, branch_id, product_id, module_id_sequences):
+        try:
+            await self.repository.get_branch_by_id(session, branch_id)
+            await self.repository.get_product_by_id(session, product_id)
+            configured = await self.repository.get_configured_modules_for_branch_product(session, branch_id, product_id)
+            return branch_product_module_service.build_configured_modules(configured, module_id_sequences)
+        except ApplicationError:
+            raise
+        except Exception as e:
+            log.exception(f"Unexpected error in get_configured_modules_for_branch_product({branch_id}, {product_id}): {e}")
+            raise ApplicationError("Failed to retrieve configured modules for branch product.", status_code=500)
+
+    async def get_available_modules_for_product_with_status(self, session, product_id, branch_id, module_id_sequences):
+        try:
+            await self.repository.get_product_by_id(session, product_id)
+            product_modules = await self.repository.get_product_modules_with_module_details(session, product_id)
+            configured = []
+            if branch_id is not None:
+                await self.repository.get_branch_by_id(session, branch_id)
+                configured = await self.repository.get_configured_modules_for_branch_product(session, branch_id, product_id)
+            return branch_product_module_service.build_available_modules(product_modules, configured, module_id_sequences)
+        except (NotFoundError, ApplicationError):
+            raise
+        except Exception as e:
+            log.exception(f"Unexpected error in get_available_modules_for_product_with_status({product_id}, {branch_id}): {e}")
+            raise ApplicationError("Failed to retrieve available product modules with status.", status_code=500)
+
+
+async_read_service = LazyService(AsyncReadService)
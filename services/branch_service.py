@@ -3,6 +3,7 @@ from repositories.branch_repository import branch_repository
 from schemas.branch_schemas import BranchBaseSchema, BranchInputSchema, BranchOutputSchema
 from errors import BranchNotFoundError, DuplicateBranchCodeError, DatabaseOperationError, ValidationError
 from models import Branch 
+from services import LazyService
 class BranchService:
     def __init__(self, repository=branch_repository, schema=BranchBaseSchema(), input_schema=BranchInputSchema()):
         self.repository = repository
@@ -104,4 +105,4 @@ class BranchService:
             self.repository.rollback_changes()
             raise DatabaseOperationError(f"An unexpected error occurred while deleting branch ID {branch_id}: {e}")
 
-branch_service = BranchService()
+branch_service = LazyService(BranchService)
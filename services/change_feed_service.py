@@ -0,0 +1,80 @@
+import logging
+import time
+
+from repositories.configuration_change_repository import configuration_change_repository
+from schemas.configuration_change_schemas import ConfigurationChangeOutputSchema
+from change_feed import change_notifier
+
+from errors import ApplicationError
+from services import LazyService
+
+log = logging.getLogger(__name__)
+
+
+class ChangeFeedService:
+    """
+    Serves the configuration change feed: a page of changes after a version,
+    optionally waiting for the next change to commit (long-poll), or an
+    endless sequence of changes for Server-Sent Events.
+    """
+    def __init__(self):
+        self.repository = configuration_change_repository
+        self.output_schema = ConfigurationChangeOutputSchema(many=True)
+
+    def _read(self, since, tenant_id, limit):
+        try:
+            settled = self.repository.get_settled_version()
+            changes = self.output_schema.dump(self.repository.get_since(since, tenant_id, limit, until=settled))
+        finally:
+            self.repository.end_read()
+        return changes
+
+    def get_changes(self, since: int, tenant_id: int | None, limit: int, wait: float, poll_interval: float):
+        """
+        Returns {"changes": [...], "next_since": version}. With wait > 0 and no
+        changes pending, blocks up to `wait` seconds for one to commit.
+        """
+        try:
+            deadline = time.monotonic() + wait
+            while True:
+                generation = change_notifier.generation
+                changes = self._read(since, tenant_id, limit)
+                remaining = deadline - time.monotonic()
+                if changes or remaining <= 0:
+                    break
+                change_notifier.wait(generation, min(poll_interval, remaining))
+
+            return {
+                'changes': changes,
+                'next_since': changes[-1]['version'] if changes else since,
+            }
+        except ApplicationError:
+            raise
+        except Exception as e:
+            log.exception(f"Unexpected error in get_changes(since={since}, tenant_id={tenant_id}): {e}")
+            raise ApplicationError("Failed to retrieve configuration changes.", status_code=500)
+
+    def stream_changes(self, since: int, tenant_id: int | None, limit: int, poll_interval: float, heartbeat: float):
+        """
+        Yields changes after `since` as they commit, forever. Yields None when
+        nothing happened for `heartbeat` seconds so the caller can keep the
+        connection alive.
+        """
+        last_yield = time.monotonic()
+        while True:
+            generation = change_notifier.generation
+            changes = self._read(since, tenant_id, limit)
+            for change in changes:
+                yield change
+                since = change['version']
+            if changes:
+                last_yield = time.monotonic()
+                if len(changes) == limit:
+                    continue
+            elif time.monotonic() - last_yield >= heartbeat:
+                yield None
+                last_yield = time.monotonic()
+            change_notifier.wait(generation, poll_interval)
+
+
+change_feed_service = LazyService(ChangeFeedService)
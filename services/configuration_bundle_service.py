@@ -0,0 +1,166 @@
+import logging
+import threading
+from collections import OrderedDict, defaultdict
+
+from flask import current_app
+
+from repositories.configuration_bundle_repository import configuration_bundle_repository
+from repositories.configuration_change_repository import configuration_change_repository
+from repositories.tenant_repository import tenant_repository
+
+from errors import ApplicationError, NotFoundError
+from services import LazyService
+from feature_rollout import default_state
+
+log = logging.getLogger(__name__)
+
+
+def _diff(old_items, new_items, key):
+    old_by_key = {item[key]: item for item in old_items}
+    new_by_key = {item[key]: item for item in new_items}
+    return {
+        'upsert': [item for item_key, item in new_by_key.items() if old_by_key.get(item_key) != item],
+        'remove': [item_key for item_key in old_by_key if item_key not in new_by_key],
+    }
+
+
+class ConfigurationBundleService:
+    """
+    Builds and serves a tenant's effective configuration: tenant status,
+    enabled features, branches and the modules configured per branch and
+    product.
+
+    A bundle is versioned with the newest settled change feed version that
+    concerns the tenant (its own changes plus global ones), so checking
+    freshness is two small indexed queries and a bundle stays cached until a
+    mutation touches the tenant. Only settled versions are used: a change
+    that commits after a newer one was already visible still moves the
+    version on, instead of leaving a bundle cached without it. The last few versions of each tenant's bundle are
+    kept, which lets clients that already hold one of them receive only the
+    difference.
+    """
+    def __init__(self):
+        self.repository = configuration_bundle_repository
+        self.change_repo = configuration_change_repository
+        self.tenant_repo = tenant_repository
+        self._bundles = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _build(self, tenant_id, version):
+        tenant = self.tenant_repo.get_by_id(tenant_id)
+        features = [
+            (feature_id, name, module_id)
+            for feature_id, name, module_id, is_enabled, default_enabled, rollout in self.repository.get_feature_states(tenant_id)
+            if (is_enabled if is_enabled is not None
+                else default_state(default_enabled, rollout, feature_id, tenant.tenant_id, tenant.country_id))
+        ]
+        branches = self.repository.get_branches(tenant_id)
+
+        modules_by_branch = defaultdict(lambda: defaultdict(list))
+        for branch_id, product_id, module_id in self.repository.get_configured_modules(tenant_id):
+            modules_by_branch[branch_id][product_id].append(module_id)
+
+        return {
+            'tenant_id': tenant_id,
+            'version': version,
+            'tenant': {
+                'tenant_id': tenant.tenant_id,
+                'tenant_name': tenant.tenant_name,
+                'organization_code': tenant.organization_code,
+                'sub_domain': tenant.sub_domain,
+                'status': tenant.status,
+                'default_currency': tenant.default_currency,
+            },
+            'features': [
+                {'feature_id': feature_id, 'name': name, 'module_id': module_id}
+                for feature_id, name, module_id in features
+            ],
+            'branches': [
+                {
+                    'branch_id': branch_id,
+                    'code': code,
+                    'name': name,
+                    'status': status,
+                    'products': [
+                        {'product_id': product_id, 'module_ids': module_ids}
+                        for product_id, module_ids in sorted(modules_by_branch[branch_id].items())
+                    ],
+                }
+                for branch_id, code, name, status in branches
+            ],
+        }
+
+    def _cached(self, tenant_id, version):
+        with self._lock:
+            history = self._bundles.get(tenant_id)
+            if history is None:
+                return None
+            self._bundles.move_to_end(tenant_id)
+            return history.get(version)
+
+    def _store(self, bundle):
+        max_tenants = current_app.config['CONFIG_BUNDLE_CACHE_TENANTS']
+        max_versions = current_app.config['CONFIG_BUNDLE_HISTORY']
+        with self._lock:
+            history = self._bundles.setdefault(bundle['tenant_id'], OrderedDict())
+            history[bundle['version']] = bundle
+            while len(history) > max_versions:
+                history.popitem(last=False)
+            self._bundles.move_to_end(bundle['tenant_id'])
+            while len(self._bundles) > max_tenants:
+                self._bundles.popitem(last=False)
+
+    def invalidate(self, tenant_id=None):
+        """Drops cached bundles for one tenant, or for all tenants."""
+        with self._lock:
+            if tenant_id is None:
+                self._bundles.clear()
+            else:
+                self._bundles.pop(tenant_id, None)
+
+    def get_bundle(self, tenant_id: int, since_version: int | None = None):
+        """
+        Returns the tenant's bundle as {"mode": "snapshot", ...}, as
+        {"mode": "delta", "since_version": ..., ...} when since_version is a
+        version still held in the cache, or {"mode": "unchanged", ...} when
+        the client is already up to date.
+        """
+        try:
+            if not current_app.config.get('CHANGE_FEED_ENABLED'):
+                # Without the change feed there is nothing to version against: always build.
+                return {'mode': 'snapshot', **self._build(tenant_id, None)}
+
+            version = self.change_repo.get_latest_version(tenant_id, until=self.change_repo.get_settled_version())
+            bundle = self._cached(tenant_id, version)
+            if bundle is None:
+                bundle = self._build(tenant_id, version)
+                self._store(bundle)
+
+            if since_version == version:
+                return {'mode': 'unchanged', 'tenant_id': tenant_id, 'version': version}
+
+            base = self._cached(tenant_id, since_version) if since_version is not None else None
+            if base is None:
+                return {'mode': 'snapshot', **bundle}
+
+            delta = {
+                'mode': 'delta',
+                'tenant_id': tenant_id,
+                'version': version,
+                'since_version': since_version,
+                'features': _diff(base['features'], bundle['features'], 'feature_id'),
+                'branches': _diff(base['branches'], bundle['branches'], 'branch_id'),
+            }
+            if base['tenant'] != bundle['tenant']:
+                delta['tenant'] = bundle['tenant']
+            return delta
+        except NotFoundError:
+            raise
+        except ApplicationError:
+            raise
+        except Exception as e:
+            log.exception(f"Unexpected error in get_bundle({tenant_id}, since_version={since_version}): {e}")
+            raise ApplicationError("Failed to build the tenant configuration bundle.", status_code=500)
+
+
+configuration_bundle_service = LazyService(ConfigurationBundleService)
@@ -0,0 +1,81 @@
+import logging
+
+from repositories.tenant_repository import tenant_repository
+from repositories.branch_product_module_repository import branch_product_module_repository
+from repositories.product_module_repository import product_module_repository
+from repositories.configuration_change_repository import configuration_change_repository
+from services.product_services import product_service
+from services.branch_service import branch_service
+from services.branch_product_module_services import branch_product_module_service
+
+from errors import ApplicationError, NotFoundError, BranchNotFoundError, ProductNotFoundError
+from services import LazyService
+
+log = logging.getLogger(__name__)
+
+
+class ConfigurationContextService:
+    """
+    Builds everything the module configuration page needs for one tenant in
+    a single pass: the product list, the tenant's branches and, once a branch
+    and product are selected, the product's modules with their configured
+    status. The selections are validated against the lists already loaded
+    rather than fetched again, so the whole context costs one query per
+    table. change_version is the change feed version the context is at least
+    as new as, for consumers that follow /api/changes afterwards.
+    """
+    def __init__(self):
+        self.tenant_repo = tenant_repository
+        self.product_module_repo = product_module_repository
+        self.bpm_repo = branch_product_module_repository
+        self.change_repo = configuration_change_repository
+
+    def get_configuration_context(self, tenant_id: int | None, branch_id: int | None, product_id: int | None,
+                                  module_id_sequences: dict):
+        """
+        Returns {"tenant_id", "branch_id", "product_id", "change_version", "products", "branches", "modules"}.
+        Branches are empty without a tenant and modules are empty until both a
+        branch and a product are selected; an unknown tenant, a branch that is
+        not the tenant's, or an unknown product raises the matching NotFoundError.
+        """
+        try:
+            # Read before the data, so replaying changes after it can only repeat what is already included.
+            change_version = self.change_repo.get_settled_version()
+            products = product_service.get_all_products(minimal=True)
+            branches = []
+            if tenant_id is not None:
+                self.tenant_repo.get_by_id(tenant_id)
+                branches = branch_service.get_branches_by_tenant(tenant_id)
+
+            modules = []
+            if branch_id is not None and product_id is not None:
+                if not any(branch['branch_id'] == branch_id for branch in branches):
+                    raise BranchNotFoundError(f"Branch with ID {branch_id} not found for tenant {tenant_id}.")
+                if not any(product['product_id'] == product_id for product in products):
+                    raise ProductNotFoundError(f"Product with ID {product_id} not found.")
+
+                product_modules = self.product_module_repo.get_all_for_product_with_module_details(product_id)
+                configured_bpms = self.bpm_repo.get_configured_modules_for_branch_product(branch_id, product_id)
+                modules = branch_product_module_service.build_available_modules(
+                    product_modules, configured_bpms, module_id_sequences
+                )
+
+            return {
+                'tenant_id': tenant_id,
+                'branch_id': branch_id,
+                'product_id': product_id,
+                'change_version': change_version,
+                'products': products,
+                'branches': branches,
+                'modules': modules,
+            }
+        except NotFoundError:
+            raise
+        except ApplicationError:
+            raise
+        except Exception as e:
+            log.exception(f"Unexpected error in get_configuration_context({tenant_id}, {branch_id}, {product_id}): {e}")
+            raise ApplicationError("Failed to retrieve configuration context.", status_code=500)
+
+
+configuration_context_service = LazyService(ConfigurationContextService)
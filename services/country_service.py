@@ -3,6 +3,7 @@ from models import Country
 from repositories.country_repository import country_repository
 from schemas.country_schemas import CountryBaseSchema, CountryInputSchema, CountryOutputSchema
 from errors import NotFoundError, DatabaseOperationError, ValidationError
+from services import LazyService
 
 class CountryService:
     def __init__(self, repository=country_repository, schema=CountryBaseSchema(), input_schema=CountryInputSchema()):
@@ -101,4 +102,4 @@ class CountryService:
             self.repository.rollback_changes()
             raise DatabaseOperationError(f"An unexpected error occurred while deleting country ID {country_id}: {e}")
 
-country_service = CountryService()
+country_service = LazyService(CountryService)
@@ -0,0 +1,241 @@
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from flask import current_app, has_app_context
+
+from repositories.entitlement_repository import entitlement_repository
+
+from errors import ApplicationError, NotFoundError, BranchNotFoundError
+from services import LazyService
+from invalidation_bus import subscribe
+from feature_rollout import compile_rollout
+
+log = logging.getLogger(__name__)
+
+INACTIVE = 'Inactive'
+# Catalogue changes can move features and modules between any branches.
+CATALOGUE = ("feature", "module", "product", "product_module")
+
+
+def _ids(mask):
+    ids = []
+    while mask:
+        low_bit = mask & -mask
+        ids.append(low_bit.bit_length() - 1)
+        mask ^= low_bit
+    return ids
+
+
+class BranchEntitlements:
+    """
+    What one branch may do: for each product with configured modules, a
+    bitmask of entitled module ids and one of entitled feature ids.
+    """
+    __slots__ = ('branch_id', 'tenant_id', 'products', 'resolved_at')
+
+    def __init__(self, branch_id, tenant_id, products):
+        self.branch_id = branch_id
+        self.tenant_id = tenant_id
+        self.products = products
+        self.resolved_at = time.monotonic()
+
+    def has_module(self, product_id, module_id):
+        masks = self.products.get(product_id)
+        return masks is not None and bool(masks[0] >> module_id & 1)
+
+    def has_feature(self, product_id, feature_id):
+        masks = self.products.get(product_id)
+        return masks is not None and bool(masks[1] >> feature_id & 1)
+
+
+class EntitlementIndex:
+    """
+    Resolved entitlements per branch. Changes evict only the branches they
+    affect, and evicted branches are resolved again on their next lookup. A
+    resolution that overlaps an eviction is returned but not stored, since
+    it may predate the change. Entries also expire `ttl` seconds after they
+    were resolved, so a change whose invalidation never arrived (a lost
+    datagram, a write outside the ORM session) is picked up within ttl.
+    """
+    def __init__(self, ttl=60.0):
+        self.branches = {}
+        self.generation = 0
+        self.ttl = ttl
+        self.lock = threading.Lock()
+
+    def get(self, branch_id):
+        """Returns the branch's entry, or None if it is not resolved or has expired."""
+        entry = self.branches.get(branch_id)
+        if entry is None or time.monotonic() - entry.resolved_at >= self.ttl:
+            return None
+        return entry
+
+    def evict(self, predicate=None):
+        with self.lock:
+            self.generation += 1
+            if predicate is None:
+                self.branches.clear()
+            else:
+                for branch_id in [branch_id for branch_id, entry in self.branches.items() if predicate(entry)]:
+                    del self.branches[branch_id]
+
+
+def _get_index(create=False):
+    if not has_app_context():
+        return None
+    if create:
+        return current_app.extensions.setdefault(
+            "entitlement_index", EntitlementIndex(ttl=current_app.config.get("ENTITLEMENT_INDEX_TTL", 60.0))
+        )
+    return current_app.extensions.get("entitlement_index")
+
+
+def _evict_entitlements(entity_type, keys):
+    index = _get_index()
+    if index is None:
+        return
+    if entity_type in CATALOGUE:
+        index.evict()
+    elif entity_type in ("branch", "branch_product_module"):
+        # BPM keys are "<branch_id>:<product_module_id>".
+        branch_ids = {int(entity_id.split(":")[0]) for entity_id, _ in keys}
+        index.evict(lambda entry: entry.branch_id in branch_ids)
+    else:
+        tenant_ids = {tenant_id for _, tenant_id in keys}
+        index.evict(None if None in tenant_ids else lambda entry: entry.tenant_id in tenant_ids)
+
+
+subscribe(("tenant", "branch", "tenant_feature", "branch_product_module") + CATALOGUE, _evict_entitlements)
+
+
+class EntitlementService:
+    """
+    Answers "what may branch B of tenant T do for product P". A module is
+    entitled when it is configured for the branch and product; a feature is
+    entitled when it is on for the tenant (its override, otherwise the
+    feature's default or rollout, as in build_feature_status) and it is either
+    tenant-wide or belongs to an entitled module. Nothing is entitled on an
+    inactive branch or tenant.
+
+    Entitlements are resolved for any number of branches with four queries
+    and kept as bitmasks in a per-app index, so checks such as
+    has_module()/has_feature() on a resolved branch are in-memory bit tests.
+    """
+    def __init__(self):
+        self.repository = entitlement_repository
+
+    def _resolve(self, branch_ids):
+        states = self.repository.get_branch_states(branch_ids)
+        live = [row for row in states if INACTIVE not in (row[2], row[3])]
+        live_ids = [row[0] for row in live]
+        tenant_countries = {row[1]: row[4] for row in live}
+
+        modules = defaultdict(lambda: defaultdict(int))
+        features_by_module = defaultdict(int)
+        tenant_wide_features = 0
+        defaults = 0
+        rollouts = []
+        enabled = {}
+        if live_ids:
+            for branch_id, product_id, module_id in self.repository.get_configured_modules(live_ids):
+                if product_id is not None and module_id is not None:
+                    modules[branch_id][product_id] |= 1 << module_id
+            for feature_id, module_id, default_enabled, rollout in self.repository.get_feature_modules():
+                if default_enabled:
+                    defaults |= 1 << feature_id
+                elif compile_rollout(rollout) is not None:
+                    rollouts.append((feature_id, compile_rollout(rollout)))
+                if module_id is None:
+                    tenant_wide_features |= 1 << feature_id
+                else:
+                    features_by_module[module_id] |= 1 << feature_id
+            for tenant_id, country_id in tenant_countries.items():
+                enabled[tenant_id] = defaults
+                for feature_id, rollout in rollouts:
+                    if rollout.includes(feature_id, tenant_id, country_id):
+                        enabled[tenant_id] |= 1 << feature_id
+            for tenant_id, feature_id, is_enabled in self.repository.get_feature_overrides(set(tenant_countries)):
+                mask = enabled[tenant_id]
+                enabled[tenant_id] = mask | 1 << feature_id if is_enabled else mask & ~(1 << feature_id)
+
+        resolved = {}
+        for branch_id, tenant_id, _, _, _ in states:
+            products = {}
+            for product_id, module_mask in modules.get(branch_id, {}).items():
+                feature_mask = tenant_wide_features
+                for module_id in _ids(module_mask):
+                    feature_mask |= features_by_module.get(module_id, 0)
+                products[product_id] = (module_mask, feature_mask & enabled.get(tenant_id, defaults))
+            resolved[branch_id] = BranchEntitlements(branch_id, tenant_id, products)
+        return resolved
+
+    def get_branch_entitlements(self, branch_ids):
+        """
+        Returns {branch_id: BranchEntitlements} for the given branches that
+        exist, resolving only those not in the index or expired.
+        """
+        try:
+            index = _get_index(create=True)
+            with index.lock:
+                entries = {branch_id: index.get(branch_id) for branch_id in branch_ids}
+                found = {branch_id: entry for branch_id, entry in entries.items() if entry is not None}
+                generation = index.generation
+            missing = [branch_id for branch_id in branch_ids if branch_id not in found]
+            if missing:
+                resolved = self._resolve(missing)
+                with index.lock:
+                    if index.generation == generation:
+                        index.branches.update(resolved)
+                found.update(resolved)
+            return found
+        except ApplicationError:
+            raise
+        except Exception as e:
+            log.exception(f"Unexpected error in get_branch_entitlements({branch_ids}): {e}")
+            raise ApplicationError("Failed to resolve branch entitlements.", status_code=500)
+
+    def _entitlements(self, branch_id):
+        index = _get_index(create=True)
+        entry = index.get(branch_id)
+        if entry is None:
+            entry = self.get_branch_entitlements([branch_id]).get(branch_id)
+        return entry
+
+    def is_module_entitled(self, branch_id: int, product_id: int, module_id: int) -> bool:
+        entry = self._entitlements(branch_id)
+        return entry is not None and entry.has_module(product_id, module_id)
+
+    def is_feature_entitled(self, branch_id: int, product_id: int, feature_id: int) -> bool:
+        entry = self._entitlements(branch_id)
+        return entry is not None and entry.has_feature(product_id, feature_id)
+
+    def get_entitlements(self, branch_id: int, product_id: int | None = None):
+        """
+        Returns {"branch_id", "tenant_id", "products": [{"product_id", "module_ids", "feature_ids"}]},
+        limited to one product when product_id is given.
+        """
+        try:
+            entry = self._entitlements(branch_id)
+            if entry is None:
+                raise BranchNotFoundError(f"Branch with ID {branch_id} not found.")
+            return {
+                'branch_id': entry.branch_id,
+                'tenant_id': entry.tenant_id,
+                'products': [
+                    {'product_id': pid, 'module_ids': _ids(module_mask), 'feature_ids': _ids(feature_mask)}
+                    for pid, (module_mask, feature_mask) in sorted(entry.products.items())
+                    if product_id is None or pid == product_id
+                ],
+            }
+        except NotFoundError:
+            raise
+        except ApplicationError:
+            raise
+        except Exception as e:
+            log.exception(f"Unexpected error in get_entitlements({branch_id}, {product_id}): {e}")
+            raise ApplicationError("Failed to resolve branch entitlements.", status_code=500)
+
+
+entitlement_service = LazyService(EntitlementService)
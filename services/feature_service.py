@@ -1,9 +1,13 @@
 import datetime
+import json
 import logging
 
 from repositories.feature_repository import feature_repository
 from schemas.feature_schemas import FeatureInputSchema, FeatureOutputSchema
 from errors import ApplicationError, DatabaseOperationError, FeatureNotFoundError, ValidationError, DuplicateError
+from services import LazyService
+from audit_log import record_change
+from feature_rollout import compile_rollout, parse_rollout
 
 log = logging.getLogger(__name__)
 
@@ -61,6 +65,7 @@ class FeatureService:
                 code=feature_code,
                 description=validated_data.get('description'),
                 is_active=validated_data.get('is_active', True),
+                default_enabled=validated_data.get('default_enabled', True),
                 created_at=datetime.datetime.utcnow()
             )
             return FeatureOutputSchema().dump(new_feature_obj)
@@ -123,4 +128,47 @@ class FeatureService:
             log.exception(f"Unexpected error in delete_feature({feature_id}): {e}")
             raise ApplicationError("Failed to delete feature due to an internal error.", status_code=500)
 
-feature_service = FeatureService()
\ No newline at end of file
+    def _rollout_dict(self, feature_obj):
+        rollout = compile_rollout(feature_obj.rollout)
+        return {
+            'feature_id': feature_obj.feature_id,
+            'default_enabled': feature_obj.default_enabled,
+            'rollout': rollout.to_dict() if rollout is not None else None,
+        }
+
+    def get_rollout(self, feature_id):
+        """
+        Returns {"feature_id", "default_enabled", "rollout"} for a feature;
+        rollout is None when the feature has none.
+        """
+        try:
+            return self._rollout_dict(self.repository.get_by_id(feature_id))
+        except (FeatureNotFoundError, DatabaseOperationError, ApplicationError):
+            raise
+        except Exception as e:
+            log.exception(f"Unexpected error in get_rollout({feature_id}): {e}")
+            raise ApplicationError("Failed to retrieve feature rollout.", status_code=500)
+
+    def set_rollout(self, feature_id, data):
+        """
+        Replaces a feature's rollout rule (see feature_rollout.py), or removes
+        it when data is None. One write: every evaluator picks the new rule up
+        from the feature invalidation that follows.
+        """
+        try:
+            rollout = parse_rollout(data) if data is not None else None
+            feature_obj = self.repository.get_by_id(feature_id)
+            previous = self._rollout_dict(feature_obj)['rollout']
+            rollout_json = json.dumps(rollout.to_dict(), sort_keys=True) if rollout is not None else None
+            if rollout_json != feature_obj.rollout:
+                self.repository.update(feature_obj, rollout=rollout_json)
+                record_change("feature", feature_id, "rollout",
+                              details={"previous": previous, "rollout": rollout.to_dict() if rollout is not None else None})
+            return self._rollout_dict(feature_obj)
+        except (ValidationError, FeatureNotFoundError, DatabaseOperationError, ApplicationError):
+            raise
+        except Exception as e:
+            log.exception(f"Unexpected error in set_rollout({feature_id}) with data {data}: {e}")
+            raise ApplicationError("Failed to update feature rollout.", status_code=500)
+
+feature_service = LazyService(FeatureService)
\ No newline at end of file
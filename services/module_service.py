@@ -2,6 +2,8 @@ from repositories.module_repository import module_repository
 from schemas.module_schemas import ModuleBaseSchema, ModuleInputSchema
 from errors import ModuleNotFoundError, DatabaseOperationError, ValidationError
 from models import Module
+from services import LazyService
+from audit_log import record_change
 
 class ModuleService:
     def __init__(self, repository=module_repository, schema=ModuleBaseSchema(), input_schema=ModuleInputSchema()):
@@ -44,6 +46,7 @@ class ModuleService:
             module = Module(**validated_data)
             self.repository.add(module)
             self.repository.save_changes()
+            record_change("module", module.module_id, "create", details={"code": module.code})
             return self.schema.dump(module)
         except (ValidationError, DatabaseOperationError) as e:
             self.repository.rollback_changes()
@@ -74,6 +77,7 @@ class ModuleService:
                 setattr(module, key, value)
 
             self.repository.save_changes()
+            record_change("module", module_id, "update", details=validated_data)
             return self.schema.dump(module)
         except (ModuleNotFoundError, ValidationError, DatabaseOperationError) as e:
             self.repository.rollback_changes()
@@ -91,6 +95,7 @@ class ModuleService:
 
             self.repository.delete(module)
             self.repository.save_changes()
+            record_change("module", module_id, "delete")
             return {"message": f"Module '{module.name}' deleted successfully."}
         except (ModuleNotFoundError, DatabaseOperationError) as e:
             self.repository.rollback_changes()
@@ -99,4 +104,4 @@ class ModuleService:
             self.repository.rollback_changes()
             raise DatabaseOperationError(f"An unexpected error occurred while deleting module ID {module_id}: {e}")
 
-module_service = ModuleService()
+module_service = LazyService(ModuleService)
@@ -9,6 +9,7 @@ from repositories.module_repository import module_repository
 from schemas.product_module_schemas import ProductModuleInputSchema, ProductModuleOutputSchema
 
 from errors import ApplicationError, NotFoundError, ValidationError, DuplicateError
+from services import LazyService
 
 log = logging.getLogger(__name__)
 
@@ -142,4 +143,4 @@ class ProductModuleService:
             log.exception(f"Unexpected error in delete_product_module({product_module_id}): {e}")
             raise ApplicationError("Failed to delete product module due to an internal error.", status_code=500)
 
-product_module_service = ProductModuleService()
+product_module_service = LazyService(ProductModuleService)
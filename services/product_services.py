@@ -7,6 +7,8 @@ from repositories.product_tag_repository import product_tag_repository
 from schemas.product_schemas import ProductInputSchema, ProductOutputSchema, ProductMinimalOutputSchema
 
 from errors import ApplicationError, NotFoundError, ValidationError, DuplicateProductCodeError
+from services import LazyService
+from audit_log import record_change
 
 log = logging.getLogger(__name__)
 
@@ -28,9 +30,9 @@ class ProductService:
         """
         try:
             products = self.repository.get_all()
-            print(f"Loaded from DB: {products}")
+            log.debug("ProductService.get_all_products - Loaded %d products", len(products))
             if minimal:
-                return self.minimal_output_schema.dump(products)
+                return self.minimal_output_schema.dump(products, many=True)
             return self.output_schema.dump(products)
         except ApplicationError:
             raise 
@@ -89,6 +91,7 @@ class ProductService:
                 supported_file_formats=validated_data.get('supported_file_formats'),
                 
             )
+            record_change("product", new_product_obj.product_id, "create", details={"code": code})
             return self.output_schema.dump(new_product_obj)
         except ValidationError: 
             raise
@@ -133,6 +136,7 @@ class ProductService:
 
             
             updated_product_obj = self.repository.update(product_obj, **validated_data)
+            record_change("product", product_id, "update", details=validated_data)
             return self.output_schema.dump(updated_product_obj)
         except ValidationError:
             raise
@@ -153,6 +157,7 @@ class ProductService:
         try:
             product_obj = self.repository.get_by_id(product_id) 
             self.repository.delete(product_obj)
+            record_change("product", product_id, "delete")
             return {"message": f"Product with ID {product_id} deleted successfully."}
         except NotFoundError:
             raise
@@ -162,4 +167,4 @@ class ProductService:
             log.exception(f"Unexpected error in delete_product({product_id}): {e}")
             raise ApplicationError("Failed to delete product due to an internal error.", status_code=500)
 
-product_service = ProductService()
+product_service = LazyService(ProductService)
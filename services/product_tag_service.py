@@ -6,6 +6,7 @@ from repositories.product_tag_repository import product_tag_repository
 from schemas.product_tag_schemas import ProductTagInputSchema, ProductTagOutputSchema
 
 from errors import ApplicationError, DatabaseOperationError, ProductTagNotFoundError, ValidationError, DuplicateError
+from services import LazyService
 
 log = logging.getLogger(__name__)
 
@@ -127,4 +128,4 @@ class ProductTagService:
             log.exception(f"Unexpected error in delete_product_tag({product_tag_id}): {e}")
             raise ApplicationError("Failed to delete product tag due to an internal error.", status_code=500)
 
-product_tag_service = ProductTagService()
+product_tag_service = LazyService(ProductTagService)
@@ -0,0 +1,318 @@
+import datetime
+import json
+import logging
+from collections import defaultdict
+
+from flask import current_app
+from marshmallow import ValidationError as MarshmallowValidationError
+
+from repositories.scheduled_change_repository import scheduled_change_repository
+from schemas.scheduled_change_schemas import ScheduledChangeInputSchema, ScheduledChangeOutputSchema, TARGET_FIELDS
+from models import TenantFeature, BranchProductModule
+
+from errors import ApplicationError, DatabaseOperationError, NotFoundError, ValidationError
+from services import LazyService
+from services.tenant_feature_service import effective_state, override_is_redundant
+from audit_log import record_change
+
+log = logging.getLogger(__name__)
+
+TENANT_FEATURE = 'tenant_feature'
+BRANCH_PRODUCT_MODULE = 'branch_product_module'
+
+
+def _target(change):
+    return tuple(getattr(change, name) for name in TARGET_FIELDS[change.entity_type])
+
+
+def _utc(value):
+    if value.tzinfo is not None:
+        value = value.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return value
+
+
+class _Plan:
+    """
+    What applying a batch of due changes does. Rows to insert, delete and
+    update, per change the effect it has, and what to audit once the batch
+    has committed.
+    """
+    def __init__(self):
+        self.added = []
+        self.deleted = []
+        self.updated = []
+        self.applicable = []
+        self.effects = {}
+        self.errors = {}
+        self.audit = []
+
+
+class ScheduledChangeService:
+    """
+    Schedules tenant feature and module configuration changes for a later
+    time and applies the ones that are due in bulk. The rows a batch needs
+    are read with one query per table, and the batch is written in a single
+    transaction. So a cutover of thousands of changes costs a few statements
+    instead of several commits per change. When several changes in a batch
+    target the same tenant feature or branch module, the latest one wins
+    and the others are reported as superseded.
+    """
+    def __init__(self):
+        self.repository = scheduled_change_repository
+        self.input_schema = ScheduledChangeInputSchema(many=True)
+        self.output_schema = ScheduledChangeOutputSchema(many=True)
+
+    def schedule_changes(self, data, created_by=None):
+        """
+        Validates and stores a list of changes to apply later; every target
+        must exist when the change is scheduled. Returns the stored changes.
+        """
+        try:
+            try:
+                items = self.input_schema.load(data)
+            except MarshmallowValidationError as e:
+                raise ValidationError("Invalid scheduled changes.", errors=e.messages)
+
+            missing = self._missing_targets(items)
+            if missing:
+                raise ValidationError("Some scheduled changes target records that do not exist.", errors=missing)
+
+            rows = [dict(item, apply_at=_utc(item['apply_at']), created_by=created_by) for item in items]
+            return self.output_schema.dump(self.repository.create_many(rows))
+        except (ValidationError, DatabaseOperationError, ApplicationError):
+            raise
+        except Exception as e:
+            log.exception(f"Unexpected error in schedule_changes: {e}")
+            raise ApplicationError("Failed to schedule changes.", status_code=500)
+
+    def _missing_targets(self, items):
+        lookups = {
+            'tenant_id': lambda ids: {t.tenant_id for t in self.repository.get_tenants(ids)},
+            'feature_id': lambda ids: {f.feature_id for f in self.repository.get_features(ids)},
+            'branch_id': lambda ids: {b.branch_id for b in self.repository.get_branches(ids)},
+            'product_module_id': lambda ids: {pm.product_module_id for pm in self.repository.get_product_modules(ids)},
+        }
+        missing = {}
+        for name, lookup in lookups.items():
+            wanted = {item[name] for item in items if name in TARGET_FIELDS[item['entity_type']]}
+            unknown = wanted - lookup(wanted) if wanted else set()
+            if unknown:
+                missing[name] = [f"Not found: {sorted(unknown)}"]
+        return missing
+
+    def get_scheduled_changes(self, status=None, limit=500):
+        try:
+            return self.output_schema.dump(self.repository.get_all(status, limit))
+        except (DatabaseOperationError, ApplicationError):
+            raise
+        except Exception as e:
+            log.exception(f"Unexpected error in get_scheduled_changes({status}): {e}")
+            raise ApplicationError("Failed to retrieve scheduled changes.", status_code=500)
+
+    def cancel_change(self, scheduled_change_id):
+        try:
+            change = self.repository.get_by_id(scheduled_change_id)
+            if change.status != 'pending':
+                raise ValidationError(f"Scheduled change {scheduled_change_id} is {change.status}; only pending changes can be cancelled.")
+            change.status = 'cancelled'
+            self.repository.save()
+            return ScheduledChangeOutputSchema().dump(change)
+        except (NotFoundError, ValidationError, DatabaseOperationError, ApplicationError):
+            raise
+        except Exception as e:
+            log.exception(f"Unexpected error in cancel_change({scheduled_change_id}): {e}")
+            raise ApplicationError("Failed to cancel scheduled change.", status_code=500)
+
+    def _plan(self, changes, now):
+        plan = _Plan()
+        by_type = defaultdict(list)
+        for change in changes:
+            by_type[change.entity_type].append(change)
+        if by_type[TENANT_FEATURE]:
+            self._plan_tenant_features(plan, by_type[TENANT_FEATURE], now)
+        if by_type[BRANCH_PRODUCT_MODULE]:
+            self._plan_branch_product_modules(plan, by_type[BRANCH_PRODUCT_MODULE])
+        plan.applicable = [change for change in changes if change.scheduled_change_id not in plan.errors]
+        return plan
+
+    def _latest(self, plan, changes, known):
+        """Returns {target: latest change} for changes whose target exists, recording errors and superseded changes."""
+        latest = {}
+        for change in changes:
+            target = _target(change)
+            missing = [f"{name} {value}" for name, value in zip(TARGET_FIELDS[change.entity_type], target) if value not in known[name]]
+            if missing:
+                plan.errors[change.scheduled_change_id] = f"{', '.join(missing)} no longer exists."
+                continue
+            if target in latest:
+                plan.effects[latest[target].scheduled_change_id] = 'superseded'
+            latest[target] = change
+        return latest
+
+    def _plan_tenant_features(self, plan, changes, now):
+        tenants = {t.tenant_id: t for t in self.repository.get_tenants({c.tenant_id for c in changes})}
+        features = {f.feature_id: f for f in self.repository.get_features({c.feature_id for c in changes})}
+        existing = {
+            (tf.tenant_id, tf.feature_id): tf
+            for tf in self.repository.get_tenant_features(set(tenants), set(features))
+        } if tenants and features else {}
+
+        latest = self._latest(plan, changes, {'tenant_id': tenants, 'feature_id': features})
+        for (tenant_id, feature_id), change in latest.items():
+            tenant, feature = tenants[tenant_id], features[feature_id]
+            tf_entry = existing.get((tenant_id, feature_id))
+            previous = effective_state(feature, tf_entry, tenant)
+            desired = change.action == 'enable'
+
+            # Only deviations from the feature's default are stored; with a rollout the override is kept.
+            if override_is_redundant(feature, desired):
+                effect = 'remove_override' if tf_entry is not None else 'none'
+                if tf_entry is not None:
+                    plan.deleted.append(tf_entry)
+            elif tf_entry is None:
+                effect = 'create_override'
+                plan.added.append(TenantFeature(tenant_id=tenant_id, feature_id=feature_id, is_enabled=desired, created_on=now))
+            elif tf_entry.is_enabled is not desired:
+                effect = 'update_override'
+                plan.updated.append((tf_entry, desired))
+            else:
+                effect = 'none'
+            plan.effects[change.scheduled_change_id] = effect
+
+            key = f"{tenant_id}:{feature_id}"
+            if desired != previous:
+                plan.audit.append((TENANT_FEATURE, key, change.action, tenant_id,
+                                   {"feature_id": feature_id, "previous": previous, "scheduled_change_id": change.scheduled_change_id}))
+
+    def _plan_branch_product_modules(self, plan, changes):
+        branches = {b.branch_id: b for b in self.repository.get_branches({c.branch_id for c in changes})}
+        product_modules = {
+            pm.product_module_id: pm for pm in self.repository.get_product_modules({c.product_module_id for c in changes})
+        }
+        existing = defaultdict(list)
+        if branches and product_modules:
+            for bpm in self.repository.get_branch_product_modules(set(branches), set(product_modules)):
+                existing[(bpm.branch_id, bpm.product_module_id)].append(bpm)
+
+        latest = self._latest(plan, changes, {'branch_id': branches, 'product_module_id': product_modules})
+        for (branch_id, product_module_id), change in latest.items():
+            configured = existing.get((branch_id, product_module_id), [])
+            if change.action == 'enable' and not configured:
+                effect = 'add_module'
+                plan.added.append(BranchProductModule(
+                    branch_id=branch_id, product_module_id=product_module_id,
+                    eligibility_config=json.dumps({}), created_by="Scheduler"
+                ))
+            elif change.action == 'disable' and configured:
+                effect = 'remove_module'
+                plan.deleted.extend(configured)
+            else:
+                effect = 'none'
+            plan.effects[change.scheduled_change_id] = effect
+
+            if effect != 'none':
+                key = f"{branch_id}:{product_module_id}"
+                tenant_id = branches[branch_id].tenant_id
+                plan.audit.append((BRANCH_PRODUCT_MODULE, key, 'add' if effect == 'add_module' else 'remove', tenant_id,
+                                   {"scheduled_change_id": change.scheduled_change_id}))
+
+    def preview(self, at=None, limit=None):
+        """
+        Dry run: returns, for each change that would be due at `at` (default
+        now), the effect applying it would have, without writing anything.
+        """
+        try:
+            now = _utc(at) if at is not None else datetime.datetime.utcnow()
+            limit = limit or current_app.config.get("SCHEDULED_CHANGES_BATCH_SIZE", 1000)
+            changes = self.repository.get_due(now, limit, lock=False)
+            plan = self._plan(changes, now)
+            summary_schema = ScheduledChangeOutputSchema(only=('scheduled_change_id', 'entity_type', 'action', 'apply_at'))
+            return [
+                {
+                    **summary_schema.dump(change),
+                    'target': dict(zip(TARGET_FIELDS[change.entity_type], _target(change))),
+                    'effect': 'invalid' if change.scheduled_change_id in plan.errors else plan.effects[change.scheduled_change_id],
+                    'error': plan.errors.get(change.scheduled_change_id),
+                }
+                for change in changes
+            ]
+        except (DatabaseOperationError, ApplicationError):
+            raise
+        except Exception as e:
+            log.exception(f"Unexpected error in preview({at}): {e}")
+            raise ApplicationError("Failed to preview scheduled changes.", status_code=500)
+
+    def apply_due_changes(self, now=None, dry_run=False):
+        """
+        Applies every change due at `now` (default the current time) in
+        batches of SCHEDULED_CHANGES_BATCH_SIZE, one transaction each.
+        With dry_run it returns preview(now) instead.
+        Returns {"batches", "applied", "deferred", "failed"}.
+        """
+        if dry_run:
+            return self.preview(now)
+        try:
+            now = _utc(now) if now is not None else datetime.datetime.utcnow()
+            batch_size = current_app.config.get("SCHEDULED_CHANGES_BATCH_SIZE", 1000)
+            summary = {"batches": 0, "applied": 0, "deferred": 0, "failed": 0}
+            while True:
+                changes = self.repository.get_due(now, batch_size)
+                if not changes:
+                    break
+                summary["batches"] += 1
+                self._apply_batch(changes, now, summary)
+                if len(changes) < batch_size:
+                    break
+            if summary["batches"]:
+                log.info(f"Scheduled changes due at {now}: {summary}")
+            return summary
+        except (DatabaseOperationError, ApplicationError):
+            raise
+        except Exception as e:
+            log.exception(f"Unexpected error in apply_due_changes({now}): {e}")
+            raise ApplicationError("Failed to apply scheduled changes.", status_code=500)
+
+    def _apply_batch(self, changes, now, summary):
+        plan = self._plan(changes, now)
+        for change in changes:
+            error = plan.errors.get(change.scheduled_change_id)
+            if error is not None:
+                change.status = 'failed'
+                change.attempts += 1
+                change.last_error = error
+        try:
+            self.repository.apply(plan.added, plan.deleted, plan.updated, plan.applicable, now)
+        except DatabaseOperationError as e:
+            groups = defaultdict(list)
+            for change in changes:
+                groups[(change.entity_type, _target(change))].append(change)
+            if len(groups) > 1:
+                # Apply target by target so one bad change does not hold back the rest.
+                for group in groups.values():
+                    self._apply_batch(group, now, summary)
+            else:
+                self._defer(changes, e.message, now, summary)
+            return
+
+        summary["applied"] += len(plan.applicable)
+        summary["failed"] += len(plan.errors)
+        for entity_type, entity_id, action, tenant_id, details in plan.audit:
+            record_change(entity_type, entity_id, action, tenant_id=tenant_id, details=details, actor="scheduler")
+
+    def _defer(self, changes, error, now, summary):
+        config = current_app.config
+        max_attempts = config.get("SCHEDULED_CHANGES_MAX_ATTEMPTS", 5)
+        retry_delay = config.get("SCHEDULED_CHANGES_RETRY_DELAY", 30.0)
+        for change in changes:
+            change.attempts += 1
+            change.last_error = error[:500]
+            if change.attempts >= max_attempts:
+                change.status = 'failed'
+                summary["failed"] += 1
+            else:
+                change.next_attempt_at = now + datetime.timedelta(seconds=retry_delay * 2 ** (change.attempts - 1))
+                summary["deferred"] += 1
+        self.repository.save()
+
+
+scheduled_change_service = LazyService(ScheduledChangeService)
@@ -8,9 +8,52 @@ from repositories.feature_repository import feature_repository
 from schemas.tenant_feature_schemas import TenantFeatureInputSchema, TenantFeatureOutputSchema, FeatureStatusOutputSchema
 from schemas.message_schemas import MessageSchema 
 from errors import ApplicationError, DatabaseOperationError, TenantNotFoundError, FeatureNotFoundError, DuplicateTenantFeatureError, ValidationError, NotFoundError
+from services import LazyService
+from audit_log import record_change
+from feature_rollout import default_state
+from feature_flag_table import get_feature_flag_table
+from invalidation_bus import subscribe
+from read_cache import cached_read, invalidate_reads
 
 log = logging.getLogger(__name__)
 
+
+def _evict_feature_status(entity_type, keys):
+    tenant_ids = {tenant_id for _, tenant_id in keys}
+    if entity_type == "feature" or None in tenant_ids:
+        invalidate_reads("tenant_feature_status")
+    else:
+        invalidate_reads("tenant_feature_status", lambda tenant_id: tenant_id in tenant_ids)
+
+
+subscribe(("tenant", "tenant_feature", "feature"), _evict_feature_status)
+
+
+def tenant_default(feature_obj, tenant_obj):
+    """The feature's state for the tenant without an override: its default, widened by its rollout."""
+    return default_state(feature_obj.default_enabled, feature_obj.rollout, feature_obj.feature_id,
+                         tenant_obj.tenant_id, tenant_obj.country_id)
+
+
+def override_is_redundant(feature_obj, is_enabled):
+    """
+    Whether an override with this state changes nothing, by the same rule
+    compaction uses: it matches the feature's default and no rollout can
+    move the tenant's state later. An explicit state for a feature with a
+    rollout is kept even when it matches the tenant's current bucket.
+    """
+    if feature_obj.default_enabled:
+        return is_enabled is True
+    return feature_obj.rollout is None and is_enabled is False
+
+
+def effective_state(feature_obj, tf_entry, tenant_obj):
+    """A tenant's state for a feature: its override when it has one, otherwise the feature's default or rollout."""
+    if tf_entry is not None and tf_entry.is_enabled is not None:
+        return tf_entry.is_enabled
+    return tenant_default(feature_obj, tenant_obj)
+
+
 class TenantFeatureService:
     def __init__(self):
         self.repository = tenant_feature_repository
@@ -36,137 +79,149 @@ class TenantFeatureService:
             log.exception(f"Unexpected error in get_all_tenant_features_for_tenant({tenant_id}): {e}")
             raise ApplicationError("Failed to retrieve tenant features.", status_code=500)
 
-    def get_features_for_tenant_with_status(self, tenant_id):
+    def build_feature_status(self, all_features_objs, existing_tenant_features_objs, tenant_obj):
         """
-        Retrieves all master features and indicates their enabled/disabled status for a given tenant.
-        This services the /api/tenant_features/<int:tenant_id> endpoint.
-        Returns a dictionary with 'enabled_features' and 'disabled_features' lists.
+        Splits the master feature list into enabled and disabled features for
+        a tenant. TenantFeature rows are overrides: a feature without one (or
+        with one that has no state) takes the feature's default_enabled, or
+        is on when the tenant is in the feature's rollout.
+        Shared by the sync service and the async read path.
         """
-        try:
-            self.tenant_repo.get_by_id(tenant_id) 
+        existing_tf_map = {tf.feature_id: tf for tf in existing_tenant_features_objs}
 
-            all_features_objs = self.feature_repo.get_all() 
-            existing_tenant_features_objs = self.repository.get_all_for_tenant(tenant_id)
+        enabled_features_data = []
+        disabled_features_data = []
 
-            existing_tf_map = {tf.feature_id: tf for tf in existing_tenant_features_objs}
+        for feature_obj in all_features_objs:
+            tf_entry = existing_tf_map.get(feature_obj.feature_id)
 
-            enabled_features_data = []
-            disabled_features_data = []
+            is_enabled = effective_state(feature_obj, tf_entry, tenant_obj)
 
-            for feature_obj in all_features_objs:
-                tf_entry = existing_tf_map.get(feature_obj.feature_id)
-                
-                
-                is_enabled = True 
-                if tf_entry:
-                    is_enabled = tf_entry.is_enabled
+            feature_dict = {
+                'feature_id': feature_obj.feature_id,
+                'name': feature_obj.name,
+                'is_enabled': is_enabled
+            }
 
-                feature_dict = {
-                    'feature_id': feature_obj.feature_id,
-                    'name': feature_obj.name,
-                    'is_enabled': is_enabled
-                }
+            if is_enabled:
+                enabled_features_data.append(feature_dict)
+            else:
+                disabled_features_data.append(feature_dict)
 
-                if is_enabled:
-                    enabled_features_data.append(feature_dict)
-                else:
-                    disabled_features_data.append(feature_dict)
+        enabled_features_data.sort(key=lambda x: x['name'].lower())
+        disabled_features_data.sort(key=lambda x: x['name'].lower())
 
-            enabled_features_data.sort(key=lambda x: x['name'].lower())
-            disabled_features_data.sort(key=lambda x: x['name'].lower())
+        return {
+            "enabled_features": enabled_features_data,  
+            "disabled_features": disabled_features_data
+        }
 
-            return {
-                "enabled_features": enabled_features_data,  
-                "disabled_features": disabled_features_data
-            }
+    def get_features_for_tenant_with_status(self, tenant_id):
+        """
+        Retrieves all master features and indicates their enabled/disabled status for a given tenant.
+        This services the /api/tenant_features/<int:tenant_id> endpoint.
+        Returns a dictionary with 'enabled_features' and 'disabled_features' lists.
+        Served through the single-flight read cache; treat the result as read-only.
+        """
+        return cached_read("tenant_feature_status", tenant_id, lambda: self._load_features_for_tenant_with_status(tenant_id))
+
+    def _load_features_for_tenant_with_status(self, tenant_id):
+        try:
+            tenant_obj = self.tenant_repo.get_by_id(tenant_id)
+
+            all_features_objs = self.feature_repo.get_all() 
+            existing_tenant_features_objs = self.repository.get_all_for_tenant(tenant_id)
+            return self.build_feature_status(all_features_objs, existing_tenant_features_objs, tenant_obj)
         except (TenantNotFoundError, DatabaseOperationError, ApplicationError):
             raise
         except Exception as e:
             log.exception(f"Unexpected error in get_features_for_tenant_with_status({tenant_id}): {e}")
             raise ApplicationError("Failed to retrieve feature status for tenant.", status_code=500)
 
+    def is_feature_enabled(self, tenant_id: int, feature_id: int):
+        """
+        Returns whether a feature is enabled for a tenant. Answered from the
+        shared feature flag table when it knows both ids, otherwise from the
+        database, merging the feature's default and rollout with the
+        tenant's override.
+        """
+        table = get_feature_flag_table()
+        is_enabled = table.is_enabled(tenant_id, feature_id) if table is not None else None
+        if is_enabled is not None:
+            return is_enabled
+        try:
+            tenant_obj = self.tenant_repo.get_by_id(tenant_id)
+            feature_obj = self.feature_repo.get_by_id(feature_id)
+            tf_entry = self.repository.get_by_tenant_and_feature(tenant_id, feature_id)
+            return effective_state(feature_obj, tf_entry, tenant_obj)
+        except (TenantNotFoundError, FeatureNotFoundError, DatabaseOperationError, ApplicationError):
+            raise
+        except Exception as e:
+            log.exception(f"Unexpected error in is_feature_enabled({tenant_id}, {feature_id}): {e}")
+            raise ApplicationError("Failed to check feature status for tenant.", status_code=500)
+
 
     def update_tenant_feature_configuration(self, tenant_id: int, submitted_enabled_feature_ids: list, submitted_disabled_feature_ids: list):
         """
         Updates the feature configurations for a specific tenant.
         This handles enabling and disabling features based on provided lists.
+        Only deviations from a feature's default are stored: a submitted
+        state that matches it removes the tenant's override instead. For a
+        feature with a rollout the override is always stored, so the state
+        stays put when the rollout changes.
         """
-        print(f"DEBUG: TFService.update - Tenant ID: {tenant_id}")
-        print(f"DEBUG: TFService.update - Submitted Enabled IDs: {submitted_enabled_feature_ids}")
-        print(f"DEBUG: TFService.update - Submitted Disabled IDs: {submitted_disabled_feature_ids}")
+        log.debug(
+            "TFService.update - Tenant ID: %s, submitted enabled IDs: %s, submitted disabled IDs: %s",
+            tenant_id, submitted_enabled_feature_ids, submitted_disabled_feature_ids
+        )
 
         try:
-            self.tenant_repo.get_by_id(tenant_id)
+            tenant_obj = self.tenant_repo.get_by_id(tenant_id)
 
             current_tenant_features_objs = self.repository.get_all_for_tenant(tenant_id)
             existing_tf_map = {tf.feature_id: tf for tf in current_tenant_features_objs}
 
-            current_enabled_db_ids = {tf.feature_id for tf in current_tenant_features_objs if tf.is_enabled}
-            current_disabled_db_ids = {tf.feature_id for tf in current_tenant_features_objs if not tf.is_enabled}
-
-            all_master_features = self.feature_repo.get_all()
-            all_master_feature_ids = {f.feature_id for f in all_master_features}
-
-            print(f"DEBUG: TFService.update - Current DB Enabled IDs: {current_enabled_db_ids}")
-            print(f"DEBUG: TFService.update - Current DB Disabled IDs: {current_disabled_db_ids}")
-            print(f"DEBUG: TFService.update - All Master Feature IDs: {all_master_feature_ids}")
+            all_master_features = {f.feature_id: f for f in self.feature_repo.get_all()}
 
             submitted_enabled_set = set(submitted_enabled_feature_ids)
             submitted_disabled_set = set(submitted_disabled_feature_ids)
 
             for fid in submitted_enabled_set.union(submitted_disabled_set):
-                if fid not in all_master_feature_ids:
+                if fid not in all_master_features:
                     raise FeatureNotFoundError(f"Feature with ID {fid} does not exist.")
 
-            features_to_enable_in_db = submitted_enabled_set - current_enabled_db_ids
-
-            features_to_disable_in_db = submitted_disabled_set - current_disabled_db_ids
-
-            features_to_switch_to_disabled = current_enabled_db_ids.intersection(submitted_disabled_set)
-
-            features_to_switch_to_enabled = current_disabled_db_ids.intersection(submitted_enabled_set)
-
-            print(f"DEBUG: TFService.update - Features to CREATE/UPDATE to ENABLED: {features_to_enable_in_db}")
-            print(f"DEBUG: TFService.update - Features to CREATE/UPDATE to DISABLED: {features_to_disable_in_db}")
-            print(f"DEBUG: TFService.update - Features to SWITCH FROM ENABLED TO DISABLED: {features_to_switch_to_disabled}")
-            print(f"DEBUG: TFService.update - Features to SWITCH FROM DISABLED TO ENABLED: {features_to_switch_to_enabled}")
-
             updates_made = False
 
-            for feature_id in features_to_enable_in_db.union(features_to_switch_to_enabled):
-                tf_entry = existing_tf_map.get(feature_id)
-                if not tf_entry: 
-                    self.repository.create(
-                        tenant_id=tenant_id,
-                        feature_id=feature_id,
-                        is_enabled=True,
-                      
-                        created_on=datetime.datetime.utcnow()
-                    )
-                    updates_made = True
-                    print(f"DEBUG: TFService.update - Created new TF entry for feature {feature_id} (enabled)")
-                elif not tf_entry.is_enabled: 
-                    self.repository.update(tf_entry, is_enabled=True, updated_at=datetime.datetime.utcnow())
-                    updates_made = True
-                    print(f"DEBUG: TFService.update - Updated TF entry for feature {feature_id} (enabled from disabled)")
-
-            for feature_id in features_to_disable_in_db.union(features_to_switch_to_disabled):
+            for feature_id in sorted(submitted_enabled_set.union(submitted_disabled_set)):
+                feature_obj = all_master_features[feature_id]
                 tf_entry = existing_tf_map.get(feature_id)
-                if not tf_entry: 
+                previous = effective_state(feature_obj, tf_entry, tenant_obj)
+                # A feature in both lists ends up disabled, as before.
+                desired = feature_id not in submitted_disabled_set
+
+                if override_is_redundant(feature_obj, desired):
+                    if tf_entry is None:
+                        continue
+                    self.repository.delete(tf_entry)
+                    log.debug("TFService.update - Removed override for feature %s (back to default)", feature_id)
+                elif tf_entry is None:
                     self.repository.create(
                         tenant_id=tenant_id,
                         feature_id=feature_id,
-                        is_enabled=False,
-               
+                        is_enabled=desired,
                         created_on=datetime.datetime.utcnow()
                     )
-                    updates_made = True
-                    print(f"DEBUG: TFService.update - Created new TF entry for feature {feature_id} (disabled)")
-                elif tf_entry.is_enabled: 
-                    self.repository.update(tf_entry, is_enabled=False, updated_at=datetime.datetime.utcnow())
-                    updates_made = True
-                    print(f"DEBUG: TFService.update - Updated TF entry for feature {feature_id} (disabled from enabled)")
+                    log.debug("TFService.update - Created override for feature %s (%s)", feature_id, desired)
+                elif tf_entry.is_enabled is not desired:
+                    self.repository.update(tf_entry, is_enabled=desired)
+                    log.debug("TFService.update - Updated override for feature %s (%s)", feature_id, desired)
+                else:
+                    continue
 
+                updates_made = True
+                if desired != previous:
+                    record_change("tenant_feature", f"{tenant_id}:{feature_id}", "enable" if desired else "disable",
+                                  tenant_id=tenant_id, details={"feature_id": feature_id, "previous": previous})
 
             if updates_made:
                 return self.message_schema.dump({"status": "success", "message": f"Feature configurations updated successfully for Tenant ID {tenant_id}!"})
@@ -179,5 +234,35 @@ class TenantFeatureService:
             log.exception(f"Unexpected error in update_tenant_feature_configuration for tenant {tenant_id}: {e}")
             raise ApplicationError("Failed to update tenant feature configuration due to an internal error.", status_code=500)
 
+    def compact_overrides(self, batch_size: int = 1000, dry_run: bool = False):
+        """
+        Deletes TenantFeature rows that no longer deviate from their feature's
+        default, for example after the default changed, in batches of
+        `batch_size` so no single statement holds locks for long. Removing
+        them does not change any tenant's effective state. With dry_run the
+        rows are only counted. Returns {"scanned_batches", "redundant", "deleted"}.
+        """
+        try:
+            summary = {"scanned_batches": 0, "redundant": 0, "deleted": 0}
+            after_id = 0
+            while True:
+                ids = self.repository.get_redundant_override_ids(after_id, batch_size)
+                if not ids:
+                    break
+                summary["scanned_batches"] += 1
+                summary["redundant"] += len(ids)
+                if not dry_run:
+                    summary["deleted"] += self.repository.delete_redundant_overrides(ids)
+                after_id = ids[-1]
+            if summary["deleted"]:
+                record_change("tenant_feature", "*", "compact", details=summary)
+            log.info(f"Tenant feature compaction{' (dry run)' if dry_run else ''}: {summary}")
+            return summary
+        except (DatabaseOperationError, ApplicationError):
+            raise
+        except Exception as e:
+            log.exception(f"Unexpected error in compact_overrides: {e}")
+            raise ApplicationError("Failed to compact tenant feature overrides.", status_code=500)
+
  
-tenant_feature_service = TenantFeatureService()
\ No newline at end of file
+tenant_feature_service = LazyService(TenantFeatureService)
\ No newline at end of file
@@ -7,6 +7,7 @@ from repositories.country_repository import country_repository
 from schemas.tenant_schemas import TenantInputSchema, TenantOutputSchema, TenantMinimalOutputSchema
 
 from errors import ApplicationError, NotFoundError, ValidationError, DuplicateOrganizationCodeError, DuplicateSubDomainError
+from services import LazyService
 
 
 
@@ -54,7 +55,7 @@ class TenantService:
         try:
             tenant = self.repository.get_by_id(tenant_id)
             dumped_tenant = TenantOutputSchema().dump(tenant)
-            print(f"DEBUG: TenantService.get_tenant_by_id({tenant_id}) returning: {dumped_tenant}")
+            log.debug("TenantService.get_tenant_by_id(%s) returning tenant", tenant_id)
             return dumped_tenant
         except NotFoundError:
             raise 
@@ -182,4 +183,4 @@ class TenantService:
             log.exception(f"Unexpected error in delete_tenant({tenant_id}, {organization_code}, {sub_domain}): {e}")
             raise ApplicationError("Failed to delete tenant due to an internal error.", status_code=500)
 
-tenant_service = TenantService()
+tenant_service = LazyService(TenantService)
@@ -40,26 +40,51 @@ document.addEventListener('DOMContentLoaded', async function () {
         moduleSearchInput.disabled = true;
     };
 
-    async function fetchProducts(){
-        productSelect.innerHTML = '<option value="">Loading…</option>';
-        try{
-            const res = await fetch(`/api/products`);
-            if(!res.ok) throw new Error(`Status ${res.status}`);
-            const products = await res.json();
-            productSelect.innerHTML = '<option value="">Select Product</option>';
-            products.forEach(p=>{
-                const opt = document.createElement('option');
-                opt.value = p.product_id;
-                opt.textContent = p.name || p.code || `Product ${p.product_id}`;
-                productSelect.appendChild(opt);
-            });
-            productSelect.disabled = false;
-        }catch(err){
-            console.error('Failed to fetch products', err);
-            productSelect.innerHTML = '<option value="">No products</option>';
-            productSelect.disabled = true;
+    const renderProducts = (products, selectedId = null) => {
+        productSelect.innerHTML = '<option value="">Select Product</option>';
+        products.forEach(p=>{
+            const opt = document.createElement('option');
+            opt.value = p.product_id;
+            opt.textContent = p.name || p.code || `Product ${p.product_id}`;
+            opt.selected = p.product_id === selectedId;
+            productSelect.appendChild(opt);
+        });
+        productSelect.disabled = false;
+    };
+
+    const renderBranches = (branches, selectedId = null) => {
+        if (branches.length === 0) {
+            branchSelect.innerHTML = '<option value="">No branches available for this tenant</option>';
+            branchSelect.disabled = true;
+            return;
         }
-    }
+        branchSelect.innerHTML = '<option value="">Select Branch</option>';
+        branches.forEach(b => {
+            const opt = document.createElement('option');
+            opt.value = b.branch_id;
+            opt.textContent = b.name;
+            opt.selected = b.branch_id === selectedId;
+            branchSelect.appendChild(opt);
+        });
+        branchSelect.disabled = false;
+    };
+
+    const applyModules = modules => {
+        allAvailableModules = modules.map(m => ({id:m.id, name:m.name, is_configured: m.is_configured}));
+        allAvailableModules.forEach(m => {
+            if(m.is_configured) initialConfiguredIds.add(m.id);
+        });
+        initialConfiguredIds.forEach(id => currentlySelectedIds.add(id));
+        initialSelectedStr.split(',').map(Number).filter(Boolean).forEach(id => currentlySelectedIds.add(id));
+
+        renderModuleCheckboxes('');
+        renderPreview();
+
+        moduleToggle.disabled   = false;
+        moduleSearchInput.disabled = false;
+        setHiddenValue();
+        setSelectedCount();
+    };
 
     async function fetchAndRenderModules(){
         selectedBranchId  = Number(branchSelect.value)  || null;
@@ -76,22 +101,7 @@ document.addEventListener('DOMContentLoaded', async function () {
         try{
             const res = await fetch(`/api/products/${selectedProductId}/modules?branch_id=${selectedBranchId}`);
             if(!res.ok) throw new Error(`Status ${res.status}`);
-            const modules = await res.json();
-            console.log("Fetched modules:", modules);
-            allAvailableModules = modules.map(m => ({id:m.id, name:m.name, is_configured: m.is_configured}));
-            allAvailableModules.forEach(m => {
-                if(m.is_configured) initialConfiguredIds.add(m.id);
-            });
-            initialConfiguredIds.forEach(id => currentlySelectedIds.add(id));
-            initialSelectedStr.split(',').map(Number).filter(Boolean).forEach(id => currentlySelectedIds.add(id));
-
-            renderModuleCheckboxes('');
-            renderPreview();
-
-            moduleToggle.disabled   = false;
-            moduleSearchInput.disabled = false;
-            setHiddenValue();
-            setSelectedCount();
+            applyModules(await res.json());
         }catch(err){
             console.error('Failed to fetch modules', err);
             clearModulesUI('Error loading modules');
@@ -193,36 +203,91 @@ document.addEventListener('DOMContentLoaded', async function () {
         }
     }
 
+    // Module configuration changes made elsewhere for the selected branch and
+    // product arrive as deltas from the change feed; pending selections are kept.
+    // The feed is long-polled with a bounded wait, and not at all while the tab
+    // is hidden, so an open page never holds a server worker indefinitely.
+    const CHANGE_POLL_WAIT = 20;
+    const CHANGE_POLL_RETRY_MS = 5000;
+    let changeSubscription = null;
+
+    const applyChange = change => {
+        const p = change.payload;
+        if (change.entity_type !== 'branch_product_module') return;
+        if (p.branch_id !== selectedBranchId || p.product_id !== selectedProductId) return;
+        const module = allAvailableModules.find(m => m.id === p.module_id);
+        if (!module) return;
+
+        module.is_configured = change.action !== 'delete';
+        if (module.is_configured) initialConfiguredIds.add(module.id); else initialConfiguredIds.delete(module.id);
+        renderModuleCheckboxes(moduleSearchInput.value);
+        renderPreview();
+    };
+
+    const whenVisible = () => new Promise(resolve => {
+        if (!document.hidden) return resolve();
+        document.addEventListener('visibilitychange', function onVisible(){
+            if (document.hidden) return;
+            document.removeEventListener('visibilitychange', onVisible);
+            resolve();
+        });
+    });
+
+    const subscribeToChanges = since => {
+        if (changeSubscription) changeSubscription.abort();
+        changeSubscription = null;
+        if (!selectedTenantId) return;
+
+        const subscription = new AbortController();
+        changeSubscription = subscription;
+        const tenantId = selectedTenantId;
+        (async () => {
+            while (!subscription.signal.aborted) {
+                await whenVisible();
+                if (subscription.signal.aborted) return;
+                try {
+                    const res = await fetch(`/api/changes?tenant_id=${tenantId}&since=${since}&wait=${CHANGE_POLL_WAIT}`, {signal: subscription.signal});
+                    if (!res.ok) throw new Error(`Status ${res.status}`);
+                    const page = await res.json();
+                    page.changes.forEach(applyChange);
+                    since = page.next_since;
+                } catch (err) {
+                    if (subscription.signal.aborted) return;
+                    console.error('Change feed poll failed', err);
+                    await new Promise(resolve => setTimeout(resolve, CHANGE_POLL_RETRY_MS));
+                }
+            }
+        })();
+    };
+
+    // Products and the tenant's branches arrive together from the configuration context endpoint.
     async function onTenantChange(){
         selectedTenantId = Number(tenantSelect.value) || null;
-        await fetchProducts();
+        clearModulesUI();
 
+        if (!selectedTenantId) {
+            subscribeToChanges(0);
+            branchSelect.innerHTML = '<option value="">Select Branch</option>';
+            branchSelect.disabled = true;
+            return;
+        }
+
+        productSelect.innerHTML = '<option value="">Loading…</option>';
         branchSelect.innerHTML = '<option value="">Loading branches…</option>';
         try {
-            const res = await fetch(`/api/tenants/${selectedTenantId}/branches`);
+            const res = await fetch(`/api/tenants/${selectedTenantId}/configuration-context`);
             if (!res.ok) throw new Error(`Status ${res.status}`);
-            const branches = await res.json();
-
-            if (branches.length === 0) {
-                branchSelect.innerHTML = '<option value="">No branches available for this tenant</option>';
-                branchSelect.disabled = true;
-            } else {
-                branchSelect.innerHTML = '<option value="">Select Branch</option>';
-                branches.forEach(b => {
-                    const opt = document.createElement('option');
-                    opt.value = b.branch_id;
-                    opt.textContent = b.name;
-                    branchSelect.appendChild(opt);
-                });
-                branchSelect.disabled = false;
-            }
+            const context = await res.json();
+            renderProducts(context.products);
+            renderBranches(context.branches);
+            subscribeToChanges(context.change_version);
         } catch (err) {
-            console.error('Failed to fetch branches', err);
+            console.error('Failed to fetch configuration context', err);
+            productSelect.innerHTML = '<option value="">No products</option>';
+            productSelect.disabled = true;
             branchSelect.innerHTML = '<option value="">Error loading branches</option>';
             branchSelect.disabled = true;
         }
-
-        clearModulesUI();
     }
 
     tenantSelect .addEventListener('change', onTenantChange);
@@ -230,8 +295,23 @@ document.addEventListener('DOMContentLoaded', async function () {
     productSelect.addEventListener('change', fetchAndRenderModules);
     moduleSearchInput.addEventListener('input', e=> renderModuleCheckboxes(e.target.value));
 
-    if(selectedTenantId) await onTenantChange();
-    if(selectedBranchId && selectedProductId) await fetchAndRenderModules();
+    // First paint comes from the context index_get embedded in the page; no requests needed.
+    const context = window.configurationContext;
+    if (context) {
+        renderProducts(context.products, context.product_id);
+        if (context.tenant_id) {
+            renderBranches(context.branches, context.branch_id);
+            subscribeToChanges(context.change_version);
+        }
+        if (context.branch_id && context.product_id) {
+            selectedBranchId  = context.branch_id;
+            selectedProductId = context.product_id;
+            applyModules(context.modules);
+        }
+    } else {
+        if(selectedTenantId) await onTenantChange();
+        if(selectedBranchId && selectedProductId) await fetchAndRenderModules();
+    }
 
     if(initialSelectedStr){
         initialSelectedStr.split(',').map(Number).filter(Boolean).forEach(id=> currentlySelectedIds.add(id));
@@ -132,5 +132,11 @@ document.addEventListener('DOMContentLoaded', () => {
 
 
     
-    loadProducts();
+    // On the index page the products are already rendered from the embedded configuration context.
+    if (window.configurationContext) {
+        if (viewBtn) viewBtn.disabled = productSelect.options.length <= 1;
+        toggleActionButtons();
+    } else {
+        loadProducts();
+    }
 });
@@ -1,8 +1,23 @@
 import unittest
+import os
+# Run against an in-memory SQLite schema unless a real DATABASE_URL is given.
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("DB_CREATE_SCHEMA", "true")
+os.environ.setdefault("BACKGROUND_WORKERS", "false")
 from unittest.mock import patch, MagicMock
-from app import app, db, Country, Tenant, Branch, Product, TenantReport, ProductModule, Module, BranchProductModule 
+from flask import g
+from app import app, db, Country, Tenant, Branch, Product, TenantReport, ProductModule, Module, BranchProductModule, ConfigurationAuditLog, ConfigurationChange, Feature, TenantFeature
 import json
 import uuid
+import datetime
+import logging
+import sqlalchemy
+from query_detector import detect_n_plus_one, fingerprint_statement
+from logging_config import parse_log_levels, SamplingFilter
+from metrics import MetricsRegistry
+from benchmarks.data_generator import DataGenerator, DatasetScale
+from benchmarks.harness import percentile, compare_to_baseline
+from repositories.base_repository import cached_lookup, invalidate_lookup_cache, get_lookup_cache_stats, reset_lookup_cache_stats
 
 class TestApiEndpoints(unittest.TestCase):
     def setUp(self):
@@ -193,8 +208,8 @@ class TestApiEndpoints(unittest.TestCase):
         response_json = response.get_json()
         self.assertIsNotNone(response_json, "Response JSON should not be None for 404 errors")
 
-        self.assertIn("error", response_json)
-        self.assertEqual(response_json["error"], "Resource not found")
+        self.assertEqual(response_json["status"], "error")
+        self.assertEqual(response_json["message"], "Not Found")
         self.assertIn("details", response_json)
         self.assertIn("The requested URL was not found on the server.", response_json["details"])
 
@@ -282,8 +297,8 @@ class TestApiEndpoints(unittest.TestCase):
         response_json = response.get_json()
         self.assertIsNotNone(response_json, "Response JSON should not be None for 404 errors")
 
-        self.assertIn("error", response_json)
-        self.assertEqual(response_json["error"], "Resource not found")
+        self.assertEqual(response_json["status"], "error")
+        self.assertEqual(response_json["message"], "Not Found")
         self.assertIn("details", response_json)
         self.assertIn("The requested URL was not found on the server.", response_json["details"])
 
@@ -300,9 +315,8 @@ class TestApiEndpoints(unittest.TestCase):
         response_json = response.get_json()
         self.assertIsNotNone(response_json, "Response JSON should not be None for 404 errors")
 
-        self.assertIn("error", response_json)
-       
-        self.assertEqual(response_json["error"], "Resource not found")
+        self.assertEqual(response_json["status"], "error")
+        self.assertEqual(response_json["message"], "Not Found")
         self.assertIn("details", response_json)
         self.assertIn("The requested URL was not found on the server.", response_json["details"])
         
@@ -328,7 +342,7 @@ class TestApiEndpoints(unittest.TestCase):
         response = self.client.post('/api/products', data=json.dumps(payload), headers=self.headers)
         
         self.assertEqual(response.status_code, 500)
-        self.assertIn("error", response.get_json())
+        self.assertEqual(response.get_json()["status"], "error")
 
 
     def test_create_product_invalid_product_tag_id(self):
@@ -344,8 +358,8 @@ class TestApiEndpoints(unittest.TestCase):
             "product_tag_id": invalid_product_tag_id
         }
         response = self.client.post('/api/products', data=json.dumps(payload), headers=self.headers)
-        self.assertEqual(response.status_code, 500) 
-        self.assertIn("error", response.get_json())
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(response.get_json()["status"], "error")
 
 
     def test_update_product_non_existent_id(self):
@@ -375,8 +389,8 @@ class TestApiEndpoints(unittest.TestCase):
             "product_tag_id": invalid_product_tag_id
         }
         response = self.client.put(f'/api/products/{self.test_product_id}', data=json.dumps(payload), headers=self.headers)
-        self.assertEqual(response.status_code, 500) 
-        self.assertIn("error", response.get_json())
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(response.get_json()["status"], "error")
 
     def test_delete_product_negative_id(self):
         """Tests deleting a non-existent product with a negative ID.
@@ -387,162 +401,1371 @@ class TestApiEndpoints(unittest.TestCase):
         response_json = response.get_json()
         self.assertIsNotNone(response_json, "Response JSON should not be None for 404 errors")
 
-        self.assertIn("error", response_json)
-       
-        self.assertEqual(response_json["error"], "Resource not found")
+        self.assertEqual(response_json["status"], "error")
+        self.assertEqual(response_json["message"], "Not Found")
         self.assertIn("details", response_json)
         self.assertIn("The requested URL was not found on the server.", response_json["details"]) 
 
 
 
-    def test_get_configured_modules_invalid_product_id(self):
-        """Tests retrieving configured modules with an invalid product_id (non-existent)."""
-        invalid_product_id = self.test_product_id + 9999
-        response = self.client.get(f'/api/configure_modules?branch_id={self.test_branch_id}&product_id={invalid_product_id}&module_ids={self.test_module_id_1}')
-        self.assertEqual(response.status_code, 404)
-        self.assertIn("One or more requested product modules are not defined.", response.get_json()["error"])
+    def _configure(self, *module_ids):
+        return self.client.post('/api/config/save-product-modules', data=json.dumps({
+            "tenant_id": self.test_tenant_id,
+            "branch_id": self.test_branch_id,
+            "product_id": self.test_product_id,
+            "module_ids_hidden": ",".join(str(module_id) for module_id in module_ids)
+        }), headers=self.headers)
 
+    def _configured_module_ids(self):
+        return sorted(
+            bpm.product_module.module_id
+            for bpm in BranchProductModule.query.filter_by(branch_id=self.test_branch_id)
+        )
 
-    def test_get_configured_modules_non_integer_module_ids(self):
-        """Tests retrieving configured modules with non-integer module_ids."""
-        response = self.client.get(f'/api/configure_modules?branch_id={self.test_branch_id}&product_id={self.test_product_id}&module_ids=abc,123')
-        self.assertEqual(response.status_code, 400)
-        self.assertIn("module_ids must be a comma-separated list of integers", response.get_json()["error"])
+    def test_get_configured_modules_invalid_branch_id(self):
+        """Tests retrieving configured modules for a non-existent branch."""
+        invalid_branch_id = self.test_branch_id + 9999
+        response = self.client.get(f'/api/branches/{invalid_branch_id}/products/{self.test_product_id}/configured-modules')
+        self.assertEqual(response.status_code, 404)
+        self.assertIn(f"Branch with ID {invalid_branch_id} not found", response.get_json()["message"])
 
-    def test_get_configured_modules_product_module_not_defined(self):
-        """Tests retrieving configured modules when a product module is not defined for the given product."""
-        non_existent_module_id = self.test_module_id_1 + 9999
-        response = self.client.get(f'/api/configure_modules?branch_id={self.test_branch_id}&product_id={self.test_product_id}&module_ids={non_existent_module_id}')
+    def test_get_configured_modules_invalid_product_id(self):
+        """Tests retrieving configured modules with an invalid product_id (non-existent)."""
+        invalid_product_id = self.test_product_id + 9999
+        response = self.client.get(f'/api/branches/{self.test_branch_id}/products/{invalid_product_id}/configured-modules')
         self.assertEqual(response.status_code, 404)
-        self.assertIn("One or more requested product modules are not defined.", response.get_json()["error"])
-        self.assertIn(f"No ProductModule found for product_id {self.test_product_id} with missing module(s): module_id {non_existent_module_id}", response.get_json()["details"])
+        self.assertIn(f"Product with ID {invalid_product_id} not found", response.get_json()["message"])
 
+    def test_get_configured_modules_lists_the_branch_configuration(self):
+        """Tests that only the modules configured for the branch and product are listed."""
+        self.assertEqual(self._configure(self.test_module_id_1).status_code, 200)
+        response = self.client.get(f'/api/branches/{self.test_branch_id}/products/{self.test_product_id}/configured-modules')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([module["module_id"] for module in response.get_json()], [self.test_module_id_1])
 
-    def test_create_configured_modules_missing_fields(self):
-        """Tests creating configured modules with missing required JSON fields."""
+    def test_save_product_modules_missing_fields(self):
+        """Tests saving a module configuration without a tenant_id."""
         payload = {
             "branch_id": self.test_branch_id,
             "product_id": self.test_product_id,
-            "module_ids": [self.test_module_id_1]
-            
+            "module_ids_hidden": str(self.test_module_id_1)
         }
-        response = self.client.post('/api/configure_modules', data=json.dumps(payload), headers=self.headers)
+        response = self.client.post('/api/config/save-product-modules', data=json.dumps(payload), headers=self.headers)
         self.assertEqual(response.status_code, 400)
-        self.assertIn("branch_id, product_id, module_ids (list), and created_by are required", response.get_json()["error"])
+        self.assertIn("Missing or invalid Tenant, Branch, or Product ID format.", response.get_json()["message"])
 
-    def test_create_configured_modules_invalid_branch_id(self):
-        """Tests creating configured modules with an invalid branch_id (non-existent)."""
+    def test_save_product_modules_invalid_branch_id(self):
+        """Tests saving a module configuration for a non-existent branch."""
         invalid_branch_id = self.test_branch_id + 9999
         payload = {
+            "tenant_id": self.test_tenant_id,
             "branch_id": invalid_branch_id,
             "product_id": self.test_product_id,
-            "module_ids": [self.test_module_id_1],
-            "created_by": "test_user"
+            "module_ids_hidden": str(self.test_module_id_1)
         }
-        response = self.client.post('/api/configure_modules', data=json.dumps(payload), headers=self.headers)
+        response = self.client.post('/api/config/save-product-modules', data=json.dumps(payload), headers=self.headers)
         self.assertEqual(response.status_code, 404)
-        self.assertIn(f"Branch with ID {invalid_branch_id} not found.", response.get_json()["error"])
-
-   
+        self.assertIn(f"Branch with ID {invalid_branch_id} not found.", response.get_json()["message"])
 
-    def test_create_configured_modules_non_list_module_ids(self):
-        """Tests creating configured modules with non-list module_ids."""
+    def test_save_product_modules_invalid_product_id(self):
+        """Tests saving a module configuration for a non-existent product."""
+        invalid_product_id = self.test_product_id + 9999
         payload = {
+            "tenant_id": self.test_tenant_id,
             "branch_id": self.test_branch_id,
-            "product_id": self.test_product_id,
-            "module_ids": "not_a_list",
-            "created_by": "test_user"
+            "product_id": invalid_product_id,
+            "module_ids_hidden": str(self.test_module_id_1)
         }
-        response = self.client.post('/api/configure_modules', data=json.dumps(payload), headers=self.headers)
-        self.assertEqual(response.status_code, 400)
-        self.assertIn("module_ids must be a list of integers", response.get_json()["error"])
+        response = self.client.post('/api/config/save-product-modules', data=json.dumps(payload), headers=self.headers)
+        self.assertEqual(response.status_code, 404)
+        self.assertIn(f"Product with ID {invalid_product_id} not found.", response.get_json()["message"])
+
+    def test_save_product_modules_ignores_non_integer_module_ids(self):
+        """Tests that non-integer entries in module_ids_hidden are skipped and the valid ones saved."""
+        response = self._configure(self.test_module_id_1, "abc")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()["modules_added"], ["Module A"])
+        self.assertEqual(self._configured_module_ids(), [self.test_module_id_1])
+
+    def test_save_product_modules_product_module_not_defined(self):
+        """Tests that a module not defined for the product is not configured."""
+        response = self._configure(self.test_module_id_1 + 9999)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()["status"], "info")
+        self.assertEqual(self._configured_module_ids(), [])
+
+    def test_save_product_modules_already_configured(self):
+        """Tests that saving an already configured module changes nothing."""
+        self._configure(self.test_module_id_1)
+        response = self._configure(self.test_module_id_1)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()["status"], "info")
+        self.assertEqual(response.get_json()["modules_skipped_configured"], ["Module A"])
+        self.assertEqual(self._configured_module_ids(), [self.test_module_id_1])
+
+    def test_delete_configured_module_product_module_not_defined(self):
+        """Tests unconfiguring a module that is not defined for the product."""
+        missing_module_id = self.test_module_id_1 + 9999
+        response = self.client.delete(f'/api/branches/{self.test_branch_id}/products/{self.test_product_id}/modules/{missing_module_id}')
+        self.assertEqual(response.status_code, 404)
+        self.assertIn("not found", response.get_json()["message"])
 
-    def test_create_configured_modules_non_integer_module_ids_in_list(self):
-        """Tests creating configured modules with non-integer module_ids in the list."""
-        payload = {
-            "branch_id": self.test_branch_id,
-            "product_id": self.test_product_id,
-            "module_ids": [self.test_module_id_1, "abc"],
-            "created_by": "test_user"
-        }
-        response = self.client.post('/api/configure_modules', data=json.dumps(payload), headers=self.headers)
-        self.assertEqual(response.status_code, 400)
-        self.assertIn("module_ids must be a list of integers", response.get_json()["error"])
+    def test_delete_configured_module_no_matching_config(self):
+        """Tests unconfiguring a module that is not configured for the branch."""
+        response = self.client.delete(f'/api/branches/{self.test_branch_id}/products/{self.test_product_id}/modules/{self.test_module_id_1}')
+        self.assertEqual(response.status_code, 404)
+        self.assertIn("not configured", response.get_json()["message"])
+
+    def test_delete_configured_module(self):
+        """Tests that unconfiguring a configured module removes only that module."""
+        self._configure(self.test_module_id_1, self.test_module_id_2)
+        response = self.client.delete(f'/api/branches/{self.test_branch_id}/products/{self.test_product_id}/modules/{self.test_module_id_1}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._configured_module_ids(), [self.test_module_id_2])
+
+class TestNPlusOneDetector(unittest.TestCase):
+    def test_fingerprint_ignores_literals_and_in_list_length(self):
+        """Tests that statements differing only in literal values share a fingerprint."""
+        first = fingerprint_statement("SELECT * FROM branch WHERE branch_id = 12 AND code = 'TB001'")
+        second = fingerprint_statement("SELECT *   FROM branch WHERE branch_id = 7 AND code = 'X'")
+        self.assertEqual(first, second)
+        self.assertEqual(
+            fingerprint_statement("SELECT * FROM module WHERE module_id IN (?, ?, ?)"),
+            fingerprint_statement("SELECT * FROM module WHERE module_id IN (?)")
+        )
 
-    def test_create_configured_modules_product_module_not_defined(self):
-        """Tests creating configured modules when a product module is not defined for the given product."""
-        non_existent_module_id = self.test_module_id_1 + 9999
-        payload = {
-            "branch_id": self.test_branch_id,
-            "product_id": self.test_product_id,
-            "module_ids": [non_existent_module_id],
-            "created_by": "test_user"
-        }
-        response = self.client.post('/api/configure_modules', data=json.dumps(payload), headers=self.headers)
+    def test_repeated_statements_are_flagged(self):
+        """Tests that a statement repeated above the threshold fails the assertion helper."""
+        engine = sqlalchemy.create_engine("sqlite://")
+        with detect_n_plus_one(engine, threshold=3) as detector:
+            with engine.connect() as conn:
+                for module_id in range(5):
+                    conn.execute(sqlalchemy.text("SELECT :module_id"), {"module_id": module_id})
+        self.assertEqual(len(detector.violations()), 1)
+        with self.assertRaises(AssertionError):
+            detector.assert_no_n_plus_one()
+
+    def test_distinct_statements_pass(self):
+        """Tests that statements below the threshold are not flagged."""
+        engine = sqlalchemy.create_engine("sqlite://")
+        with detect_n_plus_one(engine, threshold=3) as detector:
+            with engine.connect() as conn:
+                conn.execute(sqlalchemy.text("SELECT 1"))
+                conn.execute(sqlalchemy.text("SELECT 2"))
+        detector.assert_no_n_plus_one()
+
+    def test_hot_endpoints_do_not_load_per_row(self):
+        """Tests the branch, tenant feature and configured module reads for repeated statements."""
+        from app import create_app
+        flask_app = create_app("api", {"SQLALCHEMY_DATABASE_URI": "sqlite://", "DB_CREATE_SCHEMA": True})
+        with flask_app.app_context():
+            DataGenerator(DatasetScale(countries=1, tenants=2, branches_per_tenant=8, products=2, modules=8, modules_per_product=8, bpm_fill=1.0, features=12, tenant_feature_fill=1.0)).generate()
+            branch = Branch.query.filter_by(tenant_id=1).first()
+            product_id = BranchProductModule.query.filter_by(branch_id=branch.branch_id).first().product_module.product_id
+            engine = db.engine
+        client = flask_app.test_client()
+        with detect_n_plus_one(engine, threshold=2) as detector:
+            self.assertEqual(client.get("/api/tenants/1/branches").status_code, 200)
+            self.assertEqual(client.get("/api/tenant-features/1").status_code, 200)
+            self.assertEqual(client.get(f"/api/branches/{branch.branch_id}/products/{product_id}/configured-modules").status_code, 200)
+        self.assertGreater(sum(detector.counts.values()), 0)
+        detector.assert_no_n_plus_one()
+
+
+class TestRequestLookupCache(unittest.TestCase):
+    def setUp(self):
+        reset_lookup_cache_stats()
+        self.loads = 0
+
+    def _load_branch(self):
+        self.loads += 1
+        return Branch(branch_id=1, name="Cached Branch")
+
+    def test_repeat_lookups_are_served_from_cache(self):
+        """Tests that repeat lookups in one request only hit the loader once."""
+        with app.test_request_context('/'):
+            first = cached_lookup(Branch, 'branch_id', 1, self._load_branch)
+            second = cached_lookup(Branch, 'branch_id', 1, self._load_branch)
+        self.assertIs(first, second)
+        self.assertEqual(self.loads, 1)
+        stats = get_lookup_cache_stats()
+        self.assertEqual(stats["models"]["Branch"], {"hits": 1, "misses": 1})
+
+    def test_cache_is_request_scoped_and_invalidated(self):
+        """Tests that the cache does not outlive the request and is dropped on writes."""
+        with app.test_request_context('/'):
+            cached_lookup(Branch, 'branch_id', 1, self._load_branch)
+            invalidate_lookup_cache(Branch)
+            cached_lookup(Branch, 'branch_id', 1, self._load_branch)
+        with app.test_request_context('/'):
+            cached_lookup(Branch, 'branch_id', 1, self._load_branch)
+        self.assertEqual(self.loads, 3)
+
+    def test_no_caching_outside_a_request(self):
+        """Tests that a bare app context, as held by background threads, does not cache."""
+        with app.app_context():
+            cached_lookup(Branch, 'branch_id', 1, self._load_branch)
+            cached_lookup(Branch, 'branch_id', 1, self._load_branch)
+            self.assertNotIn("_repository_lookup_cache", g)
+        self.assertEqual(self.loads, 2)
+
+
+class TestLoggingConfig(unittest.TestCase):
+    def test_parse_log_levels(self):
+        """Tests parsing of per-module level specs."""
+        self.assertEqual(
+            parse_log_levels("repositories=debug, services=INFO,bogus"),
+            {"repositories": "DEBUG", "services": "INFO"}
+        )
+
+    def test_sampling_filter_never_drops_warnings(self):
+        """Tests that sampling only applies to DEBUG records."""
+        sampling_filter = SamplingFilter(sample_rate=0.0)
+        debug_record = logging.LogRecord("repositories", logging.DEBUG, __file__, 1, "debug", None, None)
+        warning_record = logging.LogRecord("repositories", logging.WARNING, __file__, 1, "warning", None, None)
+        self.assertFalse(sampling_filter.filter(debug_record))
+        self.assertTrue(sampling_filter.filter(warning_record))
+
+    def test_async_logging_filters_records_once(self):
+        """Tests that under LOG_ASYNC only the queue handler samples, so DEBUG records are kept at the configured rate."""
+        import logging_config
+        from flask import Flask
+        root = logging.getLogger()
+        saved = (list(root.handlers), root.level)
+
+        def restore():
+            logging_config._stop_queue_listener()
+            logging_config._queue_listener = None
+            root.handlers[:], level = saved
+            root.setLevel(level)
+        self.addCleanup(restore)
+        for _ in range(2):
+            async_app = Flask(__name__)
+            async_app.config.update(LOG_ASYNC=True, LOG_DEBUG_SAMPLE_RATE=0.1)
+            logging_config.init_logging(async_app)
+
+        queue_handlers = [h for h in logging.getLogger().handlers if isinstance(h, logging.handlers.QueueHandler)]
+        self.assertEqual(len(queue_handlers), 1)
+        self.assertEqual(sum(isinstance(f, SamplingFilter) for f in queue_handlers[0].filters), 1)
+        self.assertEqual([h.filters for h in logging_config._queue_listener.handlers], [[]])
+
+
+class TestMetrics(unittest.TestCase):
+    def test_histogram_renders_cumulative_buckets(self):
+        """Tests the text exposition output of a labelled histogram."""
+        registry = MetricsRegistry()
+        histogram = registry.histogram("test_latency_seconds", "Test latency.", ("endpoint",), buckets=(0.1, 1.0))
+        histogram.observe(0.05, endpoint="/api/tenants/")
+        histogram.observe(0.5, endpoint="/api/tenants/")
+        output = registry.render()
+        self.assertIn('test_latency_seconds_bucket{endpoint="/api/tenants/",le="0.1"} 1', output)
+        self.assertIn('test_latency_seconds_bucket{endpoint="/api/tenants/",le="+Inf"} 2', output)
+        self.assertIn('test_latency_seconds_count{endpoint="/api/tenants/"} 2', output)
+
+    def test_metrics_endpoint_uses_route_templates(self):
+        """Tests that /metrics labels requests by route template rather than raw URL."""
+        client = app.test_client()
+        client.get('/metrics')
+        output = client.get('/metrics').get_data(as_text=True)
+        self.assertIn('endpoint="/metrics"', output)
+        self.assertIn('# TYPE http_request_duration_seconds histogram', output)
+
+
+class TestBenchmarkHarness(unittest.TestCase):
+    def test_percentile_nearest_rank(self):
+        """Tests nearest-rank percentiles on a sorted sample."""
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([], 95), 0.0)
+
+    def test_compare_to_baseline_flags_query_and_latency_regressions(self):
+        """Tests that extra queries or p95 growth beyond tolerance are reported."""
+        baseline = {"endpoints": {"tenant_listing": {"p95_ms": 10.0, "queries_per_request": 1.0, "errors": 0}}}
+        within = {"endpoints": {"tenant_listing": {"p95_ms": 12.0, "queries_per_request": 1.0, "errors": 0}}}
+        regressed = {"endpoints": {"tenant_listing": {"p95_ms": 20.0, "queries_per_request": 2.0, "errors": 0}}}
+        self.assertEqual(compare_to_baseline(within, baseline, 0.25), [])
+        self.assertEqual(len(compare_to_baseline(regressed, baseline, 0.25)), 2)
+
+    def test_refuses_to_drop_an_existing_schema(self):
+        """Tests that the harness leaves a database with tables alone unless a reset is requested."""
+        from app import create_app
+        from benchmarks.harness import run_benchmarks
+        bench_app = create_app("api", {"SQLALCHEMY_DATABASE_URI": "sqlite://", "DB_CREATE_SCHEMA": True})
+        with bench_app.app_context():
+            db.session.add(Country(country_name="Keep", country_code="KP", status="Active"))
+            db.session.commit()
+        with self.assertRaises(ValueError):
+            run_benchmarks(bench_app, DatasetScale(tenants=1, branches_per_tenant=1, products=1, modules=1, features=1), 1, 0)
+        with bench_app.app_context():
+            self.assertEqual(Country.query.count(), 1)
+
+
+class TestDataGenerator(unittest.TestCase):
+    def _tables(self, seed):
+        generator = DataGenerator(DatasetScale(tenants=3, branches_per_tenant=2, products=6, modules=5, modules_per_product=3), seed=seed)
+        return {model.__tablename__: list(rows) for model, rows in generator.iter_tables()}
+
+    def test_same_seed_produces_identical_rows(self):
+        """Tests that generation is reproducible and that the seed changes the data."""
+        self.assertEqual(self._tables(7), self._tables(7))
+        self.assertNotEqual(self._tables(7)["branch_product_module"], self._tables(8)["branch_product_module"])
+
+    def test_generated_rows_are_referentially_consistent(self):
+        """Tests parent hierarchy, module dependencies and foreign keys of the generated rows."""
+        tables = self._tables(1)
+        for product in tables["product"]:
+            self.assertTrue(product["parent_product_id"] is None or product["parent_product_id"] < product["product_id"])
+        for module in tables["module"]:
+            self.assertTrue(all(dep < module["module_id"] for dep in module["dependent_modules"]))
+        self.assertEqual(len(tables["product_module"]), 6 * 3)
+        product_module_ids = {row["product_module_id"] for row in tables["product_module"]}
+        for bpm in tables["branch_product_module"]:
+            self.assertIn(bpm["product_module_id"], product_module_ids)
+            self.assertIn("currencies", json.loads(bpm["eligibility_config"]))
+
+
+class TestSqliteProfile(unittest.TestCase):
+    def test_mysql_ddl_keeps_mysql_constructs(self):
+        """Tests that the MySQL schema still uses the composite key, LONGTEXT and JSON_VALID checks."""
+        from sqlalchemy.dialects import mysql
+        tenant_ddl = str(sqlalchemy.schema.CreateTable(Tenant.__table__).compile(dialect=mysql.dialect()))
+        bpm_ddl = str(sqlalchemy.schema.CreateTable(BranchProductModule.__table__).compile(dialect=mysql.dialect()))
+        self.assertIn("PRIMARY KEY (tenant_id, organization_code, sub_domain)", tenant_ddl)
+        self.assertIn("LONGTEXT COLLATE utf8mb4_bin", bpm_ddl)
+        self.assertIn("CHECK (JSON_VALID(eligibility_config))", bpm_ddl)
+
+    def test_sqlite_schema_autoincrements_and_validates_json(self):
+        """Tests tenant id generation, enum case folding and JSON checks on the in-memory schema."""
+        engine = sqlalchemy.create_engine("sqlite://")
+        db.metadata.create_all(engine)
+        with engine.begin() as conn:
+            conn.execute(Country.__table__.insert(), {"country_code": "XX", "country_name": "X", "status": "active"})
+            result = conn.execute(Tenant.__table__.insert(), {"organization_code": "ORG", "sub_domain": "sub", "default_currency": "USD"})
+            self.assertEqual(result.inserted_primary_key[0], 1)
+            self.assertEqual(conn.execute(sqlalchemy.select(Country.status)).scalar(), "Active")
+            conn.execute(BranchProductModule.__table__.insert(), {"created_at": datetime.datetime(2024, 1, 1), "eligibility_config": None})
+        with self.assertRaises(sqlalchemy.exc.IntegrityError):
+            with engine.begin() as conn:
+                conn.execute(BranchProductModule.__table__.insert(), {"created_at": datetime.datetime(2024, 1, 1), "eligibility_config": "{bad"})
+
+
+class TestAppFactory(unittest.TestCase):
+    def _rules(self, profile):
+        from app import create_app
+        test_app = create_app(profile, {"SQLALCHEMY_DATABASE_URI": "sqlite://", "DB_CREATE_SCHEMA": False})
+        return {rule.rule for rule in test_app.url_map.iter_rules()}
+
+    def test_profiles_register_only_their_stack(self):
+        """Tests that the api profile skips the web UI and docs and the web profile skips the API."""
+        api_rules = self._rules("api")
+        web_rules = self._rules("web")
+        self.assertIn("/api/tenants/", api_rules)
+        self.assertFalse(any(rule.startswith("/swagger") for rule in api_rules))
+        self.assertIn("/static/openapi.yaml", web_rules)
+        self.assertNotIn("/api/tenants/", web_rules)
+        with self.assertRaises(ValueError):
+            self._rules("worker")
+
+    def test_lazy_service_builds_once_on_first_use(self):
+        """Tests that a lazy service singleton defers construction and then reuses the instance."""
+        from services import LazyService
+        built = []
+
+        class Service:
+            def __init__(self):
+                built.append(self)
+                self.name = "service"
+
+        service = LazyService(Service)
+        self.assertEqual(built, [])
+        self.assertEqual(service.name, "service")
+        self.assertEqual(service.name, "service")
+        self.assertEqual(len(built), 1)
+
+
+class TestOpenApiDocs(unittest.TestCase):
+    def setUp(self):
+        from app import create_app
+        self.docs_app = create_app("full", {"SQLALCHEMY_DATABASE_URI": "sqlite://", "DB_CREATE_SCHEMA": False})
+        self.client = self.docs_app.test_client()
+
+    def test_spec_is_served_compressed_with_etag_revalidation(self):
+        """Tests gzip negotiation, cache headers and a 304 on a matching ETag."""
+        response = self.client.get('/static/openapi.yaml', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertIn('max-age=', response.headers['Cache-Control'])
+        revalidated = self.client.get('/static/openapi.yaml', headers={
+            'Accept-Encoding': 'gzip', 'If-None-Match': response.headers['ETag']
+        })
+        self.assertEqual(revalidated.status_code, 304)
+        self.assertEqual(self.client.get('/static/openapi.json').json['openapi'][:1], '3')
+
+    def test_drift_lists_documented_operations_without_routes(self):
+        """Tests that spec paths with no matching route are reported."""
+        from openapi_docs import find_spec_drift
+        spec = {"paths": {
+            "/api/tenants/{tenant_id}/branches": {"get": {}},
+            "/api/does-not-exist/{id}": {"delete": {}, "parameters": []},
+        }}
+        self.assertEqual(find_spec_drift(spec, self.docs_app), ["DELETE /api/does-not-exist/{id}"])
+
+
+class TestCompression(unittest.TestCase):
+    def setUp(self):
+        from app import create_app
+        from flask import Response
+        self.compression_app = create_app("api", {"SQLALCHEMY_DATABASE_URI": "sqlite://", "DB_CREATE_SCHEMA": False, "COMPRESSION_MIN_SIZE": 1024})
+
+        @self.compression_app.route('/_test/items/<int:count>')
+        def items(count):
+            return Response(json.dumps([{"branch": i, "status": "Active"} for i in range(count)]), mimetype="application/json")
+
+        @self.compression_app.route('/_test/stream')
+        def stream():
+            return Response((json.dumps({"row": i}) + "\n" for i in range(2000)), mimetype="application/json")
+
+        self.client = self.compression_app.test_client()
+
+    def test_threshold_and_negotiation(self):
+        """Tests that only bodies above the threshold are gzipped, and only when the client accepts it."""
+        import gzip
+        small = self.client.get('/_test/items/2', headers={'Accept-Encoding': 'gzip'})
+        self.assertNotIn('Content-Encoding', small.headers)
+        large = self.client.get('/_test/items/500', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(large.headers['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', large.headers['Vary'])
+        self.assertEqual(len(json.loads(gzip.decompress(large.data))), 500)
+        self.assertNotIn('Content-Encoding', self.client.get('/_test/items/500').headers)
+
+    def test_streamed_response_is_compressed_incrementally(self):
+        """Tests that a streamed body is gzip encoded without a Content-Length."""
+        import gzip
+        response = self.client.get('/_test/stream', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertNotIn('Content-Length', response.headers)
+        self.assertEqual(len(gzip.decompress(response.data).splitlines()), 2000)
+
+    def test_precompress_static_writes_gzip_siblings(self):
+        """Tests the build step that precompresses static JS."""
+        import gzip
+        import os
+        import tempfile
+        from compression import precompress_static
+        with tempfile.TemporaryDirectory() as static_dir:
+            with open(os.path.join(static_dir, "app.js"), "w") as f:
+                f.write("console.log('x');" * 100)
+            with open(os.path.join(static_dir, "logo.png"), "wb") as f:
+                f.write(b"png")
+            written = precompress_static(static_dir)
+            self.assertIn(os.path.join(static_dir, "app.js.gz"), written)
+            self.assertFalse(any(path.startswith(os.path.join(static_dir, "logo.png")) for path in written))
+            with open(os.path.join(static_dir, "app.js.gz"), "rb") as f:
+                self.assertEqual(gzip.decompress(f.read()), b"console.log('x');" * 100)
+
+
+class TestAsgiReadPath(unittest.TestCase):
+    def test_read_endpoints_are_routed_to_async_handlers(self):
+        """Tests which requests the ASGI app serves natively and which fall through to Flask."""
+        from asgi import match_async_route
+        route, params = match_async_route("GET", "/api/branches/4/products/2/configured-modules")
+        self.assertEqual(params, {"branch_id": 4, "product_id": 2})
+        self.assertIsNone(match_async_route("POST", "/api/tenants/")[0])
+        self.assertIsNone(match_async_route("GET", "/api/tenants/1/ORG/sub")[0])
+
+    def test_async_database_url_swaps_driver(self):
+        """Tests that sync URLs map to the async driver of the same backend."""
+        from async_db import async_database_url
+        self.assertEqual(async_database_url("mysql+pymysql://u:p@db:3306/tenant"), "mysql+aiomysql://u:p@db:3306/tenant")
+        self.assertEqual(async_database_url("sqlite://"), "sqlite+aiosqlite://")
+
+    def test_error_body_matches_flask_route(self):
+        """Tests that the async handler's 400 response matches the Flask route it shadows."""
+        import asyncio
+        from app import create_app
+        from asgi import AsyncReadApp
+
+        flask_app = create_app("api", {"SQLALCHEMY_DATABASE_URI": "sqlite://", "DB_CREATE_SCHEMA": False})
+
+        class Session:
+            async def __aenter__(self):
+                return self
+
+            async def __aexit__(self, *exc):
+                return False
+
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        async def fallback(scope, receive, send):
+            raise AssertionError("request should not fall through")
+
+        asgi_app = AsyncReadApp(flask_app, Session, None, fallback)
+        scope = {"type": "http", "method": "GET", "path": "/api/branch-product-modules/product/1/modules", "query_string": b"", "headers": []}
+        asyncio.run(asgi_app(scope, None, send))
+
+        flask_response = flask_app.test_client().get("/api/branch-product-modules/product/1/modules")
+        self.assertEqual(sent[0]["status"], flask_response.status_code)
+        self.assertEqual(json.loads(sent[1]["body"]), flask_response.json)
+
+
+class TestConcurrentLoader(unittest.TestCase):
+    def test_results_and_first_error_in_call_order(self):
+        """Tests that fanned-out calls return by name and re-raise the first failure."""
+        from concurrent_loader import load_concurrently
+
+        def fail(message):
+            raise ValueError(message)
+
+        with app.app_context(), patch("concurrent_loader._runs_inline", return_value=False):
+            self.assertEqual(load_concurrently({"a": lambda: 1, "b": lambda: 2}), {"a": 1, "b": 2})
+            with self.assertRaisesRegex(ValueError, "first"):
+                load_concurrently({"ok": lambda: 1, "x": lambda: fail("first"), "y": lambda: fail("second")})
+            results = load_concurrently({"ok": lambda: 1, "x": lambda: fail("first")}, return_exceptions=True)
+            self.assertEqual(results["ok"], 1)
+            self.assertIsInstance(results["x"], ValueError)
+
+    def test_sqlite_runs_inline(self):
+        """Tests that calls stay on the request thread for SQLite."""
+        import threading
+        from concurrent_loader import load_concurrently
+        with app.app_context():
+            threads = load_concurrently({"a": threading.get_ident, "b": threading.get_ident})
+        self.assertEqual(set(threads.values()), {threading.get_ident()})
+
+
+class TestConfigurationContext(unittest.TestCase):
+    def setUp(self):
+        from app import create_app
+        self.app = create_app("full", {"SQLALCHEMY_DATABASE_URI": "sqlite://", "DB_CREATE_SCHEMA": True})
+        with self.app.app_context():
+            generator = DataGenerator(DatasetScale(countries=1, tenants=2, branches_per_tenant=2, products=3, modules=4, modules_per_product=3, features=2))
+            generator.generate()
+        self.client = self.app.test_client()
+
+    def test_context_matches_individual_endpoints(self):
+        """Tests that one context response carries the products, branches and module status of the separate endpoints."""
+        context = self.client.get("/api/tenants/1/configuration-context?branch_id=1&product_id=1").json
+        self.assertEqual(context["products"], self.client.get("/api/products/").json)
+        self.assertEqual(context["branches"], self.client.get("/api/tenants/1/branches").json)
+        self.assertEqual(context["modules"], self.client.get("/api/products/1/modules?branch_id=1").json)
+        self.assertEqual(len(context["products"]), 3)
+
+    def test_branch_of_another_tenant_is_not_found(self):
+        """Tests that a selected branch must belong to the tenant."""
+        other_branch = self.client.get("/api/tenants/2/branches").json[0]["branch_id"]
+        response = self.client.get(f"/api/tenants/1/configuration-context?branch_id={other_branch}&product_id=1")
         self.assertEqual(response.status_code, 404)
-        self.assertIn("One or more requested product modules are not defined.", response.get_json()["error"])
-        self.assertIn(f"No ProductModule found for product_id {self.test_product_id} and module_id(s): {non_existent_module_id}", response.get_json()["details"])
+        self.assertEqual(self.client.get("/api/tenants/999/configuration-context").status_code, 404)
+
+    def test_index_embeds_context(self):
+        """Tests that the index page embeds the context for the selection in the URL."""
+        html = self.client.get("/?tenant_id=1&branch_id=1&product_id=1").get_data(as_text=True)
+        self.assertIn("window.configurationContext = {", html)
+        self.assertIn('"is_configured"', html)
+
+
+class TestAuditLog(unittest.TestCase):
+    def test_worker_writes_batches_and_drains_on_close(self):
+        """Tests that queued records reach the table in batches and are drained on shutdown."""
+        import tempfile
+        from app import create_app
+        from audit_log import record_change
+        with tempfile.TemporaryDirectory() as tmp:
+            audit_app = create_app("api", {"SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp}/audit.db", "DB_CREATE_SCHEMA": True,
+                                           "BACKGROUND_WORKERS": True, "INVALIDATION_BUS_TRANSPORT": "none",
+                                           "FEATURE_FLAG_TABLE_ENABLED": False, "SCHEDULED_CHANGES_ENABLED": False,
+                                           "AUDIT_LOG_BATCH_SIZE": 2, "AUDIT_LOG_FLUSH_INTERVAL": 0.01})
+            writer = audit_app.extensions["audit_log"]
+            self.assertFalse(writer.inline)
+            with audit_app.app_context():
+                for module_id in range(5):
+                    record_change("module", module_id, "update", details={"name": f"M{module_id}"})
+                writer.close()
+                rows = db.session.execute(sqlalchemy.select(ConfigurationAuditLog)).scalars().all()
+                self.assertEqual(sorted(row.entity_id for row in rows), ["0", "1", "2", "3", "4"])
+                self.assertEqual(json.loads(rows[0].details), {"name": "M0"})
+                db.engine.dispose()
+
+    def test_full_queue_drops_instead_of_blocking(self):
+        """Tests backpressure: a full queue makes the caller wait briefly, then drops the record."""
+        from audit_log import AuditLogWriter
+        writer = AuditLogWriter(app, max_queue_size=1, enqueue_timeout=0.01)
+        record = {"entity_type": "module", "entity_id": "1", "action": "update"}
+        self.assertTrue(writer.submit(record))
+        self.assertFalse(writer.submit(record))
+
+    def test_bpm_removal_is_audited(self):
+        """Tests that the service layer records one audit row per removed module configuration."""
+        from app import create_app
+        from services.branch_product_module_services import branch_product_module_service
+        audit_app = create_app("api", {"SQLALCHEMY_DATABASE_URI": "sqlite://", "DB_CREATE_SCHEMA": True})
+        with audit_app.app_context():
+            DataGenerator(DatasetScale(countries=1, tenants=1, branches_per_tenant=1, products=1, modules=4, modules_per_product=4, bpm_fill=1.0, features=1)).generate()
+            branch_product_module_service.update_branch_product_module_configuration(1, 1, set())
+            rows = db.session.execute(sqlalchemy.select(ConfigurationAuditLog)).scalars().all()
+            self.assertEqual(len(rows), 4)
+            self.assertEqual({(row.action, row.tenant_id) for row in rows}, {("remove", 1)})
+
+
+class TestChangeFeed(unittest.TestCase):
+    def setUp(self):
+        from app import create_app
+        self.app = create_app("api", {"SQLALCHEMY_DATABASE_URI": "sqlite://", "DB_CREATE_SCHEMA": True})
+        with self.app.app_context():
+            DataGenerator(DatasetScale(countries=1, tenants=2, branches_per_tenant=1, products=1, modules=3, modules_per_product=3, bpm_fill=0.0, features=2)).generate()
+        self.client = self.app.test_client()
 
+    def test_committed_changes_are_published_in_version_order(self):
+        """Tests that service writes produce outbox events and rolled-back writes do not."""
+        from services.branch_product_module_services import branch_product_module_service
+        with self.app.app_context():
+            branch_product_module_service.update_branch_product_module_configuration(1, 1, {1, 2})
+            db.session.add(Module(name="Rolled back", code="RB"))
+            db.session.flush()
+            db.session.rollback()
 
+        feed = self.client.get("/api/changes/?since=0&tenant_id=1").json
+        self.assertEqual([change["version"] for change in feed["changes"]], [1, 2])
+        self.assertEqual(feed["next_since"], 2)
+        change = feed["changes"][0]
+        self.assertEqual((change["entity_type"], change["action"], change["tenant_id"]), ("branch_product_module", "create", 1))
+        self.assertEqual((change["payload"]["branch_id"], change["payload"]["product_id"]), (1, 1))
+        self.assertEqual(self.client.get("/api/changes/?since=0&tenant_id=2").json["changes"], [])
+
+    def test_feed_stops_before_versions_still_in_flight(self):
+        """Tests that a consumer is not moved past a version that commits after a newer one."""
+        table = ConfigurationChange.__table__
+        now = datetime.datetime.utcnow()
+
+        def insert(version, created_at=now):
+            with self.app.app_context():
+                db.session.execute(table.insert(), [{"version": version, "entity_type": "tenant", "entity_id": "1",
+                                                     "action": "update", "tenant_id": 1, "created_at": created_at}])
+                db.session.commit()
 
-    def test_delete_configured_modules_missing_fields(self):
-        """Tests deleting configured modules with missing required JSON fields."""
-        payload = {
-            "branch_id": self.test_branch_id,
-            
-        }
-        response = self.client.delete('/api/configure_modules', data=json.dumps(payload), headers=self.headers)
-        self.assertEqual(response.status_code, 400)
-        self.assertIn("branch_id, product_id, and module_ids (list) are required", response.get_json()["error"])
+        insert(1)
+        insert(3)
+        feed = self.client.get("/api/changes/?since=0").json
+        self.assertEqual(([c["version"] for c in feed["changes"]], feed["next_since"]), ([1], 1))
+        self.assertEqual(self.client.get("/api/tenants/1/configuration-context").json["change_version"], 1)
+        insert(2)
+        self.assertEqual([c["version"] for c in self.client.get("/api/changes/?since=1").json["changes"]], [2, 3])
+
+        # A version missing for longer than the grace period was rolled back.
+        insert(5, now - datetime.timedelta(seconds=60))
+        self.assertEqual([c["version"] for c in self.client.get("/api/changes/?since=3").json["changes"]], [5])
+
+    def test_long_poll_returns_when_notified(self):
+        """Tests that a waiting consumer is woken by a commit instead of sleeping out its timeout."""
+        import threading
+        from change_feed import change_notifier
+        generation = change_notifier.generation
+        threading.Timer(0.05, change_notifier.notify).start()
+        self.assertTrue(change_notifier.wait(generation, 5))
+
+    def test_event_stream_resumes_from_last_event_id(self):
+        """Tests SSE framing and resumption from the Last-Event-ID header."""
+        from services.tenant_feature_service import tenant_feature_service
+        with self.app.app_context():
+            tenant_feature_service.update_tenant_feature_configuration(1, [], [1, 2])
+            tenant_feature_service.update_tenant_feature_configuration(1, [1, 2], [])
+        self.assertEqual(self.client.get("/api/changes/?stream=sse").status_code, 406)
+        self.app.config["CHANGE_FEED_SSE_ENABLED"] = True
+        response = self.client.get("/api/changes/", headers={"Accept": "text/event-stream", "Last-Event-ID": "1"}, buffered=False)
+        self.assertEqual(response.mimetype, "text/event-stream")
+        first_event = next(iter(response.response))
+        response.close()
+        self.assertTrue(first_event.decode().startswith("id: 2\nevent: change\ndata: "))
+
+
+class TestConfigurationBundle(unittest.TestCase):
+    def setUp(self):
+        from app import create_app
+        from services.configuration_bundle_service import configuration_bundle_service
+        self.app = create_app("api", {"SQLALCHEMY_DATABASE_URI": "sqlite://", "DB_CREATE_SCHEMA": True, "DB_EXPOSE_REQUEST_STATS": True})
+        with self.app.app_context():
+            DataGenerator(DatasetScale(countries=1, tenants=2, branches_per_tenant=3, products=2, modules=4, modules_per_product=3, bpm_fill=1.0, features=4, tenant_feature_fill=0.0)).generate()
+        # The bundle cache is per process; start each test from a cold cache.
+        configuration_bundle_service.invalidate()
+        self.client = self.app.test_client()
 
-    def test_delete_configured_modules_invalid_branch_id(self):
-        """Tests deleting configured modules with an invalid branch_id (non-existent)."""
-        invalid_branch_id = self.test_branch_id + 9999
-        payload = {
-            "branch_id": invalid_branch_id,
-            "product_id": self.test_product_id,
-            "module_ids": [self.test_module_id_1]
-        }
-        response = self.client.delete('/api/configure_modules', data=json.dumps(payload), headers=self.headers)
-        self.assertEqual(response.status_code, 404)
-        self.assertIn(f"Branch with ID {invalid_branch_id} not found.", response.get_json()["error"])
+    def test_snapshot_is_cached_until_the_tenant_changes(self):
+        """Tests the snapshot shape and that a cached bundle costs only the version checks."""
+        first = self.client.get("/api/tenants/1/configuration-bundle")
+        self.assertEqual(first.json["mode"], "snapshot")
+        self.assertEqual(len(first.json["branches"]), 3)
+        self.assertEqual(len(first.json["branches"][0]["products"]), 2)
+        self.assertEqual(first.headers["ETag"], '"1-0"')
+
+        cached = self.client.get("/api/tenants/1/configuration-bundle")
+        self.assertEqual(cached.headers["X-DB-Query-Count"], "2")
+        self.assertEqual(self.client.get("/api/tenants/1/configuration-bundle", headers={"If-None-Match": '"1-0"'}).status_code, 304)
+
+    def test_conditional_get_matches_the_compressed_etag(self):
+        """Tests that the ETag of a gzip-encoded bundle still earns a 304 when sent back."""
+        self.app.config["COMPRESSION_MIN_SIZE"] = 0
+        first = self.client.get("/api/tenants/1/configuration-bundle", headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(first.headers["Content-Encoding"], "gzip")
+        self.assertEqual(first.headers["ETag"], '"1-0-gzip"')
+
+        again = self.client.get("/api/tenants/1/configuration-bundle",
+                                headers={"Accept-Encoding": "gzip", "If-None-Match": first.headers["ETag"]})
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again.headers["ETag"], '"1-0-gzip"')
+
+    def test_delta_from_a_known_version(self):
+        """Tests that a client holding an older bundle receives only what changed."""
+        from services.tenant_feature_service import tenant_feature_service
+        self.client.get("/api/tenants/1/configuration-bundle")
+        with self.app.app_context():
+            tenant_feature_service.update_tenant_feature_configuration(1, [], [2])
 
-    def test_delete_configured_modules_invalid_product_id(self):
-        """Tests deleting configured modules with an invalid product_id (non-existent)."""
-        invalid_product_id = self.test_product_id + 9999
-        payload = {
-            "branch_id": self.test_branch_id,
-            "product_id": invalid_product_id,
-            "module_ids": [self.test_module_id_1]
-        }
-        response = self.client.delete('/api/configure_modules', data=json.dumps(payload), headers=self.headers)
+        delta = self.client.get("/api/tenants/1/configuration-bundle?since_version=0").json
+        self.assertEqual(delta["mode"], "delta")
+        self.assertEqual(delta["features"], {"upsert": [], "remove": [2]})
+        self.assertEqual(delta["branches"], {"upsert": [], "remove": []})
+        self.assertNotIn("tenant", delta)
+        self.assertEqual(self.client.get(f"/api/tenants/1/configuration-bundle?since_version={delta['version']}").status_code, 304)
+        self.assertEqual(self.client.get("/api/tenants/2/configuration-bundle?since_version=0").status_code, 304)
+        self.assertEqual(self.client.get("/api/tenants/99/configuration-bundle").status_code, 404)
+
+
+class TestFeatureFlagTable(unittest.TestCase):
+    def setUp(self):
+        import tempfile
+        from app import create_app
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "flags.bin")
+        self.app = create_app("api", {"SQLALCHEMY_DATABASE_URI": "sqlite://", "DB_CREATE_SCHEMA": True,
+                                      "FEATURE_FLAG_TABLE_PATH": self.path, "FEATURE_FLAG_TABLE_CHECK_INTERVAL": 0})
+        with self.app.app_context():
+            DataGenerator(DatasetScale(countries=1, tenants=2, branches_per_tenant=1, products=1, modules=2, modules_per_product=2, bpm_fill=0.0, features=3, tenant_feature_fill=0.0)).generate()
+            self.app.extensions["feature_flag_refresher"].refresh()
+        self.table = self.app.extensions["feature_flag_table"]
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_lookups_follow_tenant_feature_updates(self):
+        """Tests default-enabled lookups, unknown ids, and that a configuration change rewrites the table."""
+        from services.tenant_feature_service import tenant_feature_service
+        generation = self.table.generation
+        self.assertTrue(self.table.is_enabled(1, 2))
+        self.assertIsNone(self.table.is_enabled(99, 2))
+        self.assertIsNone(self.table.is_enabled(1, 99))
+
+        with self.app.app_context():
+            tenant_feature_service.update_tenant_feature_configuration(1, [], [2])
+        self.assertEqual(self.table.generation, generation + 1)
+        self.assertFalse(self.table.is_enabled(1, 2))
+        self.assertTrue(self.table.is_enabled(2, 2))
+        self.assertEqual(self.app.test_client().get("/api/tenant-features/1/features/2").json["is_enabled"], False)
+
+    def test_table_is_shared_through_the_file(self):
+        """Tests that a second reader (another worker) maps the same file and sees the same bits."""
+        from feature_flag_table import FeatureFlagTable
+        other_worker = FeatureFlagTable(self.path)
+        self.assertEqual(other_worker.generation, self.table.generation)
+        self.assertEqual(other_worker.is_enabled(2, 1), self.table.is_enabled(2, 1))
+
+    def test_only_the_elected_worker_rebuilds(self):
+        """Tests that a second worker's refresher defers to the leader and takes over when it exits."""
+        from feature_flag_table import FeatureFlagRefresher
+        leader = FeatureFlagRefresher(self.app, self.path, refresh_interval=0)
+        follower = FeatureFlagRefresher(self.app, self.path, refresh_interval=0)
+        with self.app.app_context():
+            generation = leader.poll()
+            self.assertEqual(generation, self.table.generation)
+            self.assertIsNone(follower.poll())
+            self.assertFalse(follower.is_leader)
+            self.assertIsNone(leader.poll())
+
+            follower.request_refresh()
+            self.assertIsNone(follower.poll())
+            self.assertEqual(leader.poll(), generation + 1)
+
+            leader.close()
+            self.assertEqual(follower.poll(), generation + 2)
+            self.assertTrue(follower.is_leader)
+            follower.close()
+
+    def test_default_path_is_per_database(self):
+        """Tests that apps on different databases get their own default table file, named without the password."""
+        from sqlalchemy.engine import make_url
+        from feature_flag_table import default_table_filename
+        primary = make_url("postgresql://app:secret@db/config")
+        self.assertEqual(default_table_filename(primary), default_table_filename(make_url("postgresql://app:other@db/config")))
+        self.assertNotEqual(default_table_filename(primary), default_table_filename(make_url("sqlite:////tmp/bench.db")))
+        self.assertNotIn("secret", default_table_filename(primary))
+
+
+class TestInvalidationBus(unittest.TestCase):
+    def _wait_for(self, condition, timeout=5):
+        import time
+        deadline = time.monotonic() + timeout
+        while not condition() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return condition()
+
+    def _udp_pair(self):
+        from invalidation_bus import InvalidationBus, UdpTransport
+        sender = UdpTransport("node-a", "127.0.0.1:0", [], retry_interval=0.05)
+        receiver = UdpTransport("node-b", "127.0.0.1:0", [], retry_interval=0.05)
+        sender.peers = {receiver.address}
+        buses = [InvalidationBus(app, "node-a", sender, coalesce_window=0.05), InvalidationBus(app, "node-b", receiver)]
+        for bus in buses:
+            bus.start()
+            self.addCleanup(bus.close)
+        return buses[0], sender
+
+    def test_udp_bursts_are_coalesced_and_acknowledged(self):
+        """Tests that a burst of publishes reaches the other node as one batch of distinct keys."""
+        from invalidation_bus import subscribe
+        received = []
+        subscribe(("udp_test_entity",), lambda entity_type, keys: received.append(keys))
+        bus, transport = self._udp_pair()
+        for _ in range(3):
+            for entity_id in (1, 2):
+                bus.publish("udp_test_entity", entity_id, tenant_id=7)
+
+        # The publishing node dispatches locally at once; the peer receives one coalesced batch.
+        self.assertTrue(self._wait_for(lambda: len(received) == 7))
+        self.assertEqual(received[-1], [("1", 7), ("2", 7)])
+        self.assertTrue(self._wait_for(lambda: transport.pending() == 0))
+
+    def test_udp_redelivers_until_the_handler_succeeds(self):
+        """Tests at-least-once delivery: a failed handler leaves the datagram unacknowledged."""
+        from invalidation_bus import subscribe
+        calls = []
+
+        def flaky_handler(entity_type, keys):
+            calls.append(keys)
+            if len(calls) == 2:
+                raise RuntimeError("cache unavailable")
+        subscribe(("udp_flaky_entity",), flaky_handler)
+        bus, transport = self._udp_pair()
+        bus.publish("udp_flaky_entity", 5)
+        self.assertTrue(self._wait_for(lambda: len(calls) == 3 and transport.pending() == 0))
+
+    def test_table_transport_delivers_other_nodes_rows(self):
+        """Tests that the table poller delivers rows from other nodes once and skips its own."""
+        import tempfile
+        from app import create_app
+        from invalidation_bus import TableTransport
+        with tempfile.TemporaryDirectory() as tmp:
+            bus_app = create_app("api", {"SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp}/bus.db", "DB_CREATE_SCHEMA": True,
+                                         "INVALIDATION_BUS_TRANSPORT": "none", "FEATURE_FLAG_TABLE_ENABLED": False})
+            with bus_app.app_context():
+                node_a, node_b = TableTransport(bus_app, "node-a"), TableTransport(bus_app, "node-b")
+                node_a.poll(lambda keys: True)
+                node_b.poll(lambda keys: True)
+                node_a.send([("tenant", "1", 1), ("module", "3", None)])
+
+                delivered = []
+                self.assertEqual(node_b.poll(lambda keys: delivered.extend(keys) or True), 2)
+                self.assertEqual(delivered, [("tenant", "1", 1), ("module", "3", None)])
+                self.assertEqual(node_b.poll(lambda keys: delivered.extend(keys) or True), 0)
+                self.assertEqual(node_a.poll(lambda keys: delivered.extend(keys) or True), 0)
+                db.engine.dispose()
+
+    def test_committed_session_writes_are_published(self):
+        """Tests that any ORM write is published on commit, whichever code made it, and a rollback publishes nothing."""
+        from app import create_app
+        from invalidation_bus import subscribe
+        received = []
+        subscribe(("tenant", "tenant_feature"), lambda entity_type, keys: received.append((entity_type, keys)))
+        bus_app = create_app("api", {"SQLALCHEMY_DATABASE_URI": "sqlite://", "DB_CREATE_SCHEMA": True,
+                                     "FEATURE_FLAG_TABLE_ENABLED": False})
+        with bus_app.app_context():
+            tenant = Tenant(organization_code="BUS", sub_domain="bus", tenant_name="Bus Tenant")
+            feature = Feature(name="Bus Feature")
+            db.session.add_all([tenant, feature])
+            db.session.commit()
+            received.clear()
+
+            db.session.add(TenantFeature(tenant_id=tenant.tenant_id, feature_id=feature.feature_id, is_enabled=False))
+            db.session.flush()
+            self.assertEqual(received, [])
+            db.session.rollback()
+            self.assertEqual(received, [])
+
+            db.session.add(TenantFeature(tenant_id=tenant.tenant_id, feature_id=feature.feature_id, is_enabled=False))
+            db.session.commit()
+            self.assertEqual(received, [("tenant_feature", [(f"{tenant.tenant_id}:{feature.feature_id}", tenant.tenant_id)])])
+
+    def test_udp_transport_requires_a_bind_address(self):
+        """Tests that the udp transport refuses to start without an address of its own."""
+        from app import create_app
+        with self.assertRaises(ValueError):
+            create_app("api", {"SQLALCHEMY_DATABASE_URI": "sqlite://", "DB_CREATE_SCHEMA": False, "BACKGROUND_WORKERS": True,
+                               "INVALIDATION_BUS_TRANSPORT": "udp", "INVALIDATION_BUS_UDP_BIND": ""})
+
+    def test_no_workers_start_without_background_workers(self):
+        """Tests that a file-backed app built for a tool or test runs everything inline and keeps no threads."""
+        import tempfile
+        from app import create_app
+        from audit_log import _writers
+        from invalidation_bus import _buses
+        with tempfile.TemporaryDirectory() as tmp:
+            tool_app = create_app("api", {"SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp}/tool.db", "DB_CREATE_SCHEMA": True,
+                                          "BACKGROUND_WORKERS": False})
+            self.assertTrue(tool_app.extensions["audit_log"].inline)
+            self.assertIsNone(tool_app.extensions["invalidation_bus"].transport)
+            self.assertNotIn("feature_flag_table", tool_app.extensions)
+            self.assertNotIn("change_scheduler", tool_app.extensions)
+            self.assertNotIn(tool_app.extensions["audit_log"], _writers)
+            self.assertNotIn(tool_app.extensions["invalidation_bus"], _buses)
+            with tool_app.app_context():
+                db.engine.dispose()
+
+
+class TestReadCache(unittest.TestCase):
+    def test_concurrent_misses_share_one_computation(self):
+        """Tests that callers arriving while a key is computed wait for it instead of recomputing."""
+        import threading
+        import time
+        from read_cache import SingleFlightCache
+        cache = SingleFlightCache("test")
+        release = threading.Event()
+        calls = []
+
+        def compute():
+            calls.append(1)
+            release.wait(5)
+            return {"tenant_id": 1}
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get(1, compute, 30, 300))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        while not cache._flights:
+            time.sleep(0.001)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{"tenant_id": 1}] * 8)
+
+    def test_soft_ttl_revalidates_and_invalidation_discards_in_flight_results(self):
+        """Tests stale-while-revalidate and that a value computed across an invalidation is not cached."""
+        from read_cache import SingleFlightCache
+        cache = SingleFlightCache("test")
+        values = iter(["v1", "v2", "v3"])
+        self.assertEqual(cache.get("k", lambda: next(values), 30, 300), "v1")
+        self.assertEqual(cache.get("k", lambda: next(values), 30, 300), "v1")
+        # Past the soft TTL; outside an app context the refresh runs inline.
+        self.assertEqual(cache.get("k", lambda: next(values), 0, 300), "v2")
+
+        def compute_during_invalidation():
+            cache.invalidate()
+            return "v3"
+        self.assertEqual(cache.get("other", compute_during_invalidation, 30, 300), "v3")
+        self.assertNotIn("other", cache._entries)
+
+    def test_service_reads_are_evicted_by_updates(self):
+        """Tests that a cached feature status is served from memory and evicted when the tenant changes."""
+        from app import create_app
+        from services.tenant_feature_service import tenant_feature_service
+        cache_app = create_app("api", {"SQLALCHEMY_DATABASE_URI": "sqlite://", "DB_CREATE_SCHEMA": True, "DB_EXPOSE_REQUEST_STATS": True})
+        with cache_app.app_context():
+            DataGenerator(DatasetScale(countries=1, tenants=1, branches_per_tenant=1, products=1, modules=2, modules_per_product=2, bpm_fill=0.0, features=2, tenant_feature_fill=0.0)).generate()
+        client = cache_app.test_client()
+        self.assertEqual(len(client.get("/api/tenant-features/1").json["enabled_features"]), 2)
+        cached = client.get("/api/tenant-features/1")
+        self.assertEqual(cached.headers["X-DB-Query-Count"], "0")
+
+        with cache_app.app_context():
+            tenant_feature_service.update_tenant_feature_configuration(1, [], [2])
+        self.assertEqual([f["feature_id"] for f in client.get("/api/tenant-features/1").json["disabled_features"]], [2])
+
+
+class TestEntitlements(unittest.TestCase):
+    def setUp(self):
+        from app import create_app
+        self.app = create_app("api", {"SQLALCHEMY_DATABASE_URI": "sqlite://", "DB_CREATE_SCHEMA": True})
+        with self.app.app_context():
+            DataGenerator(DatasetScale(countries=1, tenants=1, branches_per_tenant=2, products=1, modules=3, modules_per_product=3, bpm_fill=0.0, features=3, tenant_feature_fill=0.0)).generate()
+            # Features 1 and 2 belong to modules 1 and 2; feature 3 is tenant-wide.
+            for feature_id, module_id in ((1, 1), (2, 2), (3, None)):
+                db.session.get(Feature, feature_id).module_id = module_id
+            db.session.commit()
+        self.client = self.app.test_client()
+
+    def _configure(self, branch_id, module_ids):
+        from services.branch_product_module_services import branch_product_module_service
+        with self.app.app_context():
+            branch_product_module_service.update_branch_product_module_configuration(branch_id, 1, set(module_ids))
+
+    def test_modules_gate_features_and_tenant_overrides_apply(self):
+        """Tests the resolution rules: configured modules enable their features, tenant overrides switch them off."""
+        from services.tenant_feature_service import tenant_feature_service
+        self._configure(1, {1})
+        product = self.client.get("/api/branches/1/entitlements").json["products"][0]
+        self.assertEqual((product["product_id"], product["module_ids"], product["feature_ids"]), (1, [1], [1, 3]))
+
+        with self.app.app_context():
+            tenant_feature_service.update_tenant_feature_configuration(1, [], [3])
+        self.assertEqual(self.client.get("/api/branches/1/entitlements?product_id=1").json["products"][0]["feature_ids"], [1])
+        self.assertEqual(self.client.get("/api/branches/2/entitlements").json["products"], [])
+        self.assertEqual(self.client.get("/api/branches/99/entitlements").status_code, 404)
+
+    def test_changes_recompute_only_affected_branches(self):
+        """Tests that a module change on one branch evicts that branch only, and checks are in-memory afterwards."""
+        from services.entitlement_service import entitlement_service
+        self._configure(2, {2})
+        with self.app.app_context():
+            entitlement_service.get_branch_entitlements([1, 2])
+            index = self.app.extensions["entitlement_index"]
+            branch_2 = index.branches[2]
+
+        self._configure(1, {1, 2})
+        with self.app.app_context():
+            self.assertNotIn(1, index.branches)
+            self.assertIs(index.branches[2], branch_2)
+            self.assertTrue(entitlement_service.is_feature_entitled(1, 1, 2))
+            self.assertTrue(entitlement_service.is_module_entitled(2, 1, 2))
+            self.assertFalse(entitlement_service.is_module_entitled(2, 1, 1))
+
+    def test_entries_expire_without_an_invalidation(self):
+        """Tests that a change whose invalidation was missed is picked up once the entry's TTL has passed."""
+        from services.entitlement_service import entitlement_service
+        self._configure(1, {1})
+        with self.app.app_context():
+            self.assertFalse(entitlement_service.is_module_entitled(1, 1, 2))
+            # A write outside the ORM session publishes nothing.
+            db.session.execute(BranchProductModule.__table__.insert().values(branch_id=1, product_module_id=2,
+                                                                              created_at=datetime.datetime.utcnow()))
+            db.session.commit()
+            self.assertFalse(entitlement_service.is_module_entitled(1, 1, 2))
+
+            index = self.app.extensions["entitlement_index"]
+            index.branches[1].resolved_at -= index.ttl
+            self.assertTrue(entitlement_service.is_module_entitled(1, 1, 2))
+
+
+class TestSparseTenantFeatures(unittest.TestCase):
+    def setUp(self):
+        from app import create_app
+        self.app = create_app("api", {"SQLALCHEMY_DATABASE_URI": "sqlite://", "DB_CREATE_SCHEMA": True})
+        with self.app.app_context():
+            DataGenerator(DatasetScale(countries=1, tenants=2, branches_per_tenant=1, products=1, modules=1, modules_per_product=1, features=3, tenant_feature_fill=0.0)).generate()
+            db.session.get(Feature, 2).default_enabled = False
+            db.session.commit()
+
+    def _status(self, tenant_id):
+        from services.tenant_feature_service import tenant_feature_service
+        status = tenant_feature_service._load_features_for_tenant_with_status(tenant_id)
+        return (sorted(f["feature_id"] for f in status["enabled_features"]),
+                sorted(f["feature_id"] for f in status["disabled_features"]))
+
+    def test_only_deviations_from_the_default_are_stored(self):
+        """Tests that updates store overrides only where the state differs from the feature's default."""
+        from services.tenant_feature_service import tenant_feature_service
+        with self.app.app_context():
+            self.assertEqual(self._status(1), ([1, 3], [2]))
+            tenant_feature_service.update_tenant_feature_configuration(1, [1, 2], [3])
+            self.assertEqual(self._status(1), ([1, 2], [3]))
+            self.assertEqual(sorted((tf.feature_id, tf.is_enabled) for tf in TenantFeature.query.filter_by(tenant_id=1)), [(2, True), (3, False)])
+
+            tenant_feature_service.update_tenant_feature_configuration(1, [3], [2])
+            self.assertEqual(TenantFeature.query.filter_by(tenant_id=1).count(), 0)
+            self.assertEqual(self._status(1), ([1, 3], [2]))
+            self.assertFalse(tenant_feature_service.is_feature_enabled(1, 2))
+            self.assertEqual(tenant_feature_service.update_tenant_feature_configuration(1, [1], [])["status"], "info")
+
+    def test_legacy_configure_endpoint_stores_overrides_sparsely(self):
+        """Tests that POST /api/configurations/tenant-features goes through the same sparse, invalidating write path."""
+        from services.tenant_feature_service import tenant_feature_service
+        client = self.app.test_client()
+        with self.app.app_context():
+            self.assertFalse(tenant_feature_service.is_feature_enabled(1, 2))
+        response = client.post("/api/configurations/tenant-features",
+                               json={"tenant_id": 1, "enabled_feature_ids": [1, 2], "disabled_feature_ids": [3]})
+        self.assertEqual((response.status_code, response.json["status"]), (200, "success"))
+        with self.app.app_context():
+            self.assertEqual(sorted((tf.feature_id, tf.is_enabled) for tf in TenantFeature.query.filter_by(tenant_id=1)), [(2, True), (3, False)])
+            self.assertTrue(tenant_feature_service.is_feature_enabled(1, 2))
+            self.assertEqual(self._status(1), ([1, 2], [3]))
+
+        response = client.post("/api/configurations/tenant-features", json={"tenant_id": 1, "enabled_feature_ids": [1, 2]})
+        self.assertEqual(response.json["status"], "no_change")
+        response = client.post("/api/configurations/tenant-features", json={"tenant_id": 1, "enabled_feature_ids": [99]})
         self.assertEqual(response.status_code, 404)
-        self.assertIn(f"Product with ID {invalid_product_id} not found.", response.get_json()["error"])
 
-  
+    def test_compaction_removes_redundant_rows_only(self):
+        """Tests that compaction deletes rows matching the default without changing any tenant's state."""
+        from services.tenant_feature_service import tenant_feature_service
+        with self.app.app_context():
+            for tenant_id, feature_id, is_enabled in ((1, 1, True), (1, 2, False), (1, 3, False), (2, 1, None), (2, 2, True)):
+                db.session.add(TenantFeature(tenant_id=tenant_id, feature_id=feature_id, is_enabled=is_enabled))
+            db.session.commit()
+            before = (self._status(1), self._status(2))
 
-    def test_delete_configured_modules_non_integer_module_ids_in_list(self):
-        """Tests deleting configured modules with non-integer module_ids in the list."""
-        payload = {
-            "branch_id": self.test_branch_id,
-            "product_id": self.test_product_id,
-            "module_ids": [self.test_module_id_1, "def"]
-        }
-        response = self.client.delete('/api/configure_modules', data=json.dumps(payload), headers=self.headers)
+            self.assertEqual(tenant_feature_service.compact_overrides(dry_run=True), {"scanned_batches": 1, "redundant": 3, "deleted": 0})
+            self.assertEqual(TenantFeature.query.count(), 5)
+            self.assertEqual(tenant_feature_service.compact_overrides(batch_size=2), {"scanned_batches": 2, "redundant": 3, "deleted": 3})
+            self.assertEqual(sorted((tf.tenant_id, tf.feature_id) for tf in TenantFeature.query), [(1, 3), (2, 2)])
+            self.assertEqual((self._status(1), self._status(2)), before)
+
+
+class TestFeatureRollouts(unittest.TestCase):
+    def setUp(self):
+        import tempfile
+        from app import create_app
+        self.tmp = tempfile.TemporaryDirectory()
+        self.app = create_app("api", {"SQLALCHEMY_DATABASE_URI": "sqlite://", "DB_CREATE_SCHEMA": True,
+                                      "FEATURE_FLAG_TABLE_PATH": os.path.join(self.tmp.name, "flags.bin"),
+                                      "FEATURE_FLAG_TABLE_CHECK_INTERVAL": 0})
+        with self.app.app_context():
+            DataGenerator(DatasetScale(countries=2, tenants=40, branches_per_tenant=1, products=1, modules=1, modules_per_product=1, features=2, tenant_feature_fill=0.0)).generate()
+            db.session.get(Feature, 2).default_enabled = False
+            db.session.commit()
+            self.countries = {tenant.tenant_id: tenant.country_id for tenant in Tenant.query}
+            self.app.extensions["feature_flag_refresher"].refresh()
+        self.table = self.app.extensions["feature_flag_table"]
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _enabled_tenants(self):
+        return {tenant_id for tenant_id in self.countries if self.table.is_enabled(tenant_id, 2)}
+
+    def test_percentage_cohorts_are_stable_and_nested(self):
+        """Tests that buckets are deterministic and a larger percentage keeps the tenants of a smaller one."""
+        from feature_rollout import Rollout, bucket
+        five = {tenant_id for tenant_id in range(1, 2001) if Rollout(5).includes(2, tenant_id)}
+        fifty = {tenant_id for tenant_id in range(1, 2001) if Rollout(50).includes(2, tenant_id)}
+        self.assertLess(five, fifty)
+        self.assertTrue(50 < len(five) < 150 and 900 < len(fifty) < 1100)
+        self.assertEqual(bucket(2, 7), bucket(2, 7))
+        self.assertNotEqual(five, {tenant_id for tenant_id in range(1, 2001) if Rollout(5).includes(3, tenant_id)})
+
+    def test_one_write_moves_every_evaluator(self):
+        """Tests that a rollout change reaches the flag table, the status read and the bundle, and overrides still win."""
+        from feature_rollout import bucket
+        self.assertEqual(self._enabled_tenants(), set())
+        response = self.client.put("/api/features/2/rollout", json={"percentage": 50, "tenant_ids": [1]})
+        self.assertEqual(response.json["rollout"], {"percentage": 50, "tenant_ids": [1], "country_ids": []})
+        expected = {tenant_id for tenant_id in self.countries if tenant_id == 1 or bucket(2, tenant_id) < 5000}
+        self.assertEqual(self._enabled_tenants(), expected)
+        for tenant_id in (1, 2, 3):
+            status = self.client.get(f"/api/tenant-features/{tenant_id}").json
+            self.assertEqual(2 in [f["feature_id"] for f in status["enabled_features"]], tenant_id in expected)
+        self.assertIn(2, [f["feature_id"] for f in self.client.get("/api/tenants/1/configuration-bundle").json["features"]])
+
+        self.client.put("/api/features/2/rollout", json={"country_ids": [1]})
+        self.assertEqual(self._enabled_tenants(), {tenant_id for tenant_id, country_id in self.countries.items() if country_id == 1})
+        with self.app.app_context():
+            from services.tenant_feature_service import tenant_feature_service
+            tenant_feature_service.update_tenant_feature_configuration(1, [2], [])
+        self.assertTrue(self.table.is_enabled(1, 2))
+
+        self.client.delete("/api/features/2/rollout")
+        self.assertEqual(self._enabled_tenants(), {1})
+        self.assertEqual(self.client.put("/api/features/2/rollout", json={"percentage": 150}).status_code, 400)
+        self.assertEqual(self.client.get("/api/features/99/rollout").status_code, 404)
+
+    def test_explicit_state_inside_the_rollout_is_kept(self):
+        """Tests that enabling a feature a tenant already gets from its rollout still pins it when the rollout goes away."""
+        from services.tenant_feature_service import tenant_feature_service
+        from services.scheduled_change_service import scheduled_change_service
+        in_rollout = sorted(tenant_id for tenant_id, country_id in self.countries.items() if country_id == 1)[:2]
+        self.client.put("/api/features/2/rollout", json={"country_ids": [1]})
+        with self.app.app_context():
+            tenant_feature_service.update_tenant_feature_configuration(in_rollout[0], [2], [])
+            scheduled_change_service.schedule_changes([{"entity_type": "tenant_feature", "action": "enable", "tenant_id": in_rollout[1],
+                                                        "feature_id": 2, "apply_at": "2020-01-01T00:00:00Z"}])
+            scheduled_change_service.apply_due_changes()
+            self.assertEqual(sorted(tf.tenant_id for tf in TenantFeature.query.filter_by(feature_id=2, is_enabled=True)), in_rollout)
+
+        self.client.delete("/api/features/2/rollout")
+        self.assertEqual(self._enabled_tenants(), set(in_rollout))
+
+
+class TestScheduledChanges(unittest.TestCase):
+    def setUp(self):
+        from app import create_app
+        self.app = create_app("api", {"SQLALCHEMY_DATABASE_URI": "sqlite://", "DB_CREATE_SCHEMA": True,
+                                      "DB_EXPOSE_REQUEST_STATS": True, "SCHEDULED_CHANGES_RETRY_DELAY": 10})
+        with self.app.app_context():
+            DataGenerator(DatasetScale(countries=1, tenants=30, branches_per_tenant=1, products=1, modules=1, modules_per_product=1, features=3, bpm_fill=0.0, tenant_feature_fill=0.0)).generate()
+            self.branch_ids = [branch.branch_id for branch in Branch.query.order_by(Branch.branch_id)]
+            self.product_module_id = ProductModule.query.first().product_module_id
+        self.client = self.app.test_client()
+        self.past = "2020-01-01T00:00:00Z"
+
+    def _disabled(self, tenant_id):
+        status = self.client.get(f"/api/tenant-features/{tenant_id}").json
+        return {f["feature_id"] for f in status["disabled_features"]}
+
+    def test_due_changes_apply_in_bulk(self):
+        """Tests that due changes are previewed without writes, then applied with a bounded number of queries."""
+        changes = [{"entity_type": "tenant_feature", "action": "disable", "tenant_id": tenant_id, "feature_id": 2, "apply_at": self.past}
+                   for tenant_id in range(1, 31)]
+        changes += [{"entity_type": "branch_product_module", "action": "enable", "branch_id": branch_id,
+                     "product_module_id": self.product_module_id, "apply_at": self.past} for branch_id in self.branch_ids]
+        changes.append({"entity_type": "tenant_feature", "action": "disable", "tenant_id": 1, "feature_id": 3, "apply_at": "2999-01-01T00:00:00Z"})
+        response = self.client.post("/api/scheduled-changes/", json={"changes": changes, "created_by": "ops"})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.json), len(changes))
+
+        preview = self.client.get("/api/scheduled-changes/preview").json
+        self.assertEqual(len(preview), len(changes) - 1)
+        self.assertEqual({entry["effect"] for entry in preview}, {"create_override", "add_module"})
+        self.assertNotIn(2, self._disabled(1))
+
+        response = self.client.post("/api/scheduled-changes/apply")
+        self.assertEqual(response.json, {"batches": 1, "applied": len(changes) - 1, "deferred": 0, "failed": 0})
+        # Reads and updates do not grow with the batch; SQLite inserts the rows, and the inline
+        # audit log its records, one statement at a time.
+        self.assertLess(int(response.headers["X-DB-Query-Count"]) - 2 * (len(changes) - 1), 20)
+        self.assertEqual(self._disabled(1), {2})
+        with self.app.app_context():
+            self.assertEqual(BranchProductModule.query.count(), len(self.branch_ids))
+            self.assertEqual(ConfigurationAuditLog.query.filter_by(actor="scheduler").count(), len(changes) - 1)
+        self.assertEqual(len(self.client.get("/api/scheduled-changes/?status=pending").json), 1)
+        self.assertEqual(self.client.post("/api/scheduled-changes/apply").json["batches"], 0)
+
+    def test_latest_change_per_target_wins(self):
+        """Tests that of several due changes to one tenant feature only the latest takes effect."""
+        self.client.post("/api/scheduled-changes/", json={"changes": [
+            {"entity_type": "tenant_feature", "action": "disable", "tenant_id": 1, "feature_id": 2, "apply_at": "2020-01-01T00:00:00Z"},
+            {"entity_type": "tenant_feature", "action": "enable", "tenant_id": 1, "feature_id": 2, "apply_at": "2020-01-02T00:00:00Z"},
+        ]})
+        self.assertEqual([entry["effect"] for entry in self.client.get("/api/scheduled-changes/preview").json], ["superseded", "none"])
+        self.assertEqual(self.client.post("/api/scheduled-changes/apply").json["applied"], 2)
+        self.assertEqual(self._disabled(1), set())
+        with self.app.app_context():
+            self.assertEqual(TenantFeature.query.count(), 0)
+
+    def test_failed_batches_are_retried_with_backoff(self):
+        """Tests that a change whose write fails is deferred and applied on a later run."""
+        from errors import DatabaseOperationError
+        from repositories.scheduled_change_repository import scheduled_change_repository
+        self.client.post("/api/scheduled-changes/", json={"changes": [
+            {"entity_type": "tenant_feature", "action": "disable", "tenant_id": 1, "feature_id": 2, "apply_at": self.past}]})
+        original, calls = scheduled_change_repository.apply, []
+
+        def fail_once(*args):
+            calls.append(args)
+            if len(calls) == 1:
+                raise DatabaseOperationError("deadlock")
+            return original(*args)
+
+        with patch.object(scheduled_change_repository, "apply", side_effect=fail_once):
+            with self.app.app_context():
+                from services.scheduled_change_service import scheduled_change_service
+                now = datetime.datetime.utcnow()
+                self.assertEqual(scheduled_change_service.apply_due_changes(now)["deferred"], 1)
+                change = self.client.get("/api/scheduled-changes/").json[0]
+                self.assertEqual((change["status"], change["attempts"], change["last_error"]), ("pending", 1, "deadlock"))
+                self.assertEqual(scheduled_change_service.apply_due_changes(now)["batches"], 0)
+                self.assertEqual(scheduled_change_service.apply_due_changes(now + datetime.timedelta(seconds=11))["applied"], 1)
+        self.assertEqual(self._disabled(1), {2})
+
+    def test_invalid_and_cancelled_changes(self):
+        """Tests target validation on scheduling and cancelling pending changes."""
+        response = self.client.post("/api/scheduled-changes/", json={"changes": [
+            {"entity_type": "tenant_feature", "action": "disable", "tenant_id": 999, "feature_id": 2, "apply_at": self.past}]})
         self.assertEqual(response.status_code, 400)
-        self.assertIn("module_ids must be a list of integers", response.get_json()["error"])
+        response = self.client.post("/api/scheduled-changes/", json={"changes": [
+            {"entity_type": "branch_product_module", "action": "enable", "branch_id": 1, "apply_at": self.past}]})
+        self.assertIn("product_module_id", response.json["details"]["0"])
 
-    def test_delete_configured_modules_no_matching_configs(self):
-        """Tests deleting configured modules when no matching configurations are found."""
-        
-        payload = {
-            "branch_id": self.test_branch_id,
-            "product_id": self.test_product_id,
-            "module_ids": [self.test_module_id_1] 
-        }
-        response = self.client.delete('/api/configure_modules', data=json.dumps(payload), headers=self.headers)
-        self.assertEqual(response.status_code, 404)
-        self.assertIn("No matching module configurations found for deletion.", response.get_json()["message"])
+        change = self.client.post("/api/scheduled-changes/", json={"changes": [
+            {"entity_type": "tenant_feature", "action": "disable", "tenant_id": 1, "feature_id": 2, "apply_at": self.past}]}).json[0]
+        self.assertEqual(self.client.delete(f"/api/scheduled-changes/{change['scheduled_change_id']}").json["status"], "cancelled")
+        self.assertEqual(self.client.delete(f"/api/scheduled-changes/{change['scheduled_change_id']}").status_code, 400)
+        self.assertEqual(self.client.delete("/api/scheduled-changes/999").status_code, 404)
+        self.assertEqual(self.client.post("/api/scheduled-changes/apply").json["applied"], 0)
+        self.assertEqual(self._disabled(1), set())
+
+
+class TestConfigurationClient(unittest.TestCase):
+    def setUp(self):
+        import tempfile
+        from app import create_app
+        from services.configuration_bundle_service import configuration_bundle_service
+        from config_client import ConfigurationClient, FlaskClientTransport
+        self.tmp = tempfile.TemporaryDirectory()
+        self.app = create_app("api", {"SQLALCHEMY_DATABASE_URI": "sqlite://", "DB_CREATE_SCHEMA": True})
+        with self.app.app_context():
+            DataGenerator(DatasetScale(countries=1, tenants=2, branches_per_tenant=2, products=1, modules=3, modules_per_product=3, bpm_fill=1.0, features=4, tenant_feature_fill=0.0)).generate()
+        configuration_bundle_service.invalidate()
+        self.transport = FlaskClientTransport(self.app.test_client())
+        self.client = ConfigurationClient(transport=self.transport, tenant_ids=[1], refresh_interval=0, stale_after=60, cache_dir=self.tmp.name).start()
+
+    def tearDown(self):
+        self.client.close()
+        self.tmp.cleanup()
+
+    def test_checks_follow_server_changes(self):
+        """Tests that checks are served locally and refreshes pick up changes as deltas or 304s."""
+        self.assertEqual(self.client.enabled_features(1), {1, 2, 3, 4})
+        branch = self.client.snapshot(1).bundle["branches"][0]
+        branch_id, product_id, module_id = branch["branch_id"], branch["products"][0]["product_id"], branch["products"][0]["module_ids"][0]
+        self.assertTrue(self.client.is_module_configured(1, branch_id, product_id, module_id))
+
+        self.assertEqual(self.client.refresh_all(), 0)
+        self.assertEqual(self.client.stats, {"snapshots": 1, "deltas": 0, "not_modified": 1, "failures": 0})
+
+        with self.app.app_context():
+            from services.tenant_feature_service import tenant_feature_service
+            tenant_feature_service.update_tenant_feature_configuration(1, [], [2])
+        self.app.test_client().delete(f"/api/branch-product-modules/branches/{branch_id}/products/{product_id}/modules/{module_id}")
+        self.client.refresh_all()
+        self.assertEqual(self.client.stats["deltas"], 1)
+        self.assertFalse(self.client.is_feature_enabled(1, 2))
+        self.assertFalse(self.client.is_module_configured(1, branch_id, product_id, module_id))
+        self.assertEqual(self.client.configured_modules(1, branch_id, product_id), set(branch["products"][0]["module_ids"]) - {module_id})
+
+        # Tenant 2 is fetched on first use, unknown tenants fall back to the default.
+        self.assertTrue(self.client.is_feature_enabled(2, 1))
+        self.assertTrue(self.client.is_feature_enabled(99, 1, default=True))
+        self.assertIsNone(self.client.snapshot(99))
+
+    def test_last_known_good_when_the_server_is_unreachable(self):
+        """Tests that failed refreshes keep the held snapshot, and a new client can start from the disk cache."""
+        from config_client import ConfigurationClient
+
+        class Unreachable:
+            def get(self, path, headers):
+                raise ConnectionRefusedError("connection refused")
+
+        self.client.transport = Unreachable()
+        self.assertEqual(self.client.refresh_all(), 1)
+        self.assertTrue(self.client.is_feature_enabled(1, 2))
+        self.assertEqual(self.client.stats["failures"], 1)
+
+        with ConfigurationClient(transport=Unreachable(), tenant_ids=[1], refresh_interval=0, cache_dir=self.tmp.name) as restarted:
+            self.assertTrue(restarted.is_feature_enabled(1, 2))
+            self.assertTrue(restarted.is_stale(1))
+        self.client.transport = self.transport
+        self.client.refresh_all()
+        self.assertFalse(self.client.is_stale(1))
+
+
+class TestMigrations(unittest.TestCase):
+    def test_migrations_match_the_models(self):
+        """Tests that each migration creates its table exactly as the model does on MySQL."""
+        import glob
+        from sqlalchemy.dialects import mysql
+        from sqlalchemy.schema import CreateTable, CreateIndex
+        for path in sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations", "*.sql"))):
+            table = db.metadata.tables[os.path.basename(path)[len("0000_"):-len(".sql")]]
+            with open(path) as sql_file:
+                script = " ".join(line for line in sql_file.read().splitlines() if not line.startswith("--"))
+            expected = [CreateTable(table)] + [CreateIndex(index) for index in sorted(table.indexes, key=lambda index: index.name)]
+            self.assertEqual(
+                [" ".join(statement.split()) for statement in script.split(";") if statement.strip()],
+                [" ".join(str(ddl.compile(dialect=mysql.dialect())).split()) for ddl in expected],
+                path,
+            )
 
 
 if __name__ == '__main__':